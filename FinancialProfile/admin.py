@@ -1,7 +1,7 @@
 # FinancialProfile/admin.py
 
 from django.contrib import admin
-from .models import FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory
+from .models import FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory, RiskHistoryBucket
 
 
 class IncomeInline(admin.TabularInline):
@@ -31,7 +31,7 @@ class AssetInline(admin.TabularInline):
 class RiskAssessmentInline(admin.TabularInline):
     model = RiskAssessmentHistory
     extra = 0
-    readonly_fields = ['assessment_date', 'risk_level']
+    readonly_fields = ['assessment_date', 'risk_level', 'summary']
     fields = ['score', 'risk_level', 'assessment_date', 'summary']
 
 
@@ -44,6 +44,9 @@ class FinancialProfileAdmin(admin.ModelAdmin):
     
     inlines = [IncomeInline, ExpenseInline, DebtInline, AssetInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'latest_assessment').with_financial_totals()
+    
     fieldsets = (
         ('Profile Information', {
             'fields': ('user', 'last_assessed')
@@ -109,7 +112,9 @@ class RiskAssessmentHistoryAdmin(admin.ModelAdmin):
     list_display = ['profile', 'score', 'risk_level', 'assessment_date']
     list_filter = ['risk_level', 'assessment_date']
     search_fields = ['profile__user__username']
-    readonly_fields = ['assessment_date', 'risk_level']
+    readonly_fields = ['assessment_date', 'risk_level', 'summary']
+    exclude = ['summary_text', 'summary_template']
+    list_select_related = ['profile__user']
     ordering = ['-assessment_date']
     
     def has_add_permission(self, request):
@@ -122,4 +127,17 @@ class RiskAssessmentHistoryAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         # Prevent deletion
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(RiskHistoryBucket)
+class RiskHistoryBucketAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'period', 'period_start', 'assessment_count', 'min_score', 'max_score', 'last_score', 'last_risk_level']
+    list_filter = ['period', 'last_risk_level']
+    search_fields = ['profile__user__username']
+    list_select_related = ['profile__user']
+    ordering = ['-period_start']
+
+    def has_add_permission(self, request):
+        # Buckets are written by the compact_risk_history command
+        return False
@@ -0,0 +1,170 @@
+# FinancialProfile/assessment_queue.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import FinancialProfile, PendingRiskAssessment
+
+logger = logging.getLogger("financial_risk.assessment_queue")
+
+DEFAULT_QUEUE = {
+    'BACKEND': 'FinancialProfile.assessment_queue.ThreadPoolAssessmentQueue',
+    'OPTIONS': {},
+}
+
+
+def assess_profile(profile_id):
+    """
+    Score a profile if its data is complete
+    The unit of work every backend runs; returns the assessment or None.
+    """
+    profile = (
+        FinancialProfile.objects
+        .select_related('user', 'rollup', 'latest_assessment')
+        .filter(pk=profile_id)
+        .first()
+    )
+    if profile is None or not profile.has_complete_profile():
+        return None
+    # Changes are already coalesced by the queue, so never reuse a stale assessment
+    assessment = profile.create_risk_assessment(dedupe_window=None)
+    logger.info(f"Assessed profile {profile_id}: score {assessment.score}")
+    return assessment
+
+
+class BaseAssessmentQueue:
+    """
+    Receives "profile dirty" marks and eventually runs assess_profile for them
+    Each mark restarts the profile's debounce window, so a profile is scored
+    once debounce_seconds pass without another change to it.
+    """
+
+    def __init__(self, debounce_seconds=5):
+        self.debounce_seconds = debounce_seconds
+
+    def enqueue(self, profile_id):
+        raise NotImplementedError
+
+
+class ImmediateAssessmentQueue(BaseAssessmentQueue):
+    """Assess synchronously in the caller's thread; intended for tests and scripts"""
+
+    def enqueue(self, profile_id):
+        try:
+            assess_profile(profile_id)
+        except Exception as e:
+            logger.error(f"Error assessing profile {profile_id}: {e}", exc_info=True)
+
+
+class ThreadPoolAssessmentQueue(BaseAssessmentQueue):
+    """
+    In-process backend: each mark for a profile replaces its debounce timer,
+    and when a timer runs out the profile is scored on a small thread pool.
+    Pending marks are lost if the process exits.
+    """
+
+    def __init__(self, debounce_seconds=5, max_workers=2):
+        super().__init__(debounce_seconds)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='risk-assessment')
+        # Profile id -> the debounce timer of its latest mark
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, profile_id):
+        timer = threading.Timer(self.debounce_seconds, self._submit, args=[profile_id])
+        timer.daemon = True
+        with self._lock:
+            previous = self._pending.get(profile_id)
+            if previous is not None:
+                previous.cancel()
+            self._pending[profile_id] = timer
+        timer.start()
+
+    def _submit(self, profile_id):
+        with self._lock:
+            if self._pending.get(profile_id) is not threading.current_thread():
+                # A later mark replaced this timer as it ran out
+                return
+            self.executor.submit(self._run, profile_id)
+            # Release the mark once scoring is queued, so changes made meanwhile are picked up again
+            del self._pending[profile_id]
+
+    def _run(self, profile_id):
+        try:
+            assess_profile(profile_id)
+        except Exception as e:
+            logger.error(f"Error assessing profile {profile_id}: {e}", exc_info=True)
+        finally:
+            connections.close_all()
+
+
+class DatabaseAssessmentQueue(BaseAssessmentQueue):
+    """
+    Durable backend: marks are PendingRiskAssessment rows, drained by the
+    process_risk_assessments management command
+    """
+
+    def enqueue(self, profile_id):
+        due_at = timezone.now() + timedelta(seconds=self.debounce_seconds)
+        # A repeat mark is a single UPDATE; only the first one inserts
+        if PendingRiskAssessment.objects.filter(profile_id=profile_id).update(due_at=due_at):
+            return
+        try:
+            with transaction.atomic():
+                PendingRiskAssessment.objects.create(profile_id=profile_id, due_at=due_at)
+        except IntegrityError:
+            # Another process inserted the mark first
+            PendingRiskAssessment.objects.filter(profile_id=profile_id).update(due_at=due_at)
+
+    def drain(self, limit=100):
+        """
+        Assess up to `limit` profiles whose debounce window has passed
+        A row is claimed by deleting it, so concurrent workers never score the
+        same mark twice, and a mark pushed back by a later change since it was
+        read is left for its new due_at. Returns the number of profiles processed.
+        """
+        due = list(
+            PendingRiskAssessment.objects
+            .filter(due_at__lte=timezone.now())
+            .values_list('profile_id', 'due_at')[:limit]
+        )
+        processed = 0
+        for profile_id, due_at in due:
+            claimed, _ = PendingRiskAssessment.objects.filter(profile_id=profile_id, due_at=due_at).delete()
+            if not claimed:
+                continue
+            try:
+                assess_profile(profile_id)
+            except Exception as e:
+                logger.error(f"Error assessing profile {profile_id}: {e}", exc_info=True)
+            processed += 1
+        return processed
+
+
+_queue = None
+
+
+def get_assessment_queue():
+    """Return the backend configured by settings.RISK_ASSESSMENT_QUEUE"""
+    global _queue
+    if _queue is None:
+        config = getattr(settings, 'RISK_ASSESSMENT_QUEUE', DEFAULT_QUEUE)
+        backend = import_string(config.get('BACKEND', DEFAULT_QUEUE['BACKEND']))
+        _queue = backend(**config.get('OPTIONS', {}))
+    return _queue
+
+
+@receiver(setting_changed)
+def reset_assessment_queue(setting, **kwargs):
+    global _queue
+    if setting == 'RISK_ASSESSMENT_QUEUE':
+        _queue = None
@@ -0,0 +1,387 @@
+# FinancialProfile/benchmarks.py
+
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from users.authentication import ProfileRefreshToken
+
+from .models import (
+    FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory, RiskSummaryTemplate,
+)
+from .money import MONTHLY_RATES, monthly_amount, total_monthly
+from .risk_calculator import FinancialSnapshot
+from .distribution import rebuild_score_distribution
+from .rollups import rebuild_rollups
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Requests sent by a staff user rather than the seeded profile owner
+STAFF_ENDPOINTS = {'profile-list-staff'}
+
+# Queries allowed per request; a request over budget fails the benchmark.
+# Budgets must not depend on the seeded scale, so an N+1 shows up as a failure.
+DEFAULT_QUERY_BUDGETS = {
+    'profile-detail': 7,
+    'profile-list': 2,
+    'profile-list-staff': 1,
+    'income-list': 3,
+    'income-detail': 2,
+    'income-create': 8,
+    'income-update': 6,
+    'expense-list': 3,
+    'expense-detail': 2,
+    'debt-list': 3,
+    'debt-detail': 2,
+    'asset-list': 3,
+    'asset-detail': 2,
+    'risk-assessment-list': 3,
+    'risk-assessment-detail': 2,
+    'financial-summary': 3,
+    'bulk-create': 10,
+    'import': 11,
+    'calculate-risk-assessment': 6,
+    'risk-trend': 1,
+    'simulate': 5,
+    'debt-payoff': 2,
+    'stress-test': 5,
+    'score-percentile': 2,
+    'users-register': 8,
+    'users-login': 2,
+    'users-profile': 1,
+    'users-token-refresh': 1,
+    'users-token-verify': 0,
+}
+
+
+def seed_profiles(profiles=10, items_per_type=10, assessments_per_profile=5, seed=0):
+    """
+    Create synthetic users with complete financial profiles
+    Everything is inserted with bulk_create; returns the list of users.
+    """
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    password = make_password(BENCHMARK_PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f'bench-{run}-{index}', email=f'bench-{run}-{index}@example.com', password=password)
+        for index in range(profiles)
+    ])
+    if not all(user.pk for user in users):
+        users = list(User.objects.filter(username__startswith=f'bench-{run}-').order_by('pk'))
+    profile_objects = FinancialProfile.objects.bulk_create([FinancialProfile(user=user) for user in users])
+    if not all(profile.pk for profile in profile_objects):
+        profile_objects = list(FinancialProfile.objects.filter(user__in=users).order_by('user_id'))
+
+    def money(upper):
+        return Decimal(rng.randint(100, upper * 100)) / 100
+
+    template = RiskSummaryTemplate.intern('Seeded benchmark assessment.')
+    incomes, expenses, debts, assets, assessments = [], [], [], [], []
+    for profile in profile_objects:
+        for index in range(items_per_type):
+            incomes.append(Income(
+                profile=profile, source_name=f'Income {index}', amount=money(5000),
+                frequency=rng.choice(Income.FREQUENCY_CHOICES)[0],
+            ))
+            expenses.append(Expense(
+                profile=profile, category=rng.choice(Expense.CATEGORY_CHOICES)[0], amount=money(1500),
+                frequency=rng.choice(Expense.FREQUENCY_CHOICES)[0],
+            ))
+            total = money(50000)
+            debts.append(Debt(
+                profile=profile, debt_name=f'Debt {index}', debt_type=rng.choice(Debt.DEBT_TYPE_CHOICES)[0],
+                total_amount=total, remaining_balance=(total * Decimal(rng.random())).quantize(Decimal('0.01')),
+                minimum_amount=money(800), interest_rate=Decimal(rng.randint(0, 3000)) / 100,
+            ))
+            assets.append(Asset(
+                profile=profile, asset_name=f'Asset {index}', asset_type=rng.choice(Asset.ASSET_TYPE_CHOICES)[0],
+                value=money(40000),
+            ))
+        for _ in range(assessments_per_profile):
+            score = rng.randint(0, 100)
+            assessments.append(RiskAssessmentHistory(
+                profile=profile, score=score, risk_level=RiskAssessmentHistory.risk_level_for_score(score),
+                summary_template=template,
+            ))
+
+    for model, objects in ((Income, incomes), (Expense, expenses), (Debt, debts),
+                           (Asset, assets), (RiskAssessmentHistory, assessments)):
+        model.objects.bulk_create(objects, batch_size=1000)
+    seeded = FinancialProfile.objects.filter(user__in=users)
+    rebuild_rollups(seeded)
+    seeded.refresh_latest_assessments()
+    rebuild_score_distribution()
+    return users
+
+
+def benchmark_requests(user):
+    """
+    The requests exercised for every route in FinancialProfile/urls.py and
+    users/urls.py, as (name, method, path, body, content type) tuples
+    """
+    profile = user.financial_profile
+    refresh = ProfileRefreshToken.for_user(user)
+
+    def first(model):
+        return model.objects.filter(profile=profile).values_list('pk', flat=True).first()
+
+    def line_items(count):
+        return {
+            'incomes': [{'source_name': f'Bulk {n}', 'amount': '100.00', 'frequency': 'monthly'} for n in range(count)],
+            'expenses': [{'category': 'food', 'amount': '25.00', 'frequency': 'weekly'} for n in range(count)],
+        }
+
+    ndjson = '\n'.join(
+        json.dumps({'type': 'expense', 'category': 'utilities', 'amount': '40.00', 'frequency': 'monthly'})
+        for _ in range(10)
+    )
+
+    return [
+        ('profile-detail', 'get', reverse('financial-profile-detail'), None, None),
+        ('profile-list', 'get', reverse('financial-profile-list'), None, None),
+        ('profile-list-staff', 'get',
+         reverse('financial-profile-list') + '?ordering=-net_worth&min_score=0&risk_level=moderate,high',
+         None, None),
+        ('income-list', 'get', reverse('income-list'), None, None),
+        ('income-detail', 'get', reverse('income-detail', args=[first(Income)]), None, None),
+        ('income-create', 'post', reverse('income-list'),
+         {'source_name': 'Freelance', 'amount': '250.00', 'frequency': 'monthly'}, 'application/json'),
+        ('income-update', 'patch', reverse('income-detail', args=[first(Income)]),
+         {'amount': '300.00'}, 'application/json'),
+        ('expense-list', 'get', reverse('expense-list'), None, None),
+        ('expense-detail', 'get', reverse('expense-detail', args=[first(Expense)]), None, None),
+        ('debt-list', 'get', reverse('debt-list'), None, None),
+        ('debt-detail', 'get', reverse('debt-detail', args=[first(Debt)]), None, None),
+        ('asset-list', 'get', reverse('asset-list'), None, None),
+        ('asset-detail', 'get', reverse('asset-detail', args=[first(Asset)]), None, None),
+        ('risk-assessment-list', 'get', reverse('risk-assessment-list'), None, None),
+        ('risk-assessment-detail', 'get',
+         reverse('risk-assessment-detail', args=[first(RiskAssessmentHistory)]), None, None),
+        ('financial-summary', 'get', reverse('financial-summary'), None, None),
+        ('bulk-create', 'post', reverse('bulk-create-financial-data'), line_items(10), 'application/json'),
+        ('import', 'post', reverse('import-financial-data'), ndjson, 'application/x-ndjson'),
+        ('calculate-risk-assessment', 'post', reverse('calculate-risk-assessment'), None, None),
+        ('risk-trend', 'get', reverse('risk-trend') + '?bucket=day&window=7', None, None),
+        ('debt-payoff', 'get', reverse('debt-payoff') + '?strategy=avalanche&extra_payment=200', None, None),
+        ('stress-test', 'get', reverse('stress-test') + '?paths=10000&months=36', None, None),
+        ('score-percentile', 'get', reverse('score-percentile'), None, None),
+        ('simulate', 'post', reverse('simulate'), {'scenarios': [
+            {'name': f'Pay down debt {n}', 'changes': [
+                {'action': 'edit', 'type': 'debt', 'id': first(Debt), 'data': {'remaining_balance': f'{n * 10}.00'}},
+                {'action': 'add', 'type': 'income', 'data': {
+                    'source_name': 'Side job', 'amount': f'{n * 50 + 50}.00', 'frequency': 'monthly',
+                }},
+            ]}
+            for n in range(100)
+        ]}, 'application/json'),
+        ('users-register', 'post', reverse('users:register'), lambda: {
+            'username': f'bench-new-{uuid.uuid4().hex[:12]}', 'email': 'new@example.com',
+            'password': BENCHMARK_PASSWORD, 'password_confirm': BENCHMARK_PASSWORD,
+        }, 'application/json'),
+        ('users-login', 'post', reverse('users:login'),
+         {'username': user.username, 'password': BENCHMARK_PASSWORD}, 'application/json'),
+        ('users-profile', 'get', reverse('users:profile'), None, None),
+        ('users-token-refresh', 'post', reverse('users:token_refresh'),
+         lambda: {'refresh': str(ProfileRefreshToken.for_user(user))}, 'application/json'),
+        ('users-token-verify', 'post', reverse('users:token_verify'),
+         {'token': str(refresh.access_token)}, 'application/json'),
+    ]
+
+
+def _send(client, method, path, body, content_type):
+    if callable(body):
+        body = body()
+    if body is None:
+        return getattr(client, method)(path)
+    if content_type == 'application/json':
+        body = json.dumps(body)
+    return getattr(client, method)(path, body, content_type=content_type)
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    position = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[position]
+
+
+def _token_client(user):
+    """A client authenticating as `user` with a bearer token, as API clients do"""
+    return Client(headers={'Authorization': f'Bearer {ProfileRefreshToken.for_user(user).access_token}'})
+
+
+def run_benchmarks(user, iterations=20, only=None):
+    """
+    Time every benchmark request for `user`
+    Returns endpoint name -> {method, path, status, queries, p50_ms, p95_ms, peak_kib}.
+    Risk assessments go to the database queue so writes measure only the request path.
+    """
+    client = _token_client(user)
+    staff_client = _token_client(User.objects.create(username=f'bench-staff-{uuid.uuid4().hex[:8]}', is_staff=True))
+    results = {}
+    queue = {'BACKEND': 'FinancialProfile.assessment_queue.DatabaseAssessmentQueue'}
+
+    with override_settings(RISK_ASSESSMENT_QUEUE=queue):
+        for name, method, path, body, content_type in benchmark_requests(user):
+            if only and name not in only:
+                continue
+            sender = staff_client if name in STAFF_ENDPOINTS else client
+            timings, query_counts = [], []
+            for _ in range(iterations):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = _send(sender, method, path, body, content_type)
+                    timings.append((time.perf_counter() - started) * 1000)
+                query_counts.append(len(queries))
+
+            # Measured separately because tracing slows every allocation down
+            tracemalloc.start()
+            _send(sender, method, path, body, content_type)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = {
+                'method': method.upper(),
+                'path': path,
+                'status': response.status_code,
+                'queries': max(query_counts),
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(_percentile(timings, 95), 3),
+                'peak_kib': round(peak / 1024, 1),
+            }
+    return results
+
+
+def check_query_budgets(results, budgets=None):
+    """Return a list of (endpoint, queries, budget) for endpoints over budget"""
+    budgets = DEFAULT_QUERY_BUDGETS if budgets is None else budgets
+    return [
+        (name, result['queries'], budgets[name])
+        for name, result in results.items()
+        if name in budgets and result['queries'] > budgets[name]
+    ]
+
+
+def benchmark_money_math(rows=100000, repeat=5, seed=0):
+    """
+    Per-row cost in nanoseconds of each Python path normalising amounts to monthly
+    Runs over unsaved incomes spread across every frequency and reports the
+    best of `repeat` runs, so no database is needed.
+    """
+    rng = random.Random(seed)
+    frequencies = list(MONTHLY_RATES)
+    incomes = [
+        Income(amount=Decimal(rng.randint(1, 1000000)) / 100, frequency=rng.choice(frequencies))
+        for _ in range(rows)
+    ]
+    pairs = [(income.amount, income.frequency) for income in incomes]
+    paths = {
+        'monthly_amount': lambda: [monthly_amount(amount, frequency) for amount, frequency in pairs],
+        'total_monthly': lambda: total_monthly(incomes),
+        'Income.get_monthly_amount': lambda: [income.get_monthly_amount() for income in incomes],
+        'FinancialSnapshot': lambda: FinancialSnapshot(incomes=incomes),
+    }
+
+    results = {}
+    for name, path in paths.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            path()
+            timings.append(time.perf_counter_ns() - started)
+        results[name] = round(min(timings) / rows, 1)
+    return results
+
+
+# Django handlers the load test drives the views through
+LOAD_TEST_MODES = ('wsgi', 'asgi')
+
+# URL names of the read-heavy endpoints the load test requests
+LOAD_TEST_ENDPOINTS = (
+    'financial-profile-detail',
+    'income-list',
+    'expense-list',
+    'debt-list',
+    'asset-list',
+    'risk-assessment-list',
+    'financial-summary',
+)
+
+
+def _load_test_summary(timings, errors, elapsed):
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+    }
+
+
+def _wsgi_load(paths, headers, concurrency):
+    """Send every (path, client index) with one thread per concurrent client"""
+    def send(job):
+        path, client = job
+        started = time.perf_counter()
+        response = Client().get(path, headers=headers[client])
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(send, paths))
+
+
+async def _asgi_load(paths, headers, concurrency):
+    """Send every (path, client index) with one task per concurrent client"""
+    jobs = iter(paths)
+    results = []
+
+    async def worker():
+        for path, client in jobs:
+            started = time.perf_counter()
+            response = await AsyncClient().get(path, headers=headers[client])
+            results.append(((time.perf_counter() - started) * 1000, response.status_code))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def run_load_test(users, requests_per_endpoint=200, concurrency=16, modes=None, only=None):
+    """
+    Load-test the LOAD_TEST_ENDPOINTS with concurrent clients
+    Each handler in LOAD_TEST_MODES sends requests_per_endpoint GETs per endpoint,
+    spread over `users` and authenticated with JWT like a mobile client.
+    Returns mode -> endpoint -> {requests, errors, rps, p50_ms, p95_ms}.
+    """
+    headers = [{'Authorization': f'Bearer {ProfileRefreshToken.for_user(user).access_token}'} for user in users]
+    results = {}
+    for mode in modes or LOAD_TEST_MODES:
+        results[mode] = {}
+        for name in LOAD_TEST_ENDPOINTS:
+            if only and name not in only:
+                continue
+            jobs = [(reverse(name), index % len(users)) for index in range(requests_per_endpoint)]
+            started = time.perf_counter()
+            if mode == 'wsgi':
+                responses = _wsgi_load(jobs, headers, concurrency)
+            else:
+                responses = asyncio.run(_asgi_load(jobs, headers, concurrency))
+            elapsed = time.perf_counter() - started
+            results[mode][name] = _load_test_summary(
+                [timing for timing, _ in responses],
+                sum(status_code != 200 for _, status_code in responses),
+                elapsed,
+            )
+    return results
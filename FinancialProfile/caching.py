@@ -0,0 +1,88 @@
+# FinancialProfile/caching.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import quote_etag
+
+from .models import FinancialProfile
+
+DEFAULT_FINANCIAL_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+
+def _config():
+    return {**DEFAULT_FINANCIAL_CACHE, **getattr(settings, 'FINANCIAL_CACHE', {})}
+
+
+def get_financial_cache():
+    """The cache configured by settings.FINANCIAL_CACHE['ALIAS']"""
+    return caches[_config()['ALIAS']]
+
+
+def _user_profile_key(user_id):
+    return f'financial:user:{user_id}:profile'
+
+
+def _entry_key(name, profile_id):
+    return f'financial:profile:{profile_id}:{name}'
+
+
+def get_profile_validators(profile_id, version, *representation):
+    """
+    Strong ETag and Last-Modified timestamp for a response built from a profile's data
+    `version` is the profile's (data_version, updated_at), as stored on its
+    row; `representation` tells apart the responses of one profile (path,
+    media type).
+    """
+    data_version, updated_at = version
+    digest = hashlib.sha256(repr((profile_id, str(data_version), *representation)).encode()).hexdigest()
+    return quote_etag(digest[:32]), int(updated_at.timestamp())
+
+
+def get_profile_id_for_user(user):
+    """The id of the user's FinancialProfile (cached; the link never changes), or None"""
+    # Users authenticated by a token carry the id in its claims
+    profile_id = getattr(user, 'financial_profile_id', None)
+    if profile_id is not None:
+        return profile_id
+    cache = get_financial_cache()
+    profile_id = cache.get(_user_profile_key(user.pk))
+    if profile_id is None:
+        profile_id = FinancialProfile.objects.filter(user=user).values_list('pk', flat=True).first()
+        if profile_id is not None:
+            cache.set(_user_profile_key(user.pk), profile_id, timeout=None)
+    return profile_id
+
+
+def forget_user_profile(user_id):
+    get_financial_cache().delete(_user_profile_key(user_id))
+
+
+def find_cached_entry(name, profile_id, data_version):
+    """A profile's entry cached for its current data_version, or None"""
+    found = get_financial_cache().get(_entry_key(name, profile_id))
+    if found is not None and found[0] == data_version:
+        return found[1]
+    return None
+
+
+def store_cached_entry(name, profile_id, data_version, value):
+    get_financial_cache().set(_entry_key(name, profile_id), (data_version, value), timeout=_config()['TIMEOUT'])
+
+
+def get_cached_entry(name, profile_id, data_version, build):
+    """
+    Return `build()` for a profile, cached until its data version changes
+    A hit costs one cache round trip. The version is read from the profile's
+    row by the caller, so a write committed in another process is never
+    hidden by this one's cache.
+    """
+    value = find_cached_entry(name, profile_id, data_version)
+    if value is None:
+        value = build()
+        store_cached_entry(name, profile_id, data_version, value)
+    return value
@@ -0,0 +1,164 @@
+# FinancialProfile/compaction.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import FinancialProfile, RiskAssessmentHistory, RiskHistoryBucket, RiskSummaryTemplate
+
+DEFAULT_RETENTION = {
+    # Assessments newer than this are kept row by row
+    'FULL_RESOLUTION_DAYS': 30,
+    # Daily buckets newer than this are kept; older ones are merged into weeks
+    'DAILY_BUCKET_DAYS': 365,
+}
+
+
+def get_retention():
+    """settings.RISK_HISTORY_RETENTION over the defaults"""
+    return {**DEFAULT_RETENTION, **getattr(settings, 'RISK_HISTORY_RETENTION', {})}
+
+
+def _intern_summaries(rows):
+    """
+    Point assessments still holding summary text at interned templates
+    Returns the rows changed, which are left unsaved.
+    """
+    legacy = [row for row in rows if row.summary_text is not None]
+    if legacy:
+        templates = RiskSummaryTemplate.intern_many(row.summary_text for row in legacy)
+        for row in legacy:
+            row.summary_template = templates[row.summary_text]
+            row.summary_text = None
+    return legacy
+
+
+def intern_legacy_summaries(batch_size=1000, max_batches=None):
+    """
+    Move summary text stored on assessment rows into RiskSummaryTemplate
+    Returns the number of assessments updated.
+    """
+    legacy = RiskAssessmentHistory.objects.filter(summary_text__isnull=False).order_by('pk')
+    updated = batches = 0
+    last_pk = 0
+    while max_batches is None or batches < max_batches:
+        rows = list(legacy.filter(pk__gt=last_pk).only('pk', 'summary_text')[:batch_size])
+        if not rows:
+            break
+        RiskAssessmentHistory.objects.bulk_update(_intern_summaries(rows), ['summary_template', 'summary_text'])
+        updated += len(rows)
+        batches += 1
+        last_pk = rows[-1].pk
+    return updated
+
+
+def _fold_into_buckets(buckets, period):
+    """
+    Merge chronologically ordered buckets of `period` into the stored ones,
+    creating those that don't exist yet
+    """
+    merged = {}
+    for bucket in buckets:
+        key = (bucket.profile_id, bucket.period_start)
+        if key in merged:
+            merged[key].merge(bucket)
+        else:
+            merged[key] = bucket
+
+    stored = {
+        (bucket.profile_id, bucket.period_start): bucket
+        for bucket in RiskHistoryBucket.objects.filter(
+            period=period,
+            profile_id__in={profile_id for profile_id, _ in merged},
+            period_start__in={period_start for _, period_start in merged},
+        )
+    }
+    to_create, to_update = [], []
+    for key, bucket in merged.items():
+        if key in stored:
+            stored[key].merge(bucket)
+            to_update.append(stored[key])
+        else:
+            to_create.append(bucket)
+    RiskHistoryBucket.objects.bulk_create(to_create)
+    RiskHistoryBucket.objects.bulk_update(to_update, RiskHistoryBucket.MERGED_FIELDS)
+
+
+def compact_assessments(before, batch_size=1000, max_batches=None):
+    """
+    Fold assessments older than `before` into daily buckets and delete them
+    A profile's latest_assessment is never removed. Rows are taken oldest
+    first per profile, so every bucket only ever absorbs later history.
+    Summary text left on a row is interned before the row is deleted.
+    Returns the number of assessments compacted.
+    """
+    is_latest = FinancialProfile.objects.filter(latest_assessment=OuterRef('pk'))
+    candidates = (
+        RiskAssessmentHistory.objects
+        .filter(assessment_date__lt=before)
+        .exclude(Exists(is_latest))
+        .order_by('profile_id', 'assessment_date', 'pk')
+    )
+    compacted = batches = 0
+    from_profile = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(candidates.filter(profile_id__gte=from_profile)[:batch_size])
+            if not rows:
+                break
+            # intern_legacy_summaries may not have reached these rows yet
+            _intern_summaries(rows)
+            _fold_into_buckets(
+                (RiskHistoryBucket.from_assessment(row, RiskHistoryBucket.DAY) for row in rows),
+                RiskHistoryBucket.DAY,
+            )
+            RiskAssessmentHistory.objects.filter(pk__in=[row.pk for row in rows]).delete_compacted()
+            FinancialProfile.objects.filter(pk__in={row.profile_id for row in rows}).touch()
+        compacted += len(rows)
+        batches += 1
+        from_profile = rows[-1].profile_id
+    return compacted
+
+
+def compact_daily_buckets(before, batch_size=1000, max_batches=None):
+    """
+    Merge daily buckets starting before the date `before` into weekly buckets
+    Returns the number of daily buckets merged.
+    """
+    candidates = (
+        RiskHistoryBucket.objects
+        .filter(period=RiskHistoryBucket.DAY, period_start__lt=before)
+        .order_by('profile_id', 'period_start')
+    )
+    compacted = batches = 0
+    from_profile = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            days = list(candidates.filter(profile_id__gte=from_profile)[:batch_size])
+            if not days:
+                break
+            _fold_into_buckets((day.rebucket(RiskHistoryBucket.WEEK) for day in days), RiskHistoryBucket.WEEK)
+            RiskHistoryBucket.objects.filter(pk__in=[day.pk for day in days]).delete()
+        compacted += len(days)
+        batches += 1
+        from_profile = days[-1].profile_id
+    return compacted
+
+
+def compact_risk_history(now=None, batch_size=1000, max_batches=None, retention=None):
+    """
+    Run every compaction stage once, each limited to max_batches batches
+    Returns the number of rows handled by each stage.
+    """
+    now = now or timezone.now()
+    retention = {**get_retention(), **(retention or {})}
+    assessment_cutoff = now - timedelta(days=retention['FULL_RESOLUTION_DAYS'])
+    daily_cutoff = timezone.localtime(now).date() - timedelta(days=retention['DAILY_BUCKET_DAYS'])
+    return {
+        'summaries_interned': intern_legacy_summaries(batch_size, max_batches),
+        'assessments_compacted': compact_assessments(assessment_cutoff, batch_size, max_batches),
+        'daily_buckets_compacted': compact_daily_buckets(daily_cutoff, batch_size, max_batches),
+    }
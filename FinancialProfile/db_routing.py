@@ -0,0 +1,184 @@
+# FinancialProfile/db_routing.py
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger('financial_risk.db_routing')
+
+DEFAULT_DATABASE_ROUTING = {
+    # Replica aliases; None means every DATABASES alias starting with "replica"
+    'REPLICAS': None,
+    # Views whose GET requests may read from a replica, by module
+    'READ_VIEW_MODULES': ['FinancialProfile.views', 'users.views'],
+    # After a write, the user's reads stay on the primary for this long
+    'READ_YOUR_WRITES_SECONDS': 5,
+    # Cache alias recording recent writers, shared by every process
+    'CACHE': 'default',
+    # Seconds a replica's health check result is trusted
+    'HEALTH_CHECK_INTERVAL': 10,
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current_request = ContextVar('database_routing_request', default=None)
+
+# Replica alias -> (monotonic time checked, healthy), per process
+_replica_health = {}
+
+
+def _config():
+    return {**DEFAULT_DATABASE_ROUTING, **getattr(settings, 'DATABASE_ROUTING', {})}
+
+
+def replica_aliases():
+    replicas = _config()['REPLICAS']
+    if replicas is None:
+        replicas = [alias for alias in settings.DATABASES if alias.startswith('replica')]
+    return list(replicas)
+
+
+def _pin_key(user_id):
+    return f'database:pin-primary:{user_id}'
+
+
+def remember_write(user_id):
+    """Keep a user's reads on the primary for the read-your-writes window"""
+    config = _config()
+    caches[config['CACHE']].set(_pin_key(user_id), True, config['READ_YOUR_WRITES_SECONDS'])
+
+
+def replica_is_healthy(alias):
+    """
+    Whether a replica accepts connections, checked at most once per
+    HEALTH_CHECK_INTERVAL in each process
+    """
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < _config()['HEALTH_CHECK_INTERVAL']:
+        return healthy
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except (ConnectionDoesNotExist, DatabaseError):
+        healthy = False
+    if not healthy:
+        logger.warning("Database replica %s failed its health check; reading from the primary", alias)
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def _authenticated_user_id(request):
+    """The request's user id once authentication has run, without triggering it"""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is None:
+        return None
+    return user.pk if user.is_authenticated else False
+
+
+def read_database():
+    """
+    The alias the current request should read from, or None for the primary
+    Replicas serve the safe requests marked by DatabaseRoutingMiddleware once
+    the user is known. Reads stay on the primary while authentication runs
+    and for READ_YOUR_WRITES_SECONDS after the user's last write.
+    """
+    request = _current_request.get()
+    if request is None or not getattr(request, 'reads_from_replica', False):
+        return None
+    user_id = _authenticated_user_id(request)
+    if user_id is None:
+        return None
+    if user_id and not hasattr(request, 'database_pinned'):
+        config = _config()
+        request.database_pinned = bool(caches[config['CACHE']].get(_pin_key(user_id)))
+    if getattr(request, 'database_pinned', False):
+        return None
+    healthy = [alias for alias in replica_aliases() if replica_is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+@contextmanager
+def routing_request(request):
+    """Route the queries run inside the block for `request`"""
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads of API GET requests to a healthy replica and everything else
+    to the primary
+    Replicas are expected to hold the same data, so relations across aliases
+    are allowed and migrations run on the primary only.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Make the current request visible to ReplicaRouter, mark safe requests to
+    the READ_VIEW_MODULES views as replica reads, and start the
+    read-your-writes window after a user's successful write
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_request(request):
+            response = self.get_response(request)
+        self._after_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with routing_request(request):
+            response = await self.get_response(request)
+        self._after_response(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.reads_from_replica = (
+            request.method in SAFE_METHODS
+            and getattr(view_func, '__module__', None) in _config()['READ_VIEW_MODULES']
+        )
+
+    def _after_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user_id = _authenticated_user_id(request)
+            if user_id:
+                remember_write(user_id)
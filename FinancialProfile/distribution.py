@@ -0,0 +1,158 @@
+# FinancialProfile/distribution.py
+
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import FinancialProfile, ScoreDistribution
+
+MAX_SCORE = 100
+ALL_COHORT = 'all'
+UNKNOWN_AGE_COHORT = 'age:unknown'
+
+# Minimum age -> cohort, oldest band first
+AGE_BANDS = [
+    (65, 'age:65-plus'),
+    (55, 'age:55-64'),
+    (45, 'age:45-54'),
+    (35, 'age:35-44'),
+    (25, 'age:25-34'),
+    (0, 'age:under-25'),
+]
+
+COHORTS = [ALL_COHORT, *(cohort for _, cohort in reversed(AGE_BANDS)), UNKNOWN_AGE_COHORT]
+
+
+def _years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 February
+        return today.replace(year=today.year - years, day=28)
+
+
+def age_cohort(date_of_birth, today=None):
+    """Age band cohort of a user born on date_of_birth"""
+    if date_of_birth is None:
+        return UNKNOWN_AGE_COHORT
+    today = today or timezone.localdate()
+    for age, cohort in AGE_BANDS:
+        if date_of_birth <= _years_ago(today, age):
+            return cohort
+    return AGE_BANDS[-1][1]
+
+
+def cohorts_for(date_of_birth, today=None):
+    """Every cohort a profile's score counts towards"""
+    return [ALL_COHORT, age_cohort(date_of_birth, today)]
+
+
+def age_cohort_expression(date_of_birth='user__date_of_birth', today=None):
+    """SQL equivalent of age_cohort for a profile's date_of_birth column"""
+    today = today or timezone.localdate()
+    return Case(
+        When(**{f'{date_of_birth}__isnull': True}, then=Value(UNKNOWN_AGE_COHORT)),
+        *(
+            When(**{f'{date_of_birth}__lte': _years_ago(today, age)}, then=Value(cohort))
+            for age, cohort in AGE_BANDS
+        ),
+        default=Value(AGE_BANDS[-1][1]),
+    )
+
+
+def score_distribution_rows(profiles, today=None):
+    """
+    Histogram rows for every cohort and score from the latest assessments of
+    `profiles`, counted by one grouped query
+    Returns dicts of cohort, score and profiles.
+    """
+    counts = defaultdict(lambda: [0] * (MAX_SCORE + 1))
+    grouped = (
+        profiles
+        .filter(latest_assessment__isnull=False)
+        .order_by()
+        .values(cohort=age_cohort_expression(today=today), score=F('latest_assessment__score'))
+        .annotate(profiles=Count('pk'))
+    )
+    for row in grouped:
+        score = min(MAX_SCORE, max(0, row['score']))
+        counts[ALL_COHORT][score] += row['profiles']
+        counts[row['cohort']][score] += row['profiles']
+
+    return [
+        {'cohort': cohort, 'score': score, 'profiles': count}
+        for cohort in COHORTS
+        for score, count in enumerate(counts[cohort])
+    ]
+
+
+def rebuild_score_distribution(profiles=None):
+    """
+    Replace the score distribution index with counts from the latest assessments
+    Also corrects drift from users moving between age bands since the last
+    rebuild. Returns the number of profiles indexed.
+    """
+    if profiles is None:
+        profiles = FinancialProfile.objects.all()
+    rows = score_distribution_rows(profiles)
+    with transaction.atomic():
+        ScoreDistribution.objects.all().delete()
+        ScoreDistribution.objects.bulk_create(ScoreDistribution(**row) for row in rows)
+    return sum(row['profiles'] for row in rows if row['cohort'] == ALL_COHORT)
+
+
+def record_score_changes(changes):
+    """
+    Move profiles between scores in the distribution index
+    `changes` holds (cohorts, old score or None, new score or None) per
+    profile. Deltas are summed first and written by one UPDATE that touches
+    only the (cohort, score) rows whose count changes.
+    """
+    deltas = defaultdict(int)
+    for cohorts, old_score, new_score in changes:
+        for cohort in cohorts:
+            for score, delta in ((old_score, -1), (new_score, 1)):
+                if score is not None:
+                    deltas[cohort, min(MAX_SCORE, max(0, score))] += delta
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    ScoreDistribution.objects.filter(
+        reduce(or_, (Q(cohort=cohort, score=score) for cohort, score in deltas))
+    ).update(profiles=F('profiles') + Case(
+        *(When(cohort=cohort, score=score, then=Value(delta)) for (cohort, score), delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+def score_percentiles(score, cohorts):
+    """
+    Share of each cohort's profiles with a lower (less risky) score
+    Sums each cohort's histogram in one query. Cohorts with no indexed
+    profiles report a percentage of None.
+    """
+    score = min(MAX_SCORE, max(0, score))
+    totals = {
+        row['cohort']: row
+        for row in (
+            ScoreDistribution.objects
+            .filter(cohort__in=cohorts)
+            .order_by()
+            .values('cohort')
+            .annotate(total=Sum('profiles'), below=Sum('profiles', filter=Q(score__lt=score)))
+        )
+    }
+    percentiles = []
+    for cohort in cohorts:
+        row = totals.get(cohort, {})
+        total, below = row.get('total') or 0, row.get('below') or 0
+        percentiles.append({
+            'cohort': cohort,
+            'profiles': total,
+            'riskier_than_percent': round(below * 100 / total, 1) if total > 0 else None,
+        })
+    return percentiles
@@ -0,0 +1,152 @@
+# FinancialProfile/ingest.py
+
+import csv
+import json
+
+from django.db import transaction
+
+from .assessment_queue import get_assessment_queue
+from .models import FinancialProfile
+from .rollups import rebuild_rollups
+from .serializers import (
+    IncomeCreateSerializer, ExpenseCreateSerializer,
+    DebtCreateSerializer, AssetCreateSerializer,
+)
+
+
+# Payload key -> (create serializer, label used in error reports)
+LINE_ITEM_SERIALIZERS = {
+    'incomes': (IncomeCreateSerializer, 'income'),
+    'expenses': (ExpenseCreateSerializer, 'expense'),
+    'debts': (DebtCreateSerializer, 'debt'),
+    'assets': (AssetCreateSerializer, 'asset'),
+}
+
+
+def finish_bulk_ingest(profile_id):
+    """
+    Bring a profile up to date after line items were inserted with bulk_create
+    Bulk inserts send no save signals, so the rollup is rebuilt and the data
+    version replaced here, and a single risk assessment is queued once
+    the transaction commits.
+    """
+    profile = FinancialProfile.objects.filter(pk=profile_id)
+    rebuild_rollups(profile)
+    profile.touch()
+    transaction.on_commit(lambda: get_assessment_queue().enqueue(profile_id))
+
+
+# Accepted `type` values on imported rows -> LINE_ITEM_SERIALIZERS key
+IMPORT_ROW_TYPES = {
+    **{key: key for key in LINE_ITEM_SERIALIZERS},
+    **{label: key for key, (_, label) in LINE_ITEM_SERIALIZERS.items()},
+}
+
+
+def iter_decoded_lines(stream, encoding='utf-8'):
+    """Yield text lines from a binary stream without reading it all into memory"""
+    first = True
+    for raw in stream:
+        line = raw.decode(encoding)
+        if first:
+            line = line.lstrip('﻿')
+            first = False
+        yield line
+
+
+def iter_ndjson_rows(lines):
+    """Yield (line_number, row) for newline-delimited JSON; row is None when unparseable"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def iter_csv_rows(lines):
+    """Yield (line_number, row) for CSV with a header row; empty cells are dropped"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {
+            column: value for column, value in row.items()
+            if column is not None and value not in (None, '')
+        }
+
+
+class LineItemImporter:
+    """
+    Validates imported rows one at a time and writes them in fixed-size batches
+    At most `batch_size` rows are buffered and `max_errors` errors kept, so
+    memory stays bounded however large the upload is.
+    """
+
+    def __init__(self, profile, default_type=None, batch_size=500, max_errors=1000):
+        self.profile = profile
+        self.default_type = default_type
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.rows_read = 0
+        self.created = {key: 0 for key in LINE_ITEM_SERIALIZERS}
+        self.error_count = 0
+        self.errors = []
+        self._pending = {key: [] for key in LINE_ITEM_SERIALIZERS}
+        self._pending_count = 0
+
+    def add(self, line_number, row):
+        """Validate one row and buffer it for insertion"""
+        self.rows_read += 1
+        if not isinstance(row, dict):
+            self._add_error(line_number, None, {'non_field_errors': ['Row must be a JSON object.']})
+            return
+
+        row_type = row.get('type') or self.default_type
+        key = IMPORT_ROW_TYPES.get(row_type)
+        if key is None:
+            self._add_error(line_number, row_type, {
+                'type': [f'Must be one of: {", ".join(label for _, label in LINE_ITEM_SERIALIZERS.values())}.']
+            })
+            return
+
+        serializer_class, label = LINE_ITEM_SERIALIZERS[key]
+        serializer = serializer_class(data=row)
+        if not serializer.is_valid():
+            self._add_error(line_number, label, serializer.errors)
+            return
+
+        model = serializer_class.Meta.model
+        self._pending[key].append(model(profile=self.profile, **serializer.validated_data))
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered rows, one bulk_create per line-item table"""
+        if not self._pending_count:
+            return
+        with transaction.atomic():
+            for key, objects in self._pending.items():
+                if objects:
+                    objects[0].__class__.objects.bulk_create(objects)
+                    self.created[key] += len(objects)
+        self._pending = {key: [] for key in LINE_ITEM_SERIALIZERS}
+        self._pending_count = 0
+
+    def finish(self):
+        """Flush remaining rows, update the profile and return the import report"""
+        self.flush()
+        if any(self.created.values()):
+            finish_bulk_ingest(self.profile.pk)
+        return {
+            'rows_read': self.rows_read,
+            **{f'{key}_created': count for key, count in self.created.items()},
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+    def _add_error(self, line_number, row_type, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'type': row_type, 'errors': errors})
@@ -0,0 +1,73 @@
+# FinancialProfile/management/commands/benchmark_endpoints.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from FinancialProfile.benchmarks import (
+    DEFAULT_QUERY_BUDGETS, check_query_budgets, run_benchmarks, seed_profiles,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic profiles in a throwaway test database and record query count, "
+        "p50/p95 latency and peak memory for every API endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=50, help='Synthetic users to seed (default: 50)')
+        parser.add_argument('--items', type=int, default=20, help='Line items per type per profile (default: 20)')
+        parser.add_argument('--assessments', type=int, default=20, help='Risk assessments per profile (default: 20)')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests timed per endpoint (default: 20)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run the named endpoint')
+        parser.add_argument('--output', help='Write the results to this JSON file as the new baseline')
+        parser.add_argument('--budgets', help='JSON file of endpoint -> max queries overriding the defaults')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        budgets = dict(DEFAULT_QUERY_BUDGETS)
+        if options['budgets']:
+            with open(options['budgets']) as budget_file:
+                budgets.update(json.load(budget_file))
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            users = seed_profiles(options['profiles'], options['items'], options['assessments'])
+            results = run_benchmarks(users[0], iterations=options['iterations'], only=options['endpoints'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.stdout.write(f"{'endpoint':<28}{'status':>7}{'queries':>9}{'budget':>8}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28}{result['status']:>7}{result['queries']:>9}{budgets.get(name, '-'):>8}"
+                f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['peak_kib']:>10}"
+            )
+
+        if options['output']:
+            baseline = {
+                'scale': {
+                    'profiles': options['profiles'],
+                    'items_per_type': options['items'],
+                    'assessments_per_profile': options['assessments'],
+                    'iterations': options['iterations'],
+                },
+                'database': connection.vendor,
+                'endpoints': results,
+            }
+            with open(options['output'], 'w') as output_file:
+                json.dump(baseline, output_file, indent=2)
+            self.stdout.write(f"Baseline written to {options['output']}")
+
+        over_budget = check_query_budgets(results, budgets)
+        if over_budget:
+            raise CommandError('Query budget exceeded: ' + ', '.join(
+                f'{name} ran {queries} queries (budget {budget})' for name, queries, budget in over_budget
+            ))
+        self.stdout.write(self.style.SUCCESS('All endpoints within query budgets'))
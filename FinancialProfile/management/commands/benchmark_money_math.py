@@ -0,0 +1,19 @@
+# FinancialProfile/management/commands/benchmark_money_math.py
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.benchmarks import benchmark_money_math
+
+
+class Command(BaseCommand):
+    help = "Measure the per-row cost of normalising income and expense amounts to monthly"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows normalised per run (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best is kept (default: 5)')
+
+    def handle(self, *args, **options):
+        results = benchmark_money_math(rows=options['rows'], repeat=options['repeat'])
+        self.stdout.write(f"{'path':<28}{'ns/row':>10}")
+        for name, per_row in results.items():
+            self.stdout.write(f"{name:<28}{per_row:>10}")
@@ -0,0 +1,46 @@
+# FinancialProfile/management/commands/compact_risk_history.py
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.compaction import compact_risk_history, get_retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Intern legacy assessment summaries, fold assessments older than the full-resolution "
+        "window into daily buckets and merge old daily buckets into weekly ones"
+    )
+
+    def add_arguments(self, parser):
+        retention = get_retention()
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows handled per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Stop each stage after this many batches; run again to continue'
+        )
+        parser.add_argument(
+            '--full-resolution-days', type=int, default=retention['FULL_RESOLUTION_DAYS'],
+            help=f"Keep individual assessments this many days (default: {retention['FULL_RESOLUTION_DAYS']})"
+        )
+        parser.add_argument(
+            '--daily-bucket-days', type=int, default=retention['DAILY_BUCKET_DAYS'],
+            help=f"Keep daily buckets this many days before merging into weeks (default: {retention['DAILY_BUCKET_DAYS']})"
+        )
+
+    def handle(self, *args, **options):
+        results = compact_risk_history(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            retention={
+                'FULL_RESOLUTION_DAYS': options['full_resolution_days'],
+                'DAILY_BUCKET_DAYS': options['daily_bucket_days'],
+            },
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Interned {results['summaries_interned']} summaries, compacted "
+            f"{results['assessments_compacted']} assessment(s) and "
+            f"{results['daily_buckets_compacted']} daily bucket(s)"
+        ))
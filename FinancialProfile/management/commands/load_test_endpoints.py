@@ -0,0 +1,69 @@
+# FinancialProfile/management/commands/load_test_endpoints.py
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from FinancialProfile.benchmarks import LOAD_TEST_MODES, run_load_test, seed_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic profiles in a throwaway test database and compare throughput and latency "
+        "of the read endpoints served through Django's WSGI and ASGI handlers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=20, help='Synthetic users to seed (default: 20)')
+        parser.add_argument('--items', type=int, default=20, help='Line items per type per profile (default: 20)')
+        parser.add_argument('--assessments', type=int, default=20, help='Risk assessments per profile (default: 20)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default: 16)')
+        parser.add_argument('--mode', action='append', dest='modes', choices=LOAD_TEST_MODES,
+                            help='Only run the given mode (may be repeated)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run the named endpoint')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            users = seed_profiles(options['profiles'], options['items'], options['assessments'])
+            results = run_load_test(
+                users,
+                requests_per_endpoint=options['requests'],
+                concurrency=options['concurrency'],
+                modes=options['modes'],
+                only=options['endpoints'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.stdout.write(f"{'mode':<12}{'endpoint':<28}{'errors':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode, endpoints in results.items():
+            for name, result in endpoints.items():
+                self.stdout.write(
+                    f"{mode:<12}{name:<28}{result['errors']:>7}{result['rps']:>9}"
+                    f"{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                )
+
+        if options['output']:
+            report = {
+                'scale': {
+                    'profiles': options['profiles'],
+                    'items_per_type': options['items'],
+                    'assessments_per_profile': options['assessments'],
+                    'requests_per_endpoint': options['requests'],
+                    'concurrency': options['concurrency'],
+                },
+                'database': connection.vendor,
+                'results': results,
+            }
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
@@ -0,0 +1,40 @@
+# FinancialProfile/management/commands/process_risk_assessments.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.assessment_queue import DatabaseAssessmentQueue, get_assessment_queue
+
+
+class Command(BaseCommand):
+    help = "Worker that scores profiles marked dirty in the database assessment queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Maximum number of profiles assessed per poll (default: 100)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the profiles that are currently due and exit'
+        )
+
+    def handle(self, *args, **options):
+        queue = get_assessment_queue()
+        if not isinstance(queue, DatabaseAssessmentQueue):
+            queue = DatabaseAssessmentQueue()
+
+        while True:
+            processed = queue.drain(limit=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Assessed {processed} profile(s)")
+            if options['once']:
+                if processed < options['batch_size']:
+                    break
+            elif not processed:
+                time.sleep(options['poll_interval'])
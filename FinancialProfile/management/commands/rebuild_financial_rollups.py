@@ -0,0 +1,28 @@
+# FinancialProfile/management/commands/rebuild_financial_rollups.py
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.models import FinancialProfile
+from FinancialProfile.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute FinancialRollup totals from the income, expense, debt and asset tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', type=int, action='append', dest='profile_ids',
+            help='Only rebuild the given profile id (may be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of profiles aggregated per query (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = FinancialProfile.objects.all()
+        if options['profile_ids']:
+            queryset = queryset.filter(pk__in=options['profile_ids'])
+
+        rebuilt = rebuild_rollups(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} financial rollup(s)"))
@@ -0,0 +1,16 @@
+# FinancialProfile/management/commands/rebuild_score_distribution.py
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.distribution import rebuild_score_distribution
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the score distribution index behind percentile rankings from "
+        "every profile's latest risk assessment"
+    )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_score_distribution()
+        self.stdout.write(self.style.SUCCESS(f"Indexed the latest scores of {indexed} profile(s)"))
@@ -0,0 +1,42 @@
+# FinancialProfile/management/commands/rescore_all.py
+
+from django.core.management.base import BaseCommand
+
+from FinancialProfile.models import FinancialProfile
+from FinancialProfile.rescoring import rescore_all
+
+
+class Command(BaseCommand):
+    help = "Write a fresh risk assessment for every profile using the current scoring model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of profiles loaded and scored together (default: 1000)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of worker processes scoring chunks in parallel (default: 1)'
+        )
+        parser.add_argument(
+            '--include-incomplete', action='store_true',
+            help='Also assess profiles missing income, expense, debt or asset data'
+        )
+        parser.add_argument(
+            '--profile', type=int, action='append', dest='profile_ids',
+            help='Only rescore the given profile id (may be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = FinancialProfile.objects.all()
+        if options['profile_ids']:
+            queryset = queryset.filter(pk__in=options['profile_ids'])
+
+        total = rescore_all(
+            queryset,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            include_incomplete=options['include_incomplete'],
+            progress=lambda count: self.stdout.write(f"Assessed {count} profile(s)...") if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} risk assessment(s)"))
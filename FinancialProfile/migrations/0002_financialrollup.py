@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialRollup',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='FinancialProfile.financialprofile')),
+                ('monthly_income', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20)),
+                ('monthly_expenses', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=20)),
+                ('debt_balance', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('minimum_payments', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('high_interest_balance', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('liquid_assets', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('total_assets', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('income_sources', models.PositiveIntegerField(default=0)),
+                ('debt_type_count', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Financial Rollup',
+                'verbose_name_plural': 'Financial Rollups',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0002_financialrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRiskAssessment',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pending_assessment', serialize=False, to='FinancialProfile.financialprofile')),
+                ('due_at', models.DateTimeField(db_index=True)),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Pending Risk Assessment',
+                'verbose_name_plural': 'Pending Risk Assessments',
+                'ordering': ['due_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0003_pendingriskassessment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialprofile',
+            name='latest_assessment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='FinancialProfile.riskassessmenthistory'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['profile', '-created_at'], name='asset_profile_created'),
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['profile', '-created_at'], name='debt_profile_created'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['profile', '-created_at'], name='expense_profile_created'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['profile', '-created_at'], name='income_profile_created'),
+        ),
+        migrations.AddIndex(
+            model_name='riskassessmenthistory',
+            index=models.Index(fields=['profile', '-assessment_date'], name='assessment_profile_date'),
+        ),
+    ]
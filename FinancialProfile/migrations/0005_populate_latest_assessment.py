@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:05
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def populate_latest_assessment(apps, schema_editor):
+    """Point every profile at its newest assessment, one primary-key range at a time"""
+    FinancialProfile = apps.get_model('FinancialProfile', 'FinancialProfile')
+    RiskAssessmentHistory = apps.get_model('FinancialProfile', 'RiskAssessmentHistory')
+    latest = (
+        RiskAssessmentHistory.objects
+        .filter(profile=OuterRef('pk'))
+        .order_by('-assessment_date', '-pk')
+        .values('pk')[:1]
+    )
+    last_pk = FinancialProfile.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last_pk, BATCH_SIZE):
+        FinancialProfile.objects.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(
+            latest_assessment=Subquery(latest)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0004_profile_latest_assessment_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_latest_assessment, migrations.RunPython.noop),
+    ]
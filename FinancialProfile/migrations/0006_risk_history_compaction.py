@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0005_populate_latest_assessment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskSummaryTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('text_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Risk Summary Template',
+                'verbose_name_plural': 'Risk Summary Templates',
+            },
+        ),
+        migrations.AlterField(
+            model_name='riskassessmenthistory',
+            name='summary',
+            field=models.TextField(blank=True, db_column='summary', null=True),
+        ),
+        migrations.RenameField(
+            model_name='riskassessmenthistory',
+            old_name='summary',
+            new_name='summary_text',
+        ),
+        migrations.CreateModel(
+            name='RiskHistoryBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('assessment_count', models.PositiveIntegerField()),
+                ('min_score', models.IntegerField()),
+                ('max_score', models.IntegerField()),
+                ('last_score', models.IntegerField()),
+                ('first_risk_level', models.CharField(choices=[('very_low', 'Very Low Risk'), ('low', 'Low Risk'), ('moderate', 'Moderate Risk'), ('high', 'High Risk'), ('very_high', 'Very High Risk')], max_length=20)),
+                ('last_risk_level', models.CharField(choices=[('very_low', 'Very Low Risk'), ('low', 'Low Risk'), ('moderate', 'Moderate Risk'), ('high', 'High Risk'), ('very_high', 'Very High Risk')], max_length=20)),
+                ('level_changes', models.PositiveIntegerField(default=0)),
+                ('first_assessed_at', models.DateTimeField()),
+                ('last_assessed_at', models.DateTimeField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_history_buckets', to='FinancialProfile.financialprofile')),
+                ('last_summary_template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='FinancialProfile.risksummarytemplate')),
+            ],
+            options={
+                'verbose_name': 'Risk History Bucket',
+                'verbose_name_plural': 'Risk History Buckets',
+                'ordering': ['-period_start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='riskassessmenthistory',
+            name='summary_template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='FinancialProfile.risksummarytemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='riskhistorybucket',
+            constraint=models.UniqueConstraint(fields=('profile', 'period', 'period_start'), name='unique_risk_history_bucket'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+from FinancialProfile.distribution import score_distribution_rows
+
+
+def build_score_distribution(apps, schema_editor):
+    """Index the latest assessment score of every existing profile"""
+    FinancialProfile = apps.get_model('FinancialProfile', 'FinancialProfile')
+    ScoreDistribution = apps.get_model('FinancialProfile', 'ScoreDistribution')
+    rows = score_distribution_rows(FinancialProfile.objects.all())
+    ScoreDistribution.objects.bulk_create((ScoreDistribution(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0007_refresh_monthly_rollup_totals'),
+        ('users', '0002_user_date_of_birth_user_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreDistribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.CharField(max_length=20)),
+                ('score', models.PositiveSmallIntegerField()),
+                ('profiles', models.IntegerField(default=0)),
+                ('profiles_below', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Score Distribution',
+                'verbose_name_plural': 'Score Distribution',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scoredistribution',
+            constraint=models.UniqueConstraint(fields=('cohort', 'score'), name='unique_score_distribution_row'),
+        ),
+        migrations.RunPython(build_score_distribution, migrations.RunPython.noop),
+    ]
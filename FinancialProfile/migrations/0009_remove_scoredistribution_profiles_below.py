@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0008_score_distribution'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='scoredistribution',
+            name='profiles_below',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:55
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0009_remove_scoredistribution_profiles_below'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialprofile',
+            name='data_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def estimate_score_totals(apps, schema_editor):
+    """
+    Buckets compacted before score_total existed only kept their min and max
+    score; their total is estimated from the midpoint
+    """
+    RiskHistoryBucket = apps.get_model('FinancialProfile', 'RiskHistoryBucket')
+    RiskHistoryBucket.objects.update(
+        score_total=(F('min_score') + F('max_score')) * F('assessment_count') / 2
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0010_financialprofile_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskhistorybucket',
+            name='score_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(estimate_score_totals, migrations.RunPython.noop),
+    ]
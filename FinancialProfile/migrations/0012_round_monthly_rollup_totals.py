@@ -0,0 +1,57 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:25
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from FinancialProfile.money import MONTHLY_TOTAL_FIELD, monthly_amount_expression
+
+BATCH_SIZE = 1000
+
+# Frequencies whose monthly amounts used to keep 28 significant digits
+# per row, so their rollups drifted from a rebuild
+INEXACT_FREQUENCIES = ['quarterly', 'yearly']
+
+
+def round_monthly_totals(apps, schema_editor):
+    """
+    Recompute the monthly income and expense totals of rollups whose profile
+    has quarterly or yearly items, from rows rounded to four places
+    """
+    FinancialRollup = apps.get_model('FinancialProfile', 'FinancialRollup')
+    Income = apps.get_model('FinancialProfile', 'Income')
+    Expense = apps.get_model('FinancialProfile', 'Expense')
+
+    def monthly_total(model):
+        rows = (
+            model.objects
+            .filter(profile=OuterRef('profile_id'))
+            .order_by()
+            .values('profile')
+            .annotate(total=Sum(monthly_amount_expression(), output_field=MONTHLY_TOTAL_FIELD))
+            .values('total')
+        )
+        return Coalesce(Subquery(rows), Value(Decimal('0')), output_field=MONTHLY_TOTAL_FIELD)
+
+    affected = sorted(
+        set(Income.objects.filter(frequency__in=INEXACT_FREQUENCIES).values_list('profile_id', flat=True))
+        | set(Expense.objects.filter(frequency__in=INEXACT_FREQUENCIES).values_list('profile_id', flat=True))
+    )
+    for start in range(0, len(affected), BATCH_SIZE):
+        FinancialRollup.objects.filter(profile_id__in=affected[start:start + BATCH_SIZE]).update(
+            monthly_income=monthly_total(Income),
+            monthly_expenses=monthly_total(Expense),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FinancialProfile', '0011_riskhistorybucket_score_total'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_monthly_totals, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,20 @@
 # FinancialProfile/models.py
 
 from django.db import models
+from django.db.models import (
+    Count, DecimalField, F, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce, Round
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from datetime import timedelta
+import hashlib
+import uuid
 from decimal import Decimal
 from django.utils import timezone
 
+from .money import MONTHLY_TOTAL_FIELD, monthly_amount, monthly_amount_expression, total_monthly
+
 User = get_user_model()
 
 try:
@@ -15,6 +24,150 @@ except ImportError:
     FinancialRiskCalculator = None
 
 
+MONEY_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _profile_sum(model, expression, output_field=MONEY_FIELD, **filters):
+    """Correlated subquery summing an expression over one profile's rows"""
+    rows = (
+        model.objects
+        .filter(profile=OuterRef('pk'), **filters)
+        .order_by()
+        .values('profile')
+        .annotate(total=Sum(expression, output_field=output_field))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=output_field), Value(Decimal('0.00')), output_field=output_field)
+
+
+def _profile_monthly_sum(model):
+    """Correlated subquery totalling one profile's income or expense rows per month"""
+    return _profile_sum(model, monthly_amount_expression(), output_field=MONTHLY_TOTAL_FIELD)
+
+
+def _profile_count(model, aggregate):
+    """Correlated subquery counting one profile's rows"""
+    rows = (
+        model.objects
+        .filter(profile=OuterRef('pk'))
+        .order_by()
+        .values('profile')
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+class FinancialProfileQuerySet(models.QuerySet):
+
+    def with_financial_totals(self):
+        """
+        Annotate monthly income/expense totals, debt balance, minimum payments,
+        asset values and net worth so they are computed in the same query.
+        The get_total_* methods on FinancialProfile return these when present.
+        """
+        return self.annotate(
+            total_monthly_income=_profile_monthly_sum(Income),
+            total_monthly_expenses=_profile_monthly_sum(Expense),
+            total_debt_balance=_profile_sum(Debt, F('remaining_balance')),
+            total_minimum_payments=_profile_sum(Debt, F('minimum_amount')),
+            total_assets_value=_profile_sum(Asset, F('value')),
+            total_liquid_assets=_profile_sum(Asset, F('value'), asset_type__in=Asset.LIQUID_ASSET_TYPES),
+        ).annotate(
+            net_worth=F('total_assets_value') - F('total_debt_balance'),
+        )
+
+    def with_rollup_totals(self):
+        """
+        Annotate everything stored on FinancialRollup, used to rebuild rollups
+        """
+        return self.with_financial_totals().annotate(
+            total_high_interest_balance=_profile_sum(
+                Debt, F('remaining_balance'), interest_rate__gt=Debt.HIGH_INTEREST_THRESHOLD
+            ),
+            total_income_sources=_profile_count(Income, Count('pk')),
+            total_debt_types=_profile_count(Debt, Count('debt_type', distinct=True)),
+        )
+
+    def with_line_item_counts(self):
+        """Annotate how many incomes, expenses, debts, assets and risk assessments each profile has"""
+        return self.annotate(
+            income_count=_profile_count(Income, Count('pk')),
+            expense_count=_profile_count(Expense, Count('pk')),
+            debt_count=_profile_count(Debt, Count('pk')),
+            asset_count=_profile_count(Asset, Count('pk')),
+            risk_assessment_count=_profile_count(RiskAssessmentHistory, Count('pk')),
+        )
+
+    def with_listing_totals(self):
+        """
+        Annotate what the profile listing shows, filters and sorts on in one
+        query: monthly income and net worth from the rollup (falling back to
+        the line items for a profile without one) and the latest assessment's
+        score and risk level through the latest_assessment pointer
+        """
+        return self.annotate(
+            total_monthly_income=Coalesce(
+                F('rollup__monthly_income'),
+                _profile_monthly_sum(Income),
+                output_field=MONTHLY_TOTAL_FIELD,
+            ),
+            # Rounded and cast so SQLite, which subtracts decimals as floats,
+            # compares it exactly against cursor positions
+            net_worth=Cast(
+                Round(
+                    Coalesce(
+                        F('rollup__total_assets') - F('rollup__debt_balance'),
+                        _profile_sum(Asset, F('value')) - _profile_sum(Debt, F('remaining_balance')),
+                        output_field=MONEY_FIELD,
+                    ),
+                    2,
+                ),
+                MONEY_FIELD,
+            ),
+            latest_risk_score=F('latest_assessment__score'),
+            latest_risk_level=F('latest_assessment__risk_level'),
+        )
+
+    def touch(self):
+        """
+        Give the profiles a new data version and modification time; used
+        after writes to their line items or history that don't save them
+        """
+        return self.update(data_version=uuid.uuid4(), updated_at=timezone.now())
+
+    def refresh_latest_assessments(self):
+        """
+        Point latest_assessment at each profile's newest assessment in one
+        UPDATE; used after writes that bypass RiskAssessmentHistory.save
+        """
+        latest = (
+            RiskAssessmentHistory.objects
+            .filter(profile=OuterRef('pk'))
+            .order_by('-assessment_date', '-pk')
+            .values('pk')[:1]
+        )
+        return self.update(latest_assessment=Subquery(latest))
+
+    def with_nested_data(self):
+        """
+        Prefetch every line item and the profile's most recent risk assessments
+        (into recent_risk_assessments), and annotate the total assessment count,
+        so the nested profile document is served without further queries
+        """
+        recent = (
+            RiskAssessmentHistory.objects
+            .select_related('summary_template')
+            .order_by('-assessment_date')[:FinancialProfile.RECENT_RISK_ASSESSMENTS]
+        )
+        return self.prefetch_related(
+            'incomes', 'expenses', 'debts', 'assets',
+            Prefetch('risk_assessments', queryset=recent, to_attr='recent_risk_assessments'),
+        ).annotate(
+            risk_assessment_count=_profile_count(RiskAssessmentHistory, Count('pk')),
+        )
+
+
 class FinancialProfile(models.Model):
     """
     Financial profile with one-to-one relationship to User
@@ -26,8 +179,20 @@ class FinancialProfile(models.Model):
         related_name='financial_profile'
     )
     last_assessed = models.DateTimeField(null=True, blank=True)
+    # Denormalised pointer to the newest RiskAssessmentHistory, kept current by its save()
+    latest_assessment = models.ForeignKey(
+        'RiskAssessmentHistory',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Replaced on every change to the profile's data: the ETag and cache key of its responses
+    data_version = models.UUIDField(default=uuid.uuid4, editable=False)
+
+    objects = FinancialProfileQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Financial Profile"
@@ -37,14 +202,22 @@ class FinancialProfile(models.Model):
     def __str__(self):
         return f"Financial Profile for {self.user.username}"
 
-    def create_risk_assessment(self):
-        """Create a new risk assessment for this profile, avoiding duplicates within 1 minute."""
-        from django.utils import timezone
-        now = timezone.now()
-        one_min_ago = now - timezone.timedelta(minutes=1)
-        recent_assessment = self.risk_assessments.filter(assessment_date__gte=one_min_ago).first()
-        if recent_assessment:
-            return recent_assessment
+    def save(self, *args, update_fields=None, **kwargs):
+        """Every save is a change to the profile's data, so it also takes a new data version"""
+        self.data_version = uuid.uuid4()
+        if update_fields is not None:
+            update_fields = {*update_fields, 'data_version', 'updated_at'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def create_risk_assessment(self, dedupe_window=timedelta(minutes=1)):
+        """
+        Create a new risk assessment for this profile, avoiding duplicates within
+        dedupe_window (1 minute by default, None to always assess).
+        """
+        if dedupe_window is not None:
+            recent_assessment = self.latest_assessment
+            if recent_assessment and recent_assessment.assessment_date >= timezone.now() - dedupe_window:
+                return recent_assessment
 
         global FinancialRiskCalculator
         if FinancialRiskCalculator is None:
@@ -62,67 +235,129 @@ class FinancialProfile(models.Model):
 
         return assessment
 
-    def update_last_assessed(self):
-        """Update the last assessment timestamp"""
+    def update_last_assessed(self, latest_assessment=None):
+        """Update the last assessment timestamp, and the latest assessment pointer if given"""
         self.last_assessed = timezone.now()
-        self.save(update_fields=['last_assessed'])
+        update_fields = ['last_assessed']
+        if latest_assessment is not None:
+            self.latest_assessment = latest_assessment
+            update_fields.append('latest_assessment')
+        self.save(update_fields=update_fields)
+    
+    # Assessments embedded in the profile document; the full history is paginated under /risk-assessments/
+    RECENT_RISK_ASSESSMENTS = 10
+
+    # Annotation from with_financial_totals -> equivalent FinancialRollup field
+    PRECOMPUTED_TOTALS = {
+        'total_monthly_income': 'monthly_income',
+        'total_monthly_expenses': 'monthly_expenses',
+        'total_debt_balance': 'debt_balance',
+        'total_minimum_payments': 'minimum_payments',
+        'total_assets_value': 'total_assets',
+        'net_worth': 'net_worth',
+    }
+
+    def _get_annotated_total(self, name):
+        """
+        Return a precomputed total, if any: a with_financial_totals annotation
+        first, then the profile's FinancialRollup
+        """
+        annotated = getattr(self, name, None)
+        if annotated is not None:
+            return annotated
+        rollup = self.get_rollup()
+        if rollup is not None:
+            return getattr(rollup, self.PRECOMPUTED_TOTALS[name])
+        return None
+
+    def get_rollup(self):
+        """Return the profile's FinancialRollup, or None if it hasn't been built"""
+        try:
+            return self.rollup
+        except FinancialRollup.DoesNotExist:
+            return None
     
     def get_total_income(self):
         """Calculate total monthly income"""
-        monthly_income = Decimal('0.00')
-        for income in self.incomes.all():
-            if income.frequency.lower() == 'monthly':
-                monthly_income += income.amount
-            elif income.frequency.lower() == 'yearly':
-                monthly_income += income.amount / 12
-            elif income.frequency.lower() == 'weekly':
-                monthly_income += income.amount * 4
-        return monthly_income
+        annotated = self._get_annotated_total('total_monthly_income')
+        if annotated is not None:
+            return annotated
+        return total_monthly(self.incomes.all())
     
     def get_total_expenses(self):
         """Calculate total monthly expenses"""
-        monthly_expenses = Decimal('0.00')
-        for expense in self.expenses.all():
-            if expense.frequency.lower() == 'monthly':
-                monthly_expenses += expense.amount
-            elif expense.frequency.lower() == 'yearly':
-                monthly_expenses += expense.amount / 12
-            elif expense.frequency.lower() == 'weekly':
-                monthly_expenses += expense.amount * 4
-        return monthly_expenses
+        annotated = self._get_annotated_total('total_monthly_expenses')
+        if annotated is not None:
+            return annotated
+        return total_monthly(self.expenses.all())
     
     def get_total_debt_balance(self):
         """Calculate total remaining debt balance"""
+        annotated = self._get_annotated_total('total_debt_balance')
+        if annotated is not None:
+            return annotated
         return sum(debt.remaining_balance for debt in self.debts.all())
     
     def get_total_assets_value(self):
         """Calculate total assets value"""
+        annotated = self._get_annotated_total('total_assets_value')
+        if annotated is not None:
+            return annotated
         return sum(asset.value for asset in self.assets.all())
     
     def get_net_worth(self):
         """Calculate net worth (assets - debts)"""
+        annotated = self._get_annotated_total('net_worth')
+        if annotated is not None:
+            return annotated
         return self.get_total_assets_value() - self.get_total_debt_balance()
     
     def get_debt_to_income_ratio(self):
         """Calculate debt-to-income ratio"""
         total_income = self.get_total_income()
         if total_income > 0:
-            total_debt_payments = sum(debt.minimum_amount for debt in self.debts.all())
+            total_debt_payments = self._get_annotated_total('total_minimum_payments')
+            if total_debt_payments is None:
+                total_debt_payments = sum(debt.minimum_amount for debt in self.debts.all())
             return (total_debt_payments / total_income) * 100
         return 0
     
+    def get_recent_risk_assessments(self):
+        """The latest RECENT_RISK_ASSESSMENTS assessments, newest first"""
+        recent = getattr(self, 'recent_risk_assessments', None)
+        if recent is None:
+            recent = list(self.risk_assessments.all()[:self.RECENT_RISK_ASSESSMENTS])
+        return recent
+
+    def get_risk_assessment_count(self):
+        """Total number of stored risk assessments"""
+        annotated = getattr(self, 'risk_assessment_count', None)
+        if annotated is not None:
+            return annotated
+        return self.risk_assessments.count()
+
     def get_latest_risk_score(self):
         """Get the most recent risk assessment score"""
-        latest_assessment = self.risk_assessments.first()
-        return latest_assessment.score if latest_assessment else None
+        if hasattr(self, 'latest_risk_score'):
+            return self.latest_risk_score
+        if self.latest_assessment_id is None:
+            return None
+        return self.latest_assessment.score
     
+    def get_latest_risk_level(self):
+        """Get the most recent risk assessment level"""
+        if hasattr(self, 'latest_risk_level'):
+            return self.latest_risk_level
+        if self.latest_assessment_id is None:
+            return None
+        return self.latest_assessment.risk_level
+
     def has_complete_profile(self):
         """Check if profile has minimum required data for assessment: must have income, expense, debt, and asset."""
-        return (
-            self.incomes.exists() and
-            self.expenses.exists() and
-            self.debts.exists() and
-            self.assets.exists()
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        return all(
+            bool(prefetched[name]) if name in prefetched else getattr(self, name).exists()
+            for name in ('incomes', 'expenses', 'debts', 'assets')
         )
 
 
@@ -155,23 +390,16 @@ class Income(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', '-created_at'], name='income_profile_created'),
+        ]
 
     def __str__(self):
         return f"Income({self.source_name}, {self.amount}, {self.frequency})"
     
     def get_monthly_amount(self):
         """Convert any frequency to monthly amount"""
-        if self.frequency == 'weekly':
-            return self.amount * 4
-        elif self.frequency == 'bi_weekly':
-            return self.amount * 2
-        elif self.frequency == 'monthly':
-            return self.amount
-        elif self.frequency == 'quarterly':
-            return self.amount / 3
-        elif self.frequency == 'yearly':
-            return self.amount / 12
-        return self.amount
+        return monthly_amount(self.amount, self.frequency)
 
 
 class Expense(models.Model):
@@ -217,23 +445,16 @@ class Expense(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', '-created_at'], name='expense_profile_created'),
+        ]
 
     def __str__(self):
         return f"Expense({self.category}, {self.amount}, {self.frequency})"
     
     def get_monthly_amount(self):
         """Convert any frequency to monthly amount"""
-        if self.frequency == 'weekly':
-            return self.amount * 4
-        elif self.frequency == 'bi_weekly':
-            return self.amount * 2
-        elif self.frequency == 'monthly':
-            return self.amount
-        elif self.frequency == 'quarterly':
-            return self.amount / 3
-        elif self.frequency == 'yearly':
-            return self.amount / 12
-        return self.amount
+        return monthly_amount(self.amount, self.frequency)
 
 
 class Debt(models.Model):
@@ -250,6 +471,8 @@ class Debt(models.Model):
         ('other', 'Other'),
     ]
     
+    HIGH_INTEREST_THRESHOLD = Decimal('15')
+    
     profile = models.ForeignKey(
         FinancialProfile,
         on_delete=models.CASCADE,
@@ -282,6 +505,9 @@ class Debt(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', '-created_at'], name='debt_profile_created'),
+        ]
 
     def __str__(self):
         return f"Debt({self.debt_name}, {self.debt_type}, {self.remaining_balance})"
@@ -294,7 +520,7 @@ class Debt(models.Model):
     
     def is_high_interest(self):
         """Check if debt has high interest rate (>15%)"""
-        return self.interest_rate > 15
+        return self.interest_rate > self.HIGH_INTEREST_THRESHOLD
 
 
 class Asset(models.Model):
@@ -314,6 +540,8 @@ class Asset(models.Model):
         ('other', 'Other'),
     ]
     
+    LIQUID_ASSET_TYPES = ['checking', 'savings', 'investment']
+    
     profile = models.ForeignKey(
         FinancialProfile,
         on_delete=models.CASCADE,
@@ -331,19 +559,132 @@ class Asset(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', '-created_at'], name='asset_profile_created'),
+        ]
 
     def __str__(self):
         return f"Asset({self.asset_name}, {self.asset_type}, {self.value})"
     
     def is_liquid_asset(self):
         """Check if asset is easily convertible to cash"""
-        liquid_types = ['checking', 'savings', 'investment']
-        return self.asset_type in liquid_types
+        return self.asset_type in self.LIQUID_ASSET_TYPES
+
+
+class FinancialRollup(models.Model):
+    """
+    Denormalised financial totals for a profile
+    Kept in sync incrementally by the line-item signals and rebuilt with the
+    rebuild_financial_rollups management command
+    """
+    profile = models.OneToOneField(
+        FinancialProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rollup'
+    )
+    monthly_income = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'))
+    monthly_expenses = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'))
+    debt_balance = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    minimum_payments = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    high_interest_balance = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    liquid_assets = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    total_assets = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'))
+    income_sources = models.PositiveIntegerField(default=0)
+    debt_type_count = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Financial Rollup"
+        verbose_name_plural = "Financial Rollups"
+
+    def __str__(self):
+        return f"FinancialRollup(profile={self.profile_id})"
+
+    @property
+    def net_worth(self):
+        return self.total_assets - self.debt_balance
+
+
+class PendingRiskAssessment(models.Model):
+    """
+    A profile whose financial data changed and needs rescoring
+    Written by the database assessment queue and drained by the
+    process_risk_assessments worker; one row per profile coalesces repeat changes.
+    """
+    profile = models.OneToOneField(
+        FinancialProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='pending_assessment'
+    )
+    due_at = models.DateTimeField(db_index=True)
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Pending Risk Assessment"
+        verbose_name_plural = "Pending Risk Assessments"
+        ordering = ['due_at']
+
+    def __str__(self):
+        return f"PendingRiskAssessment(profile={self.profile_id}, due={self.due_at})"
+
+
+class RiskSummaryTemplate(models.Model):
+    """
+    A distinct assessment summary text, stored once and referenced by every
+    assessment (and compacted history bucket) that uses it
+    """
+    text = models.TextField()
+    text_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Risk Summary Template"
+        verbose_name_plural = "Risk Summary Templates"
+
+    def __str__(self):
+        return self.text[:80]
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def intern(cls, text):
+        """Return the template for `text`, creating it on first use"""
+        template, _ = cls.objects.get_or_create(text_hash=cls.hash_text(text), defaults={'text': text})
+        return template
+
+    @classmethod
+    def intern_many(cls, texts):
+        """Intern several texts with a constant number of queries; returns text -> template"""
+        hashes = {cls.hash_text(text): text for text in set(texts)}
+        cls.objects.bulk_create(
+            [cls(text=text, text_hash=digest) for digest, text in hashes.items()],
+            ignore_conflicts=True,
+        )
+        return {template.text: template for template in cls.objects.filter(text_hash__in=hashes)}
+
+
+class RiskAssessmentHistoryQuerySet(models.QuerySet):
+
+    def delete_compacted(self):
+        """
+        Delete assessments already folded into RiskHistoryBucket rows
+        None of them may be a profile's latest_assessment, and the caller
+        touches their profiles once per batch, so the per-row delete signal
+        handlers skip them instead of querying for each row.
+        """
+        self.compacted = True
+        return self.delete()
 
 
 class RiskAssessmentHistory(models.Model):
     """
     Historical risk assessment scores and summaries
+    Summaries are interned in RiskSummaryTemplate on save; summary_text only
+    holds rows written before that, until compact_risk_history interns them.
     """
     RISK_LEVEL_CHOICES = [
         ('very_low', 'Very Low Risk'),
@@ -363,34 +704,67 @@ class RiskAssessmentHistory(models.Model):
     )
     risk_level = models.CharField(max_length=20, choices=RISK_LEVEL_CHOICES, blank=True)
     assessment_date = models.DateTimeField(auto_now_add=True)
-    summary = models.TextField(null=True, blank=True)
+    summary_text = models.TextField(null=True, blank=True, db_column='summary')
+    summary_template = models.ForeignKey(
+        RiskSummaryTemplate,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    objects = RiskAssessmentHistoryQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Risk Assessment History"
         verbose_name_plural = "Risk Assessment Histories"
         ordering = ['-assessment_date']
+        indexes = [
+            models.Index(fields=['profile', '-assessment_date'], name='assessment_profile_date'),
+        ]
     
     def __str__(self):
         return f"RiskAssessment({self.profile.user.username}, {self.score}, {self.risk_level}, {self.assessment_date})"
     
+    @staticmethod
+    def risk_level_for_score(score):
+        """Map a 0-100 score to its risk level"""
+        if score <= 20:
+            return 'very_low'
+        elif score <= 40:
+            return 'low'
+        elif score <= 60:
+            return 'moderate'
+        elif score <= 80:
+            return 'high'
+        return 'very_high'
+    
+    @property
+    def summary(self):
+        if self.summary_text is not None:
+            return self.summary_text
+        if self.summary_template_id is None:
+            return None
+        return self.summary_template.text
+
+    @summary.setter
+    def summary(self, text):
+        self.summary_text = text
+        self.summary_template = None
+
     def save(self, *args, **kwargs):
-        """Automatically set risk level based on score"""
+        """Automatically set risk level based on score and intern the summary"""
         if not self.risk_level:
-            if self.score <= 20:
-                self.risk_level = 'very_low'
-            elif self.score <= 40:
-                self.risk_level = 'low'
-            elif self.score <= 60:
-                self.risk_level = 'moderate'
-            elif self.score <= 80:
-                self.risk_level = 'high'
-            else:
-                self.risk_level = 'very_high'
+            self.risk_level = self.risk_level_for_score(self.score)
+        if self.summary_text:
+            self.summary_template = RiskSummaryTemplate.intern(self.summary_text)
+            self.summary_text = None
         
+        adding = self._state.adding
         super().save(*args, **kwargs)
         
-        # Update the profile's last_assessed timestamp
-        self.profile.update_last_assessed()
+        # Update the profile's last_assessed timestamp; a new assessment is also the latest
+        self.profile.update_last_assessed(latest_assessment=self if adding else None)
     
     def get_risk_level_display_color(self):
         """Return color code for frontend display"""
@@ -403,5 +777,133 @@ class RiskAssessmentHistory(models.Model):
         }
         return colors.get(self.risk_level, '#6b7280')  # Default gray
 
-        
-    
\ No newline at end of file
+
+class RiskHistoryBucket(models.Model):
+    """
+    Compacted risk assessment history for one profile over a day or a week
+    compact_risk_history folds assessments older than the full-resolution
+    window into daily buckets, and old daily buckets into weekly ones.
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    PERIOD_CHOICES = [
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+    ]
+
+    profile = models.ForeignKey(
+        FinancialProfile,
+        on_delete=models.CASCADE,
+        related_name='risk_history_buckets'
+    )
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    assessment_count = models.PositiveIntegerField()
+    min_score = models.IntegerField()
+    max_score = models.IntegerField()
+    last_score = models.IntegerField()
+    # Sum of the bucket's scores, so averages can be weighted by assessment_count
+    score_total = models.PositiveIntegerField(default=0)
+    first_risk_level = models.CharField(max_length=20, choices=RiskAssessmentHistory.RISK_LEVEL_CHOICES)
+    last_risk_level = models.CharField(max_length=20, choices=RiskAssessmentHistory.RISK_LEVEL_CHOICES)
+    # Times the risk level changed between consecutive assessments in the bucket
+    level_changes = models.PositiveIntegerField(default=0)
+    first_assessed_at = models.DateTimeField()
+    last_assessed_at = models.DateTimeField()
+    last_summary_template = models.ForeignKey(
+        RiskSummaryTemplate,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    # Fields rewritten when a bucket absorbs later history
+    MERGED_FIELDS = [
+        'assessment_count', 'min_score', 'max_score', 'last_score', 'score_total', 'last_risk_level',
+        'level_changes', 'last_assessed_at', 'last_summary_template',
+    ]
+
+    class Meta:
+        verbose_name = "Risk History Bucket"
+        verbose_name_plural = "Risk History Buckets"
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'period', 'period_start'], name='unique_risk_history_bucket'),
+        ]
+
+    def __str__(self):
+        return f"RiskHistoryBucket(profile={self.profile_id}, {self.period} of {self.period_start})"
+
+    @staticmethod
+    def period_start_for(moment, period):
+        """First day of the day or (Monday-based) week containing `moment`"""
+        day = timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+        if period == RiskHistoryBucket.WEEK:
+            return day - timedelta(days=day.weekday())
+        return day
+
+    @classmethod
+    def from_assessment(cls, assessment, period=DAY):
+        """A single-assessment bucket"""
+        return cls(
+            profile_id=assessment.profile_id,
+            period=period,
+            period_start=cls.period_start_for(assessment.assessment_date, period),
+            assessment_count=1,
+            min_score=assessment.score,
+            max_score=assessment.score,
+            last_score=assessment.score,
+            score_total=assessment.score,
+            first_risk_level=assessment.risk_level,
+            last_risk_level=assessment.risk_level,
+            level_changes=0,
+            first_assessed_at=assessment.assessment_date,
+            last_assessed_at=assessment.assessment_date,
+            last_summary_template_id=assessment.summary_template_id,
+        )
+
+    def rebucket(self, period):
+        """An unsaved copy of this bucket placed in the `period` bucket containing it"""
+        copy = RiskHistoryBucket(**{
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields if not field.primary_key
+        })
+        copy.period = period
+        copy.period_start = self.period_start_for(self.first_assessed_at, period)
+        return copy
+
+    def merge(self, later):
+        """Fold `later`, which covers history after this bucket's, into this bucket"""
+        self.level_changes += later.level_changes + (later.first_risk_level != self.last_risk_level)
+        self.assessment_count += later.assessment_count
+        self.min_score = min(self.min_score, later.min_score)
+        self.max_score = max(self.max_score, later.max_score)
+        self.last_score = later.last_score
+        self.score_total += later.score_total
+        self.last_risk_level = later.last_risk_level
+        self.last_assessed_at = later.last_assessed_at
+        self.last_summary_template_id = later.last_summary_template_id
+
+
+class ScoreDistribution(models.Model):
+    """
+    Number of profiles whose latest assessment has a given score, per cohort
+    Rebuilt by the rebuild_score_distribution command and moved incrementally
+    as assessments are written. A write touches only the rows of the scores
+    it moves between; a percentile sums the cohort's 101 rows.
+    """
+    cohort = models.CharField(max_length=20)
+    score = models.PositiveSmallIntegerField()
+    # Signed: incremental updates between rebuilds must never fail a check constraint
+    profiles = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Score Distribution"
+        verbose_name_plural = "Score Distribution"
+        constraints = [
+            models.UniqueConstraint(fields=['cohort', 'score'], name='unique_score_distribution_row'),
+        ]
+
+    def __str__(self):
+        return f"ScoreDistribution({self.cohort}, {self.score}: {self.profiles})"
@@ -0,0 +1,62 @@
+# FinancialProfile/money.py
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round
+
+ZERO = Decimal('0.00')
+
+# Income/expense frequency -> (payments, months): an amount paid `payments`
+# times every `months` months. Frequencies missing from the table contribute
+# nothing.
+MONTHLY_RATES = {
+    'weekly': (4, 1),
+    'bi_weekly': (2, 1),
+    'monthly': (1, 1),
+    'quarterly': (1, 3),
+    'yearly': (1, 12),
+}
+
+# Every path rounds each row's monthly amount to the places the totals are
+# stored with, so summing rows in Python, in SQL and in the rollups agrees
+MONTHLY_PLACES = 4
+MONTHLY_TOTAL_FIELD = DecimalField(max_digits=20, decimal_places=MONTHLY_PLACES)
+_MONTHLY_QUANTUM = Decimal(1).scaleb(-MONTHLY_PLACES)
+
+
+def monthly_amount(amount, frequency):
+    """Normalise an amount paid at `frequency` to a monthly amount, rounded to MONTHLY_PLACES"""
+    rate = MONTHLY_RATES.get(frequency)
+    if rate is None:
+        return ZERO
+    payments, months = rate
+    return (amount * payments / months).quantize(_MONTHLY_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def total_monthly(items):
+    """Sum of the monthly amounts of income or expense rows"""
+    total = ZERO
+    for item in items:
+        total += monthly_amount(item.amount, item.frequency)
+    return total
+
+
+def monthly_amount_expression(amount='amount', frequency='frequency'):
+    """
+    SQL equivalent of monthly_amount for a row's amount and frequency columns
+    Amounts are multiplied by the rate rather than divided by the months,
+    since SQLite would otherwise perform integer division on whole-number
+    amounts; rounding to MONTHLY_PLACES absorbs the inexact factor.
+    """
+    return Case(
+        *(
+            When(
+                **{frequency: name},
+                then=Round(F(amount) * Value(Decimal(payments) / Decimal(months)), MONTHLY_PLACES),
+            )
+            for name, (payments, months) in MONTHLY_RATES.items()
+        ),
+        default=Value(ZERO),
+        output_field=MONTHLY_TOTAL_FIELD,
+    )
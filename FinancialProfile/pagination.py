@@ -0,0 +1,100 @@
+# FinancialProfile/pagination.py
+
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class ProfileCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the profile listing, newest first by default
+    Pages are found by seeking on the sort key, so deep pages cost the same
+    as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering[-1].lstrip('-') != 'id':
+            # A unique tie-breaker keeps page boundaries stable when sort keys repeat
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        DRF's cursor seeks on the first sort key alone and steps over rows
+        sharing it with an offset, which shifts when rows are written between
+        pages. Here the cursor holds every sort key up to the id and seeks
+        past that exact row, so positions are unique and offsets stay 0.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._seek_past(ordering, current_position))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = following_position is not None
+            self.next_position = current_position if self.has_next else None
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = (current_position is not None) or (offset > 0)
+            self.next_position = following_position
+            self.previous_position = current_position if self.has_previous else None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _seek_past(self, ordering, position):
+        """Rows after `position` in `ordering`, compared key by key"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        clauses, ties = [], Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(ties & Q(**{f'{name}__{lookup}': value}))
+            ties &= Q(**{name: value})
+        return reduce(operator.or_, clauses)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            attr = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(str(attr))
+        return json.dumps(values)
@@ -0,0 +1,107 @@
+# FinancialProfile/payoff.py
+
+import numpy as np
+
+PAYOFF_STRATEGIES = ('avalanche', 'snowball', 'minimum')
+
+
+class DebtPayoffProjection:
+    """
+    Month-by-month amortisation of a set of debts, vectorised across debts
+    Every month interest accrues on each open balance and each debt receives
+    its minimum payment. Under avalanche (highest rate first) and snowball
+    (smallest balance first) the monthly budget stays fixed at the starting
+    minimums plus extra_payment, so whatever is left after minimums, including
+    the minimums of debts already paid off, goes to the first open debt in
+    priority order. Minimum-only pays the minimums alone.
+    """
+
+    MAX_MONTHS = 600  # 50 years; balances that never shrink stop here
+
+    def __init__(self, balances, minimums, interest_rates, strategy='avalanche',
+                 extra_payment=0, max_months=MAX_MONTHS):
+        if strategy not in PAYOFF_STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(PAYOFF_STRATEGIES)}")
+        self.balances = np.asarray(balances, dtype=np.float64)
+        self.minimums = np.asarray(minimums, dtype=np.float64)
+        self.interest_rates = np.asarray(interest_rates, dtype=np.float64)
+        self.strategy = strategy
+        self.extra_payment = float(extra_payment) if strategy != 'minimum' else 0.0
+        self.max_months = max_months
+
+        # Filled in by project(): one row per month, one column per debt
+        self.balance_schedule = None
+        self.interest_schedule = None
+        self.payment_schedule = None
+        self.payoff_months = None
+
+    @classmethod
+    def from_debts(cls, debts, **options):
+        """Build a projection from Debt rows"""
+        return cls(
+            balances=[debt.remaining_balance for debt in debts],
+            minimums=[debt.minimum_amount for debt in debts],
+            interest_rates=[debt.interest_rate for debt in debts],
+            **options,
+        )
+
+    def _priority(self):
+        """Debt indexes in the order extra payments are applied"""
+        if self.strategy == 'snowball':
+            # Smallest balance first, higher rate breaking ties
+            return np.lexsort((-self.interest_rates, self.balances))
+        # Highest rate first, smaller balance breaking ties
+        return np.lexsort((self.balances, -self.interest_rates))
+
+    def project(self):
+        """Run the schedule until every balance is paid or max_months is reached"""
+        # Whole cents throughout, so float sums stay exact and interest rounds once a month
+        count = len(self.balances)
+        monthly_rates = self.interest_rates / 1200
+        minimums = np.round(self.minimums * 100)
+        order = self._priority()
+        budget = minimums.sum() + round(self.extra_payment * 100)
+        rolls_over = self.strategy != 'minimum'
+
+        balances = np.empty((self.max_months, count))
+        interest = np.empty((self.max_months, count))
+        payments = np.empty((self.max_months, count))
+        payoff_months = np.where(self.balances > 0, -1, 0)
+
+        balance = np.round(self.balances * 100)
+        months = 0
+        while months < self.max_months and balance.any():
+            accrued = np.rint(balance * monthly_rates)
+            balance = balance + accrued
+            payment = np.minimum(minimums, balance)
+            if rolls_over:
+                left = (balance - payment)[order]
+                available = budget - payment.sum()
+                # What reaches each debt after the debts ahead of it took theirs
+                payment[order] += np.clip(available - (np.cumsum(left) - left), 0, left)
+            balance = balance - payment
+
+            balances[months], interest[months], payments[months] = balance, accrued, payment
+            months += 1
+            payoff_months[(balance <= 0) & (payoff_months < 0)] = months
+
+        self.balance_schedule = balances[:months] / 100
+        self.interest_schedule = interest[:months] / 100
+        self.payment_schedule = payments[:months] / 100
+        self.payoff_months = payoff_months
+        return self
+
+    @property
+    def months_to_debt_free(self):
+        """Months until the last balance is paid, None if it never is within max_months"""
+        if (self.payoff_months < 0).any():
+            return None
+        return int(self.payoff_months.max(initial=0))
+
+    @property
+    def total_interest(self):
+        return float(self.interest_schedule.sum())
+
+    @property
+    def total_paid(self):
+        return float(self.payment_schedule.sum())
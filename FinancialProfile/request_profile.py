@@ -0,0 +1,126 @@
+# FinancialProfile/request_profile.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from .caching import get_profile_id_for_user
+from .models import FinancialProfile
+
+# Profile id -> FinancialProfile loaded during the current request
+_request_profiles = ContextVar('request_profiles', default=None)
+# Profile id -> (data_version, updated_at) read during the current request
+_request_versions = ContextVar('request_profile_versions', default=None)
+
+
+@contextmanager
+def profile_scope():
+    """
+    Share the profiles loaded by get_request_profile() and the versions read
+    by get_profile_version() until the block exits
+    """
+    profiles_token, versions_token = _request_profiles.set({}), _request_versions.set({})
+    try:
+        yield
+    finally:
+        _request_profiles.reset(profiles_token)
+        _request_versions.reset(versions_token)
+
+
+def scoped_profile(profile_id):
+    """The instance of a profile already loaded in the current scope, or None"""
+    profiles = _request_profiles.get()
+    return profiles.get(profile_id) if profiles is not None else None
+
+
+def get_profile_version(profile_id):
+    """
+    A profile's (data_version, updated_at), or None if there is no such profile
+    Taken from the profile loaded in the current scope, or read with one
+    query that the rest of the scope reuses.
+    """
+    profile = scoped_profile(profile_id)
+    if profile is not None:
+        return profile.data_version, profile.updated_at
+    versions = _request_versions.get()
+    if versions is not None and profile_id in versions:
+        return versions[profile_id]
+    version = (
+        FinancialProfile.objects.filter(pk=profile_id)
+        .order_by()
+        .values_list('data_version', 'updated_at')
+        .first()
+    )
+    if versions is not None:
+        versions[profile_id] = version
+    return version
+
+
+def get_profile_version_with(profile_id, *fields):
+    """
+    A profile's (data_version, updated_at) followed by the values of
+    `fields`, read in one query, or None if there is no such profile
+    The version is shared with get_profile_version() for the rest of the scope.
+    """
+    row = (
+        FinancialProfile.objects.filter(pk=profile_id)
+        .order_by()
+        .values_list('data_version', 'updated_at', *fields)
+        .first()
+    )
+    versions = _request_versions.get()
+    if versions is not None:
+        versions[profile_id] = row[:2] if row is not None else None
+    return row
+
+
+def get_request_profile_id(request):
+    """
+    The id of the requesting user's profile, from the token claims or the
+    financial cache; raises Http404 if there is none
+    """
+    profile_id = get_profile_id_for_user(request.user)
+    if profile_id is None:
+        raise Http404('No FinancialProfile matches the given query.')
+    return profile_id
+
+
+def get_request_profile(request):
+    """
+    The requesting user's FinancialProfile with its user and latest
+    assessment, loaded at most once per request
+    The same instance is handed to every caller in the request, so
+    serializers, signals and the risk calculator reuse what it has loaded.
+    """
+    profile_id = get_request_profile_id(request)
+    profile = scoped_profile(profile_id)
+    if profile is None:
+        profile = get_object_or_404(FinancialProfile.objects.select_related('user', 'latest_assessment'), pk=profile_id)
+        profiles = _request_profiles.get()
+        if profiles is not None:
+            profiles[profile_id] = profile
+    return profile
+
+
+class RequestProfileMiddleware:
+    """Give every request its own profile_scope()"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with profile_scope():
+            return await self.get_response(request)
@@ -0,0 +1,154 @@
+# FinancialProfile/rescoring.py
+
+import itertools
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .distribution import cohorts_for, record_score_changes
+from .models import FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory, RiskSummaryTemplate
+from .risk_calculator import ColumnarRiskCalculator, FinancialRiskCalculator, FinancialSnapshot
+
+# FinancialSnapshot keyword -> (model, fields the snapshot reads)
+LINE_ITEM_FIELDS = {
+    'incomes': (Income, ('amount', 'frequency')),
+    'expenses': (Expense, ('amount', 'frequency')),
+    'debts': (Debt, ('remaining_balance', 'minimum_amount', 'interest_rate', 'debt_type')),
+    'assets': (Asset, ('value', 'asset_type')),
+}
+
+
+def iter_profile_id_chunks(queryset, chunk_size):
+    """Yield lists of profile ids using keyset pagination on the primary key"""
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def load_profile_snapshots(profile_ids):
+    """
+    Load every line item for a chunk of profiles (one query per table) and
+    reduce each profile's rows to a FinancialSnapshot
+    Returns (snapshots, completeness flags), both in profile_ids order; a
+    profile is complete when it has rows in all four tables.
+    """
+    rows = {profile_id: {key: [] for key in LINE_ITEM_FIELDS} for profile_id in profile_ids}
+    for key, (model, fields) in LINE_ITEM_FIELDS.items():
+        for item in model.objects.filter(profile_id__in=profile_ids).only('profile_id', *fields).order_by():
+            rows[item.profile_id][key].append(item)
+
+    snapshots = [FinancialSnapshot(**rows[profile_id]) for profile_id in profile_ids]
+    complete = [all(rows[profile_id].values()) for profile_id in profile_ids]
+    return snapshots, complete
+
+
+def rescore_chunk(profile_ids, include_incomplete=False):
+    """
+    Score a chunk of profiles and write one RiskAssessmentHistory row each
+    Profiles missing income, expense, debt or asset data are skipped unless
+    include_incomplete is set. Returns the number of assessments written.
+    """
+    snapshots, complete = load_profile_snapshots(profile_ids)
+    calculator = ColumnarRiskCalculator.from_snapshots(snapshots)
+    scores = calculator.calculate_risk_scores()
+    factors = calculator.risk_factors
+
+    assessments, summaries = [], []
+    for position, profile_id in enumerate(profile_ids):
+        if not (complete[position] or include_incomplete):
+            continue
+        score = int(scores[position])
+        risk_factors = {name: int(values[position]) for name, values in factors.items()}
+        assessments.append(RiskAssessmentHistory(
+            profile_id=profile_id,
+            score=score,
+            risk_level=RiskAssessmentHistory.risk_level_for_score(score),
+        ))
+        summaries.append(FinancialRiskCalculator.summarize(score, risk_factors))
+
+    # bulk_create skips save(), so intern the summaries here
+    templates = RiskSummaryTemplate.intern_many(summaries)
+    for assessment, summary in zip(assessments, summaries):
+        assessment.summary_template = templates[summary]
+
+    assessed_ids = [assessment.profile_id for assessment in assessments]
+    with transaction.atomic():
+        assessed = FinancialProfile.objects.filter(pk__in=assessed_ids)
+        # Write first so the profiles stay locked from reading their previous
+        # scores until the index is moved (SQLite takes its write lock here too)
+        now = timezone.now()
+        assessed.update(last_assessed=now, updated_at=now, data_version=uuid.uuid4())
+        # bulk_create sends no signals, so the score distribution index is moved here
+        previous = {
+            profile_id: (old_score, cohorts_for(date_of_birth))
+            for profile_id, old_score, date_of_birth
+            in assessed.values_list('pk', 'latest_assessment__score', 'user__date_of_birth')
+        }
+        RiskAssessmentHistory.objects.bulk_create(assessments)
+        assessed.refresh_latest_assessments()
+        record_score_changes(
+            (previous[assessment.profile_id][1], previous[assessment.profile_id][0], assessment.score)
+            for assessment in assessments
+        )
+    return len(assessments)
+
+
+def _init_worker():
+    """
+    Forget the database connections inherited from the parent without
+    closing them; closing would end the parent's session on the server
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+def rescore_all(queryset=None, chunk_size=1000, workers=1, include_incomplete=False, progress=None):
+    """
+    Re-assess every profile (or those in `queryset`) with the current model
+    Chunks of profile ids are scored in this process, or fanned out across
+    `workers` processes. `progress` is called with the running total after
+    each chunk. Returns the number of assessments written.
+    """
+    if queryset is None:
+        queryset = FinancialProfile.objects.all()
+    chunks = iter_profile_id_chunks(queryset, chunk_size)
+    total = 0
+
+    if workers <= 1:
+        for profile_ids in chunks:
+            total += rescore_chunk(profile_ids, include_incomplete)
+            if progress:
+                progress(total)
+        return total
+
+    # Workers are forked, so they inherit the configured Django; every one
+    # starts on the first submit, after the parent's connection is closed
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return total
+    connections.close_all()
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('fork'), initializer=_init_worker,
+    )
+    with executor:
+        in_flight = []
+        for profile_ids in itertools.chain([first_chunk], chunks):
+            in_flight.append(executor.submit(rescore_chunk, profile_ids, include_incomplete))
+            # Bound the number of queued chunks so memory stays flat
+            if len(in_flight) >= workers * 2:
+                total += in_flight.pop(0).result()
+                if progress:
+                    progress(total)
+        for future in in_flight:
+            total += future.result()
+            if progress:
+                progress(total)
+    return total
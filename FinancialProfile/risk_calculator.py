@@ -2,50 +2,154 @@
 
 from decimal import Decimal
 
+import numpy as np
+from django.core.exceptions import ObjectDoesNotExist
+
+from .money import monthly_amount
+from .payoff import DebtPayoffProjection
+
+
+class FinancialSnapshot:
+    """
+    In-memory view of a profile's financial data
+    Line items are loaded once and reduced to the totals the risk factors need
+    """
+
+    LIQUID_ASSET_TYPES = ('checking', 'savings', 'investment')
+    HIGH_INTEREST_THRESHOLD = Decimal('15')
+
+    # Totals mirrored one-to-one by FinancialRollup columns
+    ROLLUP_FIELDS = (
+        'monthly_income', 'monthly_expenses', 'debt_balance', 'minimum_payments',
+        'high_interest_balance', 'total_assets', 'liquid_assets',
+        'income_sources', 'debt_type_count',
+    )
+
+    def __init__(self, incomes=(), expenses=(), debts=(), assets=()):
+        self.monthly_income = Decimal('0.00')
+        self.monthly_expenses = Decimal('0.00')
+        self.debt_balance = Decimal('0.00')
+        self.minimum_payments = Decimal('0.00')
+        self.high_interest_balance = Decimal('0.00')
+        self.total_assets = Decimal('0.00')
+        self.liquid_assets = Decimal('0.00')
+        self.income_sources = 0
+        self.debt_types = set()
+
+        for income in incomes:
+            self.income_sources += 1
+            self.monthly_income += monthly_amount(income.amount, income.frequency)
+
+        for expense in expenses:
+            self.monthly_expenses += monthly_amount(expense.amount, expense.frequency)
+
+        for debt in debts:
+            self.debt_balance += debt.remaining_balance
+            self.minimum_payments += debt.minimum_amount
+            self.debt_types.add(debt.debt_type)
+            if debt.interest_rate > self.HIGH_INTEREST_THRESHOLD:
+                self.high_interest_balance += debt.remaining_balance
+
+        for asset in assets:
+            self.total_assets += asset.value
+            if asset.asset_type in self.LIQUID_ASSET_TYPES:
+                self.liquid_assets += asset.value
+
+        self.debt_type_count = len(self.debt_types)
+
+    @classmethod
+    def for_profile(cls, profile):
+        """
+        Build a snapshot for a profile
+        Uses the profile's FinancialRollup when one exists (a single lookup),
+        otherwise loads line items with one query per table. Relations already
+        prefetched by the caller are reused without querying.
+        """
+        try:
+            rollup = profile.rollup
+        except ObjectDoesNotExist:
+            rollup = None
+        if rollup is not None:
+            return cls.from_rollup(rollup)
+        return cls.from_line_items(profile)
+
+    @classmethod
+    def from_line_items(cls, profile):
+        """Build a snapshot from the profile's income, expense, debt and asset rows"""
+        return cls(
+            incomes=list(profile.incomes.all()),
+            expenses=list(profile.expenses.all()),
+            debts=list(profile.debts.all()),
+            assets=list(profile.assets.all()),
+        )
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        """Build a snapshot from precomputed FinancialRollup totals"""
+        snapshot = cls()
+        for field in cls.ROLLUP_FIELDS:
+            setattr(snapshot, field, getattr(rollup, field))
+        return snapshot
+
+    def get_debt_to_income_ratio(self):
+        """Debt payments as a percentage of monthly income"""
+        if self.monthly_income > 0:
+            return (self.minimum_payments / self.monthly_income) * 100
+        return 0
+
 
 class FinancialRiskCalculator:
     """
     Calculate financial risk score based on various factors
     Score ranges from 0-100 (higher = more risk)
     """
+
+    # Weighted average of risk factors
+    WEIGHTS = {
+        'debt_to_income_ratio': 0.25,      # 25%
+        'emergency_fund_ratio': 0.20,      # 20%
+        'high_interest_debt': 0.20,        # 20%
+        'income_stability': 0.15,          # 15%
+        'expense_coverage': 0.15,          # 15%
+        'debt_diversity': 0.05,            # 5%
+    }
     
-    def __init__(self, profile):
+    def __init__(self, profile, snapshot=None):
         self.profile = profile
+        self.snapshot = snapshot
         self.risk_factors = {}
+        self.payoff_factors = {}
         self.total_score = 0
+
+    def get_snapshot(self):
+        """Load the profile's financial data once and reuse it for every factor"""
+        if self.snapshot is None:
+            self.snapshot = FinancialSnapshot.for_profile(self.profile)
+        return self.snapshot
     
     def calculate_risk_score(self):
         """Main method to calculate overall risk score"""
+        snapshot = self.get_snapshot()
         self.risk_factors = {
-            'debt_to_income_ratio': self._calculate_debt_ratio_risk(),
-            'emergency_fund_ratio': self._calculate_emergency_fund_risk(),
-            'high_interest_debt': self._calculate_high_interest_debt_risk(),
-            'income_stability': self._calculate_income_stability_risk(),
-            'expense_coverage': self._calculate_expense_coverage_risk(),
-            'debt_diversity': self._calculate_debt_diversity_risk(),
-        }
-        
-        # Weighted average of risk factors
-        weights = {
-            'debt_to_income_ratio': 0.25,      # 25%
-            'emergency_fund_ratio': 0.20,      # 20%
-            'high_interest_debt': 0.20,        # 20%
-            'income_stability': 0.15,          # 15%
-            'expense_coverage': 0.15,          # 15%
-            'debt_diversity': 0.05,            # 5%
+            'debt_to_income_ratio': self._calculate_debt_ratio_risk(snapshot),
+            'emergency_fund_ratio': self._calculate_emergency_fund_risk(snapshot),
+            'high_interest_debt': self._calculate_high_interest_debt_risk(snapshot),
+            'income_stability': self._calculate_income_stability_risk(snapshot),
+            'expense_coverage': self._calculate_expense_coverage_risk(snapshot),
+            'debt_diversity': self._calculate_debt_diversity_risk(snapshot),
         }
         
         weighted_score = sum(
-            self.risk_factors[factor] * weights[factor] 
-            for factor in weights
+            self.risk_factors[factor] * weight
+            for factor, weight in self.WEIGHTS.items()
         )
         
         self.total_score = min(100, max(0, int(weighted_score)))
         return self.total_score
     
-    def _calculate_debt_ratio_risk(self):
+    def _calculate_debt_ratio_risk(self, snapshot):
         """Calculate risk based on debt-to-income ratio"""
-        ratio = self.profile.get_debt_to_income_ratio()
+        ratio = snapshot.get_debt_to_income_ratio()
         
         if ratio == 0:
             return 0  # No debt = no risk
@@ -58,18 +162,14 @@ class FinancialRiskCalculator:
         else:
             return 90  # Very high risk
     
-    def _calculate_emergency_fund_risk(self):
+    def _calculate_emergency_fund_risk(self, snapshot):
         """Calculate risk based on emergency fund coverage"""
-        monthly_expenses = self.profile.get_total_expenses()
-        liquid_assets = sum(
-            asset.value for asset in self.profile.assets.all() 
-            if asset.is_liquid_asset()
-        )
+        monthly_expenses = snapshot.monthly_expenses
         
         if monthly_expenses == 0:
             return 0
         
-        months_covered = liquid_assets / monthly_expenses if monthly_expenses > 0 else 0
+        months_covered = snapshot.liquid_assets / monthly_expenses
         
         if months_covered >= 6:
             return 5   # Excellent emergency fund
@@ -80,18 +180,13 @@ class FinancialRiskCalculator:
         else:
             return 85  # No emergency fund
     
-    def _calculate_high_interest_debt_risk(self):
+    def _calculate_high_interest_debt_risk(self, snapshot):
         """Calculate risk based on high-interest debt"""
-        total_debt = self.profile.get_total_debt_balance()
+        total_debt = snapshot.debt_balance
         if total_debt == 0:
             return 0
         
-        high_interest_debt = sum(
-            debt.remaining_balance for debt in self.profile.debts.all()
-            if debt.is_high_interest()
-        )
-        
-        high_interest_ratio = (high_interest_debt / total_debt) * 100
+        high_interest_ratio = (snapshot.high_interest_balance / total_debt) * 100
         
         if high_interest_ratio == 0:
             return 5
@@ -102,9 +197,9 @@ class FinancialRiskCalculator:
         else:
             return 90
     
-    def _calculate_income_stability_risk(self):
+    def _calculate_income_stability_risk(self, snapshot):
         """Calculate risk based on income source diversity"""
-        income_sources = self.profile.incomes.count()
+        income_sources = snapshot.income_sources
         
         if income_sources == 0:
             return 100  # No income = maximum risk
@@ -115,15 +210,14 @@ class FinancialRiskCalculator:
         else:
             return 15   # Multiple sources = low risk
     
-    def _calculate_expense_coverage_risk(self):
+    def _calculate_expense_coverage_risk(self, snapshot):
         """Calculate risk based on income vs expenses"""
-        total_income = self.profile.get_total_income()
-        total_expenses = self.profile.get_total_expenses()
+        total_income = snapshot.monthly_income
         
         if total_income == 0:
             return 100
         
-        coverage_ratio = (total_expenses / total_income) * 100
+        coverage_ratio = (snapshot.monthly_expenses / total_income) * 100
         
         if coverage_ratio <= 50:
             return 5   # Saving 50%+ of income
@@ -134,10 +228,9 @@ class FinancialRiskCalculator:
         else:
             return 95  # Spending more than earning
     
-    def _calculate_debt_diversity_risk(self):
+    def _calculate_debt_diversity_risk(self, snapshot):
         """Calculate risk based on debt type diversity"""
-        debt_types = set(debt.debt_type for debt in self.profile.debts.all())
-        debt_count = len(debt_types)
+        debt_count = snapshot.debt_type_count
         
         if debt_count == 0:
             return 0
@@ -148,10 +241,68 @@ class FinancialRiskCalculator:
         else:
             return 80  # Too many different debt types
     
+    def calculate_payoff_factors(self, projection=None):
+        """
+        Time-to-debt-free and total-interest factors from a debt payoff projection
+        Defaults to an avalanche projection of the profile's debts. Reported
+        alongside the weighted factors, not in them, so scores stay comparable
+        with the assessment history.
+        """
+        if projection is None:
+            projection = DebtPayoffProjection.from_debts(list(self.profile.debts.all()))
+        if projection.payoff_months is None:
+            projection.project()
+        balance = projection.balances.sum()
+        self.payoff_factors = {
+            'time_to_debt_free': self._calculate_time_to_debt_free_risk(projection.months_to_debt_free, balance),
+            'total_interest': self._calculate_total_interest_risk(projection.total_interest, balance),
+        }
+        return self.payoff_factors
+
+    def _calculate_time_to_debt_free_risk(self, months, balance):
+        """Calculate risk based on how long paying off every debt takes"""
+        if balance == 0:
+            return 0
+        elif months is None:
+            return 100  # Minimums never clear the balance
+        elif months <= 12:
+            return 5
+        elif months <= 60:
+            return 25
+        elif months <= 120:
+            return 50
+        elif months <= 240:
+            return 75
+        else:
+            return 90
+
+    def _calculate_total_interest_risk(self, total_interest, balance):
+        """Calculate risk based on lifetime interest as a share of today's balance"""
+        if balance == 0:
+            return 0
+
+        interest_ratio = (total_interest / balance) * 100
+
+        if interest_ratio <= 10:
+            return 5
+        elif interest_ratio <= 25:
+            return 20
+        elif interest_ratio <= 50:
+            return 40
+        elif interest_ratio <= 100:
+            return 70
+        else:
+            return 90
+
     def generate_risk_summary(self):
         """Generate a text summary of the risk assessment"""
-        score = self.calculate_risk_score()
-        
+        if not self.risk_factors:
+            self.calculate_risk_score()
+        return self.summarize(self.total_score, self.risk_factors)
+    
+    @staticmethod
+    def summarize(score, risk_factors):
+        """Build the summary text for a score and its factor scores"""
         summary_parts = []
         
         # Overall risk level
@@ -167,16 +318,111 @@ class FinancialRiskCalculator:
             summary_parts.append("Your financial risk is very high. Immediate action recommended.")
         
         # Specific recommendations
-        if self.risk_factors.get('debt_to_income_ratio', 0) > 50:
+        if risk_factors.get('debt_to_income_ratio', 0) > 50:
             summary_parts.append("Consider reducing debt payments or increasing income.")
         
-        if self.risk_factors.get('emergency_fund_ratio', 0) > 70:
+        if risk_factors.get('emergency_fund_ratio', 0) > 70:
             summary_parts.append("Build an emergency fund covering 3-6 months of expenses.")
         
-        if self.risk_factors.get('high_interest_debt', 0) > 60:
+        if risk_factors.get('high_interest_debt', 0) > 60:
             summary_parts.append("Focus on paying down high-interest debt first.")
         
-        if self.risk_factors.get('expense_coverage', 0) > 70:
+        if risk_factors.get('expense_coverage', 0) > 70:
             summary_parts.append("Review expenses and create a budget to live within your means.")
         
-        return " ".join(summary_parts)
\ No newline at end of file
+        return " ".join(summary_parts)
+
+
+class ColumnarRiskCalculator:
+    """
+    Vectorised FinancialRiskCalculator for scoring many profiles at once
+    Each input holds one element per profile. Ratios are NaN where they are
+    undefined: months_covered with no expenses, high_interest_share with no
+    debt and expense_coverage with no income. Results are identical to the
+    scalar calculator for the same inputs.
+    """
+
+    # Ladder boundaries and the factor score for each band, lowest band first
+    DEBT_RATIO_BINS, DEBT_RATIO_SCORES = [20, 36, 50], [10, 25, 60, 90]
+    EMERGENCY_FUND_BINS, EMERGENCY_FUND_SCORES = [1, 3, 6], [85, 50, 20, 5]
+    HIGH_INTEREST_BINS, HIGH_INTEREST_SCORES = [25, 50], [30, 60, 90]
+    INCOME_STABILITY_BINS, INCOME_STABILITY_SCORES = [0, 1, 2], [100, 70, 40, 15]
+    EXPENSE_COVERAGE_BINS, EXPENSE_COVERAGE_SCORES = [50, 80, 100], [5, 20, 50, 95]
+    DEBT_DIVERSITY_BINS, DEBT_DIVERSITY_SCORES = [0, 2, 4], [0, 20, 50, 80]
+
+    def __init__(self, dti_ratio, months_covered, high_interest_share,
+                 income_sources, expense_coverage, debt_type_count):
+        self.dti_ratio = np.asarray(dti_ratio, dtype=np.float64)
+        self.months_covered = np.asarray(months_covered, dtype=np.float64)
+        self.high_interest_share = np.asarray(high_interest_share, dtype=np.float64)
+        self.income_sources = np.asarray(income_sources, dtype=np.int64)
+        self.expense_coverage = np.asarray(expense_coverage, dtype=np.float64)
+        self.debt_type_count = np.asarray(debt_type_count, dtype=np.int64)
+        self.risk_factors = {}
+        self.total_scores = None
+
+    @classmethod
+    def from_snapshots(cls, snapshots):
+        """
+        Build the input columns from FinancialSnapshot objects
+        Ratios are computed in Decimal exactly as the scalar calculator does
+        and only then converted to floats.
+        """
+        nan = float('nan')
+        columns = {name: [] for name in (
+            'dti_ratio', 'months_covered', 'high_interest_share',
+            'income_sources', 'expense_coverage', 'debt_type_count',
+        )}
+        for snapshot in snapshots:
+            income, expenses, debt = snapshot.monthly_income, snapshot.monthly_expenses, snapshot.debt_balance
+            columns['dti_ratio'].append(float(snapshot.get_debt_to_income_ratio()))
+            columns['months_covered'].append(float(snapshot.liquid_assets / expenses) if expenses != 0 else nan)
+            columns['high_interest_share'].append(
+                float((snapshot.high_interest_balance / debt) * 100) if debt != 0 else nan
+            )
+            columns['income_sources'].append(snapshot.income_sources)
+            columns['expense_coverage'].append(float((expenses / income) * 100) if income != 0 else nan)
+            columns['debt_type_count'].append(snapshot.debt_type_count)
+        return cls(**columns)
+
+    @staticmethod
+    def _ladder(values, bins, scores, right=True):
+        """Map each value to the score of the band it falls in"""
+        return np.asarray(scores)[np.digitize(values, bins, right=right)]
+
+    def calculate_risk_factors(self):
+        """Return factor name -> array of factor scores"""
+        months_covered = np.nan_to_num(self.months_covered)
+        high_interest_share = np.nan_to_num(self.high_interest_share)
+        expense_coverage = np.nan_to_num(self.expense_coverage)
+
+        self.risk_factors = {
+            'debt_to_income_ratio': np.where(
+                self.dti_ratio == 0, 0,
+                self._ladder(self.dti_ratio, self.DEBT_RATIO_BINS, self.DEBT_RATIO_SCORES)),
+            'emergency_fund_ratio': np.where(
+                np.isnan(self.months_covered), 0,
+                self._ladder(months_covered, self.EMERGENCY_FUND_BINS, self.EMERGENCY_FUND_SCORES, right=False)),
+            'high_interest_debt': np.select(
+                [np.isnan(self.high_interest_share), high_interest_share == 0], [0, 5],
+                self._ladder(high_interest_share, self.HIGH_INTEREST_BINS, self.HIGH_INTEREST_SCORES)),
+            'income_stability': self._ladder(
+                self.income_sources, self.INCOME_STABILITY_BINS, self.INCOME_STABILITY_SCORES),
+            'expense_coverage': np.where(
+                np.isnan(self.expense_coverage), 100,
+                self._ladder(expense_coverage, self.EXPENSE_COVERAGE_BINS, self.EXPENSE_COVERAGE_SCORES)),
+            'debt_diversity': self._ladder(
+                self.debt_type_count, self.DEBT_DIVERSITY_BINS, self.DEBT_DIVERSITY_SCORES),
+        }
+        return self.risk_factors
+
+    def calculate_risk_scores(self):
+        """Return the array of final 0-100 scores"""
+        factors = self.calculate_risk_factors()
+        # Accumulate in the scalar calculator's order so int() truncation matches
+        weighted = np.zeros(len(self.dti_ratio))
+        for factor, weight in FinancialRiskCalculator.WEIGHTS.items():
+            weighted = weighted + factors[factor] * weight
+        self.total_scores = np.clip(np.trunc(weighted), 0, 100).astype(np.int64)
+        return self.total_scores
+
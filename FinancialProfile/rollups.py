@@ -0,0 +1,108 @@
+# FinancialProfile/rollups.py
+
+from django.db.models import F
+
+from .models import FinancialProfile, FinancialRollup, Income, Expense, Debt, Asset
+from .risk_calculator import FinancialSnapshot
+
+
+# Line-item model -> FinancialSnapshot keyword it feeds
+LINE_ITEM_SNAPSHOT_KEYS = {
+    Income: 'incomes',
+    Expense: 'expenses',
+    Debt: 'debts',
+    Asset: 'assets',
+}
+
+# with_rollup_totals annotation -> FinancialRollup field
+ROLLUP_ANNOTATIONS = {
+    'total_monthly_income': 'monthly_income',
+    'total_monthly_expenses': 'monthly_expenses',
+    'total_debt_balance': 'debt_balance',
+    'total_minimum_payments': 'minimum_payments',
+    'total_high_interest_balance': 'high_interest_balance',
+    'total_liquid_assets': 'liquid_assets',
+    'total_assets_value': 'total_assets',
+    'total_income_sources': 'income_sources',
+    'total_debt_types': 'debt_type_count',
+}
+
+# Fields maintained by delta; debt_type_count is a distinct count and is recounted
+DELTA_FIELDS = [field for field in FinancialSnapshot.ROLLUP_FIELDS if field != 'debt_type_count']
+
+
+def line_item_snapshot(instance):
+    """Totals contributed by a single income, expense, debt or asset row"""
+    if instance is None:
+        return FinancialSnapshot()
+    return FinancialSnapshot(**{LINE_ITEM_SNAPSHOT_KEYS[type(instance)]: [instance]})
+
+
+def apply_rollup_delta(profile_id, before=None, after=None, create_missing=True):
+    """
+    Move a profile's rollup from a line item's previous state to its new state
+    Either side may be None for a create or delete. Returns True if a rollup
+    row was updated or built.
+    """
+    old, new = line_item_snapshot(before), line_item_snapshot(after)
+    changes = {}
+    for field in DELTA_FIELDS:
+        delta = getattr(new, field) - getattr(old, field)
+        if delta:
+            changes[field] = F(field) + delta
+
+    if isinstance(before, Debt) or isinstance(after, Debt):
+        changes['debt_type_count'] = (
+            Debt.objects.filter(profile_id=profile_id).values('debt_type').distinct().count()
+        )
+
+    if not changes:
+        return True
+
+    updated = FinancialRollup.objects.filter(profile_id=profile_id).update(**changes)
+    if updated:
+        return True
+    if create_missing and FinancialProfile.objects.filter(pk=profile_id).exists():
+        rebuild_rollups(FinancialProfile.objects.filter(pk=profile_id))
+        return True
+    return False
+
+
+def forget_cached_rollup(profile):
+    """Drop a rollup cached on a profile instance so the next read sees the update"""
+    related = FinancialProfile.rollup.related
+    if related.is_cached(profile):
+        related.delete_cached_value(profile)
+
+
+def rebuild_rollups(queryset=None, batch_size=500):
+    """
+    Recompute rollups from the line-item tables, one query per batch of profiles
+    Returns the number of profiles rebuilt.
+    """
+    if queryset is None:
+        queryset = FinancialProfile.objects.all()
+    queryset = queryset.order_by('pk').with_rollup_totals()
+
+    rebuilt = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        rollups = [
+            FinancialRollup(
+                profile_id=profile.pk,
+                **{field: getattr(profile, annotation) for annotation, field in ROLLUP_ANNOTATIONS.items()}
+            )
+            for profile in batch
+        ]
+        FinancialRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['profile'],
+            update_fields=[*ROLLUP_ANNOTATIONS.values(), 'updated_at'],
+        )
+        rebuilt += len(batch)
+        last_pk = batch[-1].pk
+    return rebuilt
@@ -65,6 +65,7 @@ class AssetSerializer(serializers.ModelSerializer):
 
 
 class RiskAssessmentHistorySerializer(serializers.ModelSerializer):
+    summary = serializers.ReadOnlyField()
     risk_level_display = serializers.ReadOnlyField(source='get_risk_level_display')
     risk_color = serializers.ReadOnlyField(source='get_risk_level_display_color')
     
@@ -83,7 +84,10 @@ class FinancialProfileSerializer(serializers.ModelSerializer):
     expenses = ExpenseSerializer(many=True, read_only=True)
     debts = DebtSerializer(many=True, read_only=True)
     assets = AssetSerializer(many=True, read_only=True)
-    risk_assessments = RiskAssessmentHistorySerializer(many=True, read_only=True)
+    risk_assessments = RiskAssessmentHistorySerializer(
+        many=True, read_only=True, source='get_recent_risk_assessments'
+    )
+    risk_assessment_count = serializers.ReadOnlyField(source='get_risk_assessment_count')
     
     # Calculated fields
     total_income = serializers.ReadOnlyField(source='get_total_income')
@@ -106,14 +110,15 @@ class FinancialProfileSerializer(serializers.ModelSerializer):
             'total_assets_value', 'net_worth', 'debt_to_income_ratio',
             'latest_risk_score', 'has_complete_profile',
             'incomes', 'expenses', 'debts', 'assets', 'risk_assessments',
-            'created_at', 'updated_at'
+            'risk_assessment_count', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'user', 'username', 'last_assessed', 'created_at', 'updated_at',
             'total_income', 'total_expenses', 'total_debt_balance', 
             'total_assets_value', 'net_worth', 'debt_to_income_ratio',
             'latest_risk_score', 'has_complete_profile',
-            'incomes', 'expenses', 'debts', 'assets', 'risk_assessments'
+            'incomes', 'expenses', 'debts', 'assets', 'risk_assessments',
+            'risk_assessment_count'
         ]
 
 
@@ -122,22 +127,54 @@ class FinancialProfileSummarySerializer(serializers.ModelSerializer):
     total_income = serializers.ReadOnlyField(source='get_total_income')
     net_worth = serializers.ReadOnlyField(source='get_net_worth')
     latest_risk_score = serializers.ReadOnlyField(source='get_latest_risk_score')
+    latest_risk_level = serializers.ReadOnlyField(source='get_latest_risk_level')
     username = serializers.ReadOnlyField(source='user.username')
     
     class Meta:
         model = FinancialProfile
         fields = [
             'id', 'username', 'last_assessed', 'total_income', 
-            'net_worth', 'latest_risk_score', 'created_at'
+            'net_worth', 'latest_risk_score', 'latest_risk_level', 'created_at'
         ]
 
 
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    List serializer for bulk ingestion
+    Valid items are kept and invalid ones are reported in `item_errors` as
+    (index, errors) instead of failing the whole list. Saving inserts every
+    item with bulk_create, so no per-row save signals are sent.
+    """
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Expected a list of items.']
+            })
+
+        self.item_errors = []
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                self.item_errors.append((index, exc.detail))
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objects = [model(**attrs) for attrs in validated_data]
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+
 # Nested serializers for creating related objects
 class IncomeCreateSerializer(serializers.ModelSerializer):
     frequency = serializers.ChoiceField(choices=Income.FREQUENCY_CHOICES, required = True)
     class Meta:
         model = Income
         fields = ['source_name', 'amount', 'frequency']
+        list_serializer_class = BulkCreateListSerializer
 
 
 class ExpenseCreateSerializer(serializers.ModelSerializer):
@@ -146,6 +183,7 @@ class ExpenseCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
         fields = ['category', 'amount', 'frequency']
+        list_serializer_class = BulkCreateListSerializer
 
 
 class DebtCreateSerializer(serializers.ModelSerializer):
@@ -153,6 +191,7 @@ class DebtCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Debt
         fields = ['debt_name', 'debt_type', 'total_amount', 'remaining_balance', 'minimum_amount', 'interest_rate']
+        list_serializer_class = BulkCreateListSerializer
     
     def validate(self, data):
         if data['remaining_balance'] > data['total_amount']:
@@ -167,9 +206,12 @@ class AssetCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Asset
         fields = ['asset_name', 'asset_type', 'value']
+        list_serializer_class = BulkCreateListSerializer
 
 
 class RiskAssessmentCreateSerializer(serializers.ModelSerializer):
+    summary = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
     class Meta:
         model = RiskAssessmentHistory
         fields = ['score', 'summary']
\ No newline at end of file
@@ -1,9 +1,18 @@
 # FinancialProfile/signals.py
 
-from django.db.models.signals import post_save, post_delete
+import logging
+
+from django.db import models, transaction
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import FinancialProfile, Income, Expense, Debt, Asset
+from users.authentication import revoke_token_claims
+from .models import FinancialProfile, FinancialRollup, Income, Expense, Debt, Asset, RiskAssessmentHistory
+from .assessment_queue import get_assessment_queue
+from .caching import forget_user_profile
+from .distribution import cohorts_for, record_score_changes
+from .request_profile import scoped_profile
+from .rollups import apply_rollup_delta, forget_cached_rollup
 
 User = get_user_model()
 
@@ -23,30 +32,212 @@ def save_financial_profile(sender, instance, **kwargs):
     Ensure the FinancialProfile is saved when User is saved
     """
     if hasattr(instance, 'financial_profile'):
-        instance.financial_profile.save()
+        # Only touch updated_at, so a stale cached profile can't overwrite assessment fields
+        instance.financial_profile.save(update_fields=['updated_at'])
+
+
+@receiver(post_save, sender=FinancialProfile)
+def create_financial_rollup(sender, instance, created, raw=False, **kwargs):
+    """
+    Start every new profile with an empty rollup
+    """
+    if created and not raw:
+        FinancialRollup.objects.get_or_create(profile=instance)
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Debt)
+@receiver(pre_save, sender=Asset)
+def remember_rollup_contribution(sender, instance, raw=False, **kwargs):
+    """
+    Keep the stored version of an updated line item so its rollup delta can be computed
+    """
+    instance._rollup_previous = None
+    if not raw and instance.pk is not None:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+def _forget_cached_rollups(sender, instance):
+    """Drop the rollup cached on the line item's profile and on the request's copy of it"""
+    if sender.profile.is_cached(instance):
+        forget_cached_rollup(instance.profile)
+    profile = scoped_profile(instance.profile_id)
+    if profile is not None:
+        forget_cached_rollup(profile)
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Debt)
+@receiver(post_save, sender=Asset)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Apply a saved line item's change to its profile's FinancialRollup
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous.profile_id != instance.profile_id:
+        apply_rollup_delta(previous.profile_id, before=previous)
+        previous = None
+    apply_rollup_delta(instance.profile_id, before=previous, after=instance)
+    _forget_cached_rollups(sender, instance)
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Debt)
+@receiver(post_delete, sender=Asset)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Remove a deleted line item from its profile's FinancialRollup
+    Skipped when the whole profile (or user) is being deleted.
+    """
+    if isinstance(origin, models.Model) and not isinstance(origin, sender):
+        return
+    apply_rollup_delta(instance.profile_id, before=instance, create_missing=False)
+    _forget_cached_rollups(sender, instance)
+
+
+def _skip_delete_handlers(sender, origin):
+    """
+    Whether a row is deleted along with its profile, or is an assessment
+    deleted by compaction, which keeps latest assessments and touches
+    profiles itself
+    """
+    if isinstance(origin, models.Model) and not isinstance(origin, sender):
+        return True
+    return getattr(origin, 'compacted', False)
+
+
+@receiver(pre_delete, sender=RiskAssessmentHistory)
+def remember_deleted_latest_score(sender, instance, origin=None, **kwargs):
+    """
+    Keep the user's date of birth when the profile's latest assessment is
+    deleted, so the distribution index can move it to the repointed score
+    """
+    instance._distribution_previous = None
+    if _skip_delete_handlers(sender, origin):
+        return
+    date_of_birth = (
+        FinancialProfile.objects.filter(pk=instance.profile_id, latest_assessment_id=instance.pk)
+        .values_list('user__date_of_birth')
+        .first()
+    )
+    if date_of_birth is not None:
+        instance._distribution_previous = (instance.score, date_of_birth[0])
+
+
+@receiver(post_delete, sender=RiskAssessmentHistory)
+def repoint_latest_assessment(sender, instance, origin=None, **kwargs):
+    """
+    Point the profile back at its newest remaining assessment when the
+    latest one is deleted (the FK has already been set to NULL)
+    """
+    if _skip_delete_handlers(sender, origin):
+        return
+    FinancialProfile.objects.filter(
+        pk=instance.profile_id, latest_assessment__isnull=True
+    ).refresh_latest_assessments()
+    previous = getattr(instance, '_distribution_previous', None)
+    if previous is not None:
+        deleted_score, date_of_birth = previous
+        new_score = FinancialProfile.objects.filter(pk=instance.profile_id).values_list(
+            'latest_assessment__score', flat=True
+        ).first()
+        record_score_changes([(cohorts_for(date_of_birth), deleted_score, new_score)])
+
+
+@receiver(pre_save, sender=RiskAssessmentHistory)
+def remember_replaced_score(sender, instance, raw=False, **kwargs):
+    """
+    Keep the score a new assessment replaces as the profile's latest, and the
+    user's date of birth, for the score distribution index
+    """
+    instance._distribution_previous = None
+    if raw or not instance._state.adding:
+        return
+    profile = scoped_profile(instance.profile_id)
+    if profile is not None:
+        # Loaded by this request with its user and latest assessment
+        latest = profile.latest_assessment
+        instance._distribution_previous = (latest.score if latest else None, profile.user.date_of_birth)
+    else:
+        instance._distribution_previous = (
+            FinancialProfile.objects.filter(pk=instance.profile_id)
+            .values_list('latest_assessment__score', 'user__date_of_birth')
+            .first()
+        )
+
+
+@receiver(post_save, sender=RiskAssessmentHistory)
+def update_score_distribution(sender, instance, created, raw=False, **kwargs):
+    """
+    Move the profile from its previous score to the new one in the distribution index
+    """
+    previous = getattr(instance, '_distribution_previous', None)
+    if raw or not created or previous is None:
+        return
+    old_score, date_of_birth = previous
+    record_score_changes([(cohorts_for(date_of_birth), old_score, instance.score)])
+    profile = scoped_profile(instance.profile_id)
+    if profile is not None:
+        profile.latest_assessment = instance
 
 
 @receiver([post_save, post_delete], sender=Income)
 @receiver([post_save, post_delete], sender=Expense)
 @receiver([post_save, post_delete], sender=Debt)
 @receiver([post_save, post_delete], sender=Asset)
-def auto_create_risk_assessment(sender, instance, **kwargs):
+def auto_create_risk_assessment(sender, instance, raw=False, origin=None, **kwargs):
     """
-    Automatically create a new risk assessment whenever financial data changes
+    Mark the profile for a new risk assessment whenever financial data changes
+    Scoring happens in the configured assessment queue once the transaction
+    commits, so it is not part of the write's latency.
     """
-    profile = instance.profile
-    import logging
+    if raw or (isinstance(origin, models.Model) and not isinstance(origin, sender)):
+        return
+    profile_id = instance.profile_id
     logger = logging.getLogger("financial_risk.signals")
-    logger.info(f"Signal triggered for {sender.__name__}, profile: {profile.id}")
-    logger.info(f"Profile complete: {profile.has_complete_profile()}")
-    # Only create assessment if profile has complete data
-    if profile.has_complete_profile():
-        try:
-            # Create new risk assessment
-            assessment = profile.create_risk_assessment()
-            logger.info(f"Auto-created risk assessment: Score {assessment.score} for {profile.user.username}")
-        except Exception as e:
-            logger.error(f"Error creating risk assessment: {e}", exc_info=True)
+    logger.info(f"Signal triggered for {sender.__name__}, profile: {profile_id}")
+    transaction.on_commit(lambda: get_assessment_queue().enqueue(profile_id))
+
+
+@receiver([post_save, post_delete], sender=Income)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Debt)
+@receiver([post_save, post_delete], sender=Asset)
+@receiver(post_delete, sender=RiskAssessmentHistory)
+def touch_profile(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Give the profile a new data version, so its ETags change and its cached
+    responses are rebuilt; saving an assessment saves the profile already
+    """
+    if raw or _skip_delete_handlers(sender, origin):
+        return
+    FinancialProfile.objects.filter(pk=instance.profile_id).touch()
+
+
+@receiver(pre_delete, sender=FinancialProfile)
+def remember_deleted_profile_score(sender, instance, **kwargs):
+    """Keep a deleted profile's latest score and cohorts for the distribution index"""
+    instance._distribution_previous = (
+        FinancialProfile.objects.filter(pk=instance.pk)
+        .values_list('latest_assessment__score', 'user__date_of_birth')
+        .first()
+    )
+
+
+@receiver(post_delete, sender=FinancialProfile)
+def forget_deleted_profile(sender, instance, **kwargs):
+    forget_user_profile(instance.user_id)
+    previous = getattr(instance, '_distribution_previous', None)
+    if previous is not None:
+        score, date_of_birth = previous
+        record_score_changes([(cohorts_for(date_of_birth), score, None)])
+    # Tokens name the profile in their claims
+    revoke_token_claims(instance.user_id)
 
 
 # # Alternative: Only create assessment when profile becomes complete
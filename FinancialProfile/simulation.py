@@ -0,0 +1,166 @@
+# FinancialProfile/simulation.py
+
+import copy
+from collections import Counter
+
+from rest_framework.exceptions import ValidationError
+
+from .ingest import IMPORT_ROW_TYPES, LINE_ITEM_SERIALIZERS
+from .models import Debt, RiskAssessmentHistory
+from .risk_calculator import ColumnarRiskCalculator, FinancialSnapshot
+from .rollups import DELTA_FIELDS, line_item_snapshot
+
+SIMULATION_ACTIONS = ('add', 'remove', 'edit')
+
+
+class ScenarioSimulator:
+    """
+    Score hypothetical changes to a profile's line items without writing them
+    The line items are loaded once. Each scenario moves a copy of the
+    baseline totals by the rows it changes only, and every scenario is then
+    scored in one ColumnarRiskCalculator batch.
+    """
+
+    MAX_SCENARIOS = 500
+    MAX_CHANGES = 100
+
+    def __init__(self, profile):
+        self.errors = []
+        # LINE_ITEM_SERIALIZERS key -> {pk: row}, one query per table
+        self.rows = {
+            key: {row.pk: row for row in getattr(profile, key).all()}
+            for key in LINE_ITEM_SERIALIZERS
+        }
+        self.baseline = FinancialSnapshot(**{key: rows.values() for key, rows in self.rows.items()})
+        self.debt_types = Counter(debt.debt_type for debt in self.rows['debts'].values())
+        # One serializer per type validates every change, as BulkCreateListSerializer does
+        self.validators = {key: serializer_class() for key, (serializer_class, _) in LINE_ITEM_SERIALIZERS.items()}
+
+    def _resolve(self, change, current):
+        """
+        The (before, after) rows of one change, given the rows the scenario
+        has already changed in `current` ((key, pk) -> row, None once removed)
+        """
+        if not isinstance(change, dict):
+            raise ValidationError({'non_field_errors': ['Each change must be an object.']})
+        action = change.get('action')
+        if action not in SIMULATION_ACTIONS:
+            raise ValidationError({'action': [f"Must be one of: {', '.join(SIMULATION_ACTIONS)}."]})
+        key = IMPORT_ROW_TYPES.get(change.get('type'))
+        if key is None:
+            raise ValidationError({'type': [f"Must be one of: {', '.join(IMPORT_ROW_TYPES)}."]})
+        serializer_class, label = LINE_ITEM_SERIALIZERS[key]
+
+        before = None
+        if action != 'add':
+            pk = change.get('id')
+            row = current.get((key, pk), self.rows[key].get(pk)) if isinstance(pk, int) else None
+            if row is None:
+                raise ValidationError({'id': [f'No {label} with id {pk!r}.']})
+            before = row
+        if action == 'remove':
+            current[(key, pk)] = None
+            return before, None
+
+        data = change.get('data')
+        if not isinstance(data, dict):
+            raise ValidationError({'data': ['Must be an object of field values.']})
+        if before is not None:
+            # Edits are validated as the whole edited row, so cross-field checks still apply
+            data = {**{field: getattr(before, field) for field in serializer_class.Meta.fields}, **data}
+        after = serializer_class.Meta.model(**self.validators[key].run_validation(data))
+        if before is not None:
+            after.pk = before.pk
+            current[(key, pk)] = after
+        return before, after
+
+    def apply(self, changes):
+        """
+        The baseline snapshot with `changes` applied
+        Returns (snapshot, errors); errors lists (change index, error detail).
+        """
+        snapshot = copy.copy(self.baseline)
+        debt_types = self.debt_types.copy()
+        current = {}
+        errors = []
+        for index, change in enumerate(changes):
+            try:
+                before, after = self._resolve(change, current)
+            except ValidationError as exc:
+                errors.append((index, exc.detail))
+                continue
+
+            old, new = line_item_snapshot(before), line_item_snapshot(after)
+            for field in DELTA_FIELDS:
+                setattr(snapshot, field, getattr(snapshot, field) - getattr(old, field) + getattr(new, field))
+            if isinstance(before, Debt):
+                debt_types[before.debt_type] -= 1
+            if isinstance(after, Debt):
+                debt_types[after.debt_type] += 1
+
+        snapshot.debt_types = {debt_type for debt_type, count in debt_types.items() if count > 0}
+        snapshot.debt_type_count = len(snapshot.debt_types)
+        return snapshot, errors
+
+    def simulate(self, scenarios):
+        """
+        Score the baseline and every scenario in one batch
+        `scenarios` is a list of {"name": ..., "changes": [...]}. Returns None
+        if any scenario is invalid, with the problems left in self.errors, so
+        no partial result is returned.
+        """
+        self.errors = []
+        if not isinstance(scenarios, list) or not 1 <= len(scenarios) <= self.MAX_SCENARIOS:
+            self.errors.append({'scenarios': [f'Must be a list of 1 to {self.MAX_SCENARIOS} scenarios.']})
+            return None
+
+        names, snapshots = [], [self.baseline]
+        for position, scenario in enumerate(scenarios):
+            changes = scenario.get('changes') if isinstance(scenario, dict) else None
+            if not isinstance(changes, list) or len(changes) > self.MAX_CHANGES:
+                self.errors.append({
+                    'changes': [f'Must be a list of at most {self.MAX_CHANGES} changes.'],
+                    'scenario': position,
+                })
+                continue
+            snapshot, change_errors = self.apply(changes)
+            self.errors.extend(
+                {**detail, 'scenario': position, 'change': index} for index, detail in change_errors
+            )
+            names.append(scenario.get('name') or f'Scenario {position + 1}')
+            snapshots.append(snapshot)
+        if self.errors:
+            return None
+
+        calculator = ColumnarRiskCalculator.from_snapshots(snapshots)
+        scores = calculator.calculate_risk_scores()
+        results = [
+            self._result(snapshot, int(scores[position]), {
+                factor: int(values[position]) for factor, values in calculator.risk_factors.items()
+            })
+            for position, snapshot in enumerate(snapshots)
+        ]
+
+        baseline = results[0]
+        return {
+            'baseline': baseline,
+            'scenarios': [
+                {'name': name, **result, 'score_change': result['score'] - baseline['score']}
+                for name, result in zip(names, results[1:])
+            ],
+        }
+
+    @staticmethod
+    def _result(snapshot, score, risk_factors):
+        return {
+            'score': score,
+            'risk_level': RiskAssessmentHistory.risk_level_for_score(score),
+            'risk_factors': risk_factors,
+            'financial_metrics': {
+                'total_monthly_income': snapshot.monthly_income,
+                'total_monthly_expenses': snapshot.monthly_expenses,
+                'total_debt_balance': snapshot.debt_balance,
+                'total_assets_value': snapshot.total_assets,
+                'debt_to_income_ratio': snapshot.get_debt_to_income_ratio(),
+            },
+        }
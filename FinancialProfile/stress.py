@@ -0,0 +1,154 @@
+# FinancialProfile/stress.py
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .money import monthly_amount
+
+
+class CashFlowStressTest:
+    """
+    Monte Carlo projection of a profile's monthly cash flow
+    Every path draws, month by month, job loss and re-employment for each
+    income row, inflation for each expense category and a shared move in
+    interest rates passed on to variable-rate debts. Liquid assets absorb
+    each month's surplus or shortfall, and a path is depleted the first month
+    they reach zero. Paths are simulated together as NumPy arrays.
+    """
+
+    DEFAULT_PATHS = 10000
+    DEFAULT_MONTHS = 36
+    DEFAULT_SEED = 0
+    MAX_PATHS = 50000
+    MIN_MONTHS, MAX_MONTHS = 12, 60
+
+    # Monthly chance an income row stops, and that a stopped one restarts
+    JOB_LOSS_PROBABILITY = 0.01  # About 11% a year
+    REEMPLOYMENT_PROBABILITY = 1 / 6  # Six months without it on average
+
+    # Expense category -> (annual inflation, annual volatility)
+    EXPENSE_INFLATION = {
+        'housing': (0.04, 0.03),
+        'transportation': (0.03, 0.05),
+        'food': (0.035, 0.03),
+        'utilities': (0.04, 0.06),
+        'healthcare': (0.05, 0.04),
+        'insurance': (0.05, 0.03),
+        'education': (0.045, 0.03),
+    }
+    DEFAULT_INFLATION = (0.03, 0.02)
+
+    # Debts carry no fixed/variable flag; these types usually track market rates
+    VARIABLE_RATE_DEBT_TYPES = ('credit_card', 'personal_loan', 'other')
+    RATE_VOLATILITY = 0.25  # Percentage points per month
+
+    def __init__(self, incomes, expenses, debt_payments, variable_balances, variable_rates, liquid_assets):
+        """
+        incomes holds the monthly amount of each income row, expenses maps
+        category -> monthly amount, debt_payments is the monthly total of
+        minimum payments and the variable_* arrays describe variable-rate debts
+        """
+        self.incomes = np.asarray(incomes, dtype=np.float64)
+        self.expense_categories = list(expenses)
+        self.expenses = np.asarray([expenses[category] for category in self.expense_categories], dtype=np.float64)
+        self.debt_payments = float(debt_payments)
+        self.variable_balances = np.asarray(variable_balances, dtype=np.float64)
+        self.variable_rates = np.asarray(variable_rates, dtype=np.float64)
+        self.liquid_assets = float(liquid_assets)
+
+        # Filled in by run(): one element per path
+        self.depletion_months = None
+        self.ending_liquid_assets = None
+        self.paths = self.months = self.seed = None
+
+    @classmethod
+    def from_line_items(cls, incomes=(), expenses=(), debts=(), assets=()):
+        """Build a stress test from a profile's income, expense, debt and asset rows"""
+        expense_totals = defaultdict(float)
+        for expense in expenses:
+            expense_totals[expense.category] += float(monthly_amount(expense.amount, expense.frequency))
+        variable = [debt for debt in debts if debt.debt_type in cls.VARIABLE_RATE_DEBT_TYPES]
+        return cls(
+            incomes=[monthly_amount(income.amount, income.frequency) for income in incomes],
+            expenses=expense_totals,
+            debt_payments=sum(debt.minimum_amount for debt in debts),
+            variable_balances=[debt.remaining_balance for debt in variable],
+            variable_rates=[debt.interest_rate for debt in variable],
+            liquid_assets=sum(asset.value for asset in assets if asset.is_liquid_asset()),
+        )
+
+    @classmethod
+    def for_profile(cls, profile):
+        """Load a profile's line items with one query per table"""
+        return cls.from_line_items(
+            incomes=profile.incomes.all(),
+            expenses=profile.expenses.all(),
+            debts=profile.debts.all(),
+            assets=profile.assets.all(),
+        )
+
+    def run(self, paths=DEFAULT_PATHS, months=DEFAULT_MONTHS, seed=DEFAULT_SEED):
+        """Simulate `paths` cash-flow paths of `months` months; the same seed gives the same paths"""
+        rng = np.random.default_rng(seed)
+        inflation = np.asarray(
+            [self.EXPENSE_INFLATION.get(category, self.DEFAULT_INFLATION) for category in self.expense_categories],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        # Monthly log-normal steps with the annual mean and volatility above
+        drift = inflation[:, 0] / 12 - inflation[:, 1] ** 2 / 24
+        volatility = inflation[:, 1] / math.sqrt(12)
+
+        employed = np.ones((paths, len(self.incomes)), dtype=bool)
+        prices = np.ones((paths, len(self.expenses)))
+        rate_shift = np.zeros(paths)
+        liquid = np.full(paths, self.liquid_assets)
+        depletion_months = np.where(liquid <= 0, 0, -1)
+
+        for month in range(1, months + 1):
+            draws = rng.random(employed.shape)
+            employed = np.where(employed, draws >= self.JOB_LOSS_PROBABILITY, draws < self.REEMPLOYMENT_PROBABILITY)
+            prices *= np.exp(drift + volatility * rng.standard_normal(prices.shape))
+            rate_shift += self.RATE_VOLATILITY * rng.standard_normal(paths)
+
+            # Rates cannot fall below zero, so a cut saves at most the current interest
+            shifted_rates = np.maximum(self.variable_rates + rate_shift[:, None], 0)
+            extra_interest = (shifted_rates - self.variable_rates) @ self.variable_balances / 1200
+
+            liquid += employed @ self.incomes - prices @ self.expenses - self.debt_payments - extra_interest
+            depletion_months[(liquid <= 0) & (depletion_months < 0)] = month
+
+        self.depletion_months = depletion_months
+        self.ending_liquid_assets = liquid
+        self.paths, self.months, self.seed = paths, months, seed
+        return self
+
+    def summarize(self):
+        """Depletion probabilities and the spread of ending liquid assets"""
+        depleted = self.depletion_months >= 0
+        checkpoints = sorted({*range(12, self.months + 1, 12), self.months})
+        return {
+            'paths': self.paths,
+            'months': self.months,
+            'seed': self.seed,
+            'starting_liquid_assets': round(self.liquid_assets, 2),
+            'probability_of_depletion': float(depleted.mean()),
+            'depletion_by_month': [
+                {'month': month, 'probability': float((depleted & (self.depletion_months <= month)).mean())}
+                for month in checkpoints
+            ],
+            'median_months_to_depletion': (
+                int(np.median(self.depletion_months[depleted])) if depleted.any() else None
+            ),
+            'ending_liquid_assets': {
+                f'p{percent}': round(float(value), 2)
+                for percent, value in zip((5, 50, 95), np.percentile(self.ending_liquid_assets, (5, 50, 95)))
+            },
+        }
+
+
+def stress_test_profile(profile, paths=CashFlowStressTest.DEFAULT_PATHS,
+                        months=CashFlowStressTest.DEFAULT_MONTHS, seed=CashFlowStressTest.DEFAULT_SEED):
+    """Run a cash-flow stress test for a profile and return its summary"""
+    return CashFlowStressTest.for_profile(profile).run(paths=paths, months=months, seed=seed).summarize()
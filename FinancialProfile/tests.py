@@ -1,3 +1,1710 @@
-from django.test import TestCase
+import copy
+import io
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import force_authenticate
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import ProfileRefreshToken, StatelessJWTAuthentication
+
+from .assessment_queue import DatabaseAssessmentQueue, ImmediateAssessmentQueue, ThreadPoolAssessmentQueue
+from .benchmarks import LOAD_TEST_ENDPOINTS, check_query_budgets, run_benchmarks, seed_profiles
+from .caching import (
+    find_cached_entry, get_cached_entry, get_financial_cache, get_profile_id_for_user, store_cached_entry,
+)
+from .compaction import compact_assessments, compact_daily_buckets, compact_risk_history
+from .db_routing import DatabaseRoutingMiddleware, ReplicaRouter, routing_request
+from .distribution import ALL_COHORT, age_cohort, score_distribution_rows
+from .ingest import LINE_ITEM_SERIALIZERS, LineItemImporter
+from .models import (
+    Asset, Debt, Expense, FinancialProfile, FinancialRollup, Income, PendingRiskAssessment, RiskAssessmentHistory,
+    RiskHistoryBucket, ScoreDistribution,
+)
+from .money import MONTHLY_RATES, monthly_amount, total_monthly
+from .request_profile import get_request_profile, profile_scope
+from .rescoring import rescore_all
+from .payoff import PAYOFF_STRATEGIES, DebtPayoffProjection
+from .rollups import ROLLUP_ANNOTATIONS, rebuild_rollups
+from .serializers import (
+    BulkCreateListSerializer, ExpenseSerializer, FinancialProfileSerializer, IncomeCreateSerializer, IncomeSerializer,
+)
+from .risk_calculator import ColumnarRiskCalculator, FinancialRiskCalculator, FinancialSnapshot
+from .simulation import ScenarioSimulator
+from .stress import CashFlowStressTest
+from .trends import TREND_BUCKETS, risk_trend
+from .views import import_financial_data
+
+User = get_user_model()
+
+
+def random_money(rng, upper=200000):
+    return Decimal(rng.randint(0, upper * 100)) / 100
+
+
+def random_snapshot(rng):
+    """
+    A snapshot with random totals, biased towards zeros and the exact
+    boundaries of every factor ladder
+    """
+    snapshot = FinancialSnapshot()
+    income = rng.choice([Decimal('0'), random_money(rng)])
+    expenses = rng.choice([
+        Decimal('0'), random_money(rng),
+        income * rng.choice([Decimal('0.5'), Decimal('0.8'), Decimal('1')]),
+    ])
+    debt = rng.choice([Decimal('0'), random_money(rng, 500000)])
+
+    snapshot.monthly_income = income
+    snapshot.monthly_expenses = expenses
+    snapshot.minimum_payments = rng.choice([
+        Decimal('0'), random_money(rng, 5000),
+        income * rng.choice([Decimal('0.2'), Decimal('0.36'), Decimal('0.5')]),
+    ])
+    snapshot.liquid_assets = rng.choice([
+        Decimal('0'), random_money(rng),
+        expenses * rng.choice([Decimal('1'), Decimal('3'), Decimal('6')]),
+    ])
+    snapshot.debt_balance = debt
+    snapshot.high_interest_balance = rng.choice([
+        Decimal('0'), debt, debt * rng.choice([Decimal('0.25'), Decimal('0.5')]),
+        (debt * Decimal(rng.random())).quantize(Decimal('0.01')),
+    ])
+    snapshot.income_sources = rng.randint(0, 6)
+    snapshot.debt_type_count = rng.randint(0, 7)
+    return snapshot
+
+
+class SeededProfilesMixin:
+    """
+    Seeds `seed` (seed_profiles arguments) in setUp after clearing the
+    financial cache; users and profiles come back in the same order, the
+    first of each as self.user and self.profile
+    """
+    seed = {'profiles': 1, 'items_per_type': 1, 'assessments_per_profile': 1}
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        get_financial_cache().clear()
+        self.users = seed_profiles(**self.seed)
+        profiles = FinancialProfile.objects.in_bulk([user.pk for user in self.users], field_name='user_id')
+        self.profiles = [profiles[user.pk] for user in self.users]
+        self.user, self.profile = self.users[0], self.profiles[0]
+        if self.login:
+            self.client.force_login(self.user)
+
+
+class ColumnarRiskCalculatorTests(SimpleTestCase):
+
+    def test_matches_scalar_calculator(self):
+        """Property: for any snapshot, both calculators give the same factors and score"""
+        rng = random.Random(20240501)
+        snapshots = [random_snapshot(rng) for _ in range(5000)]
+
+        columnar = ColumnarRiskCalculator.from_snapshots(snapshots)
+        scores = columnar.calculate_risk_scores()
+
+        for position, snapshot in enumerate(snapshots):
+            scalar = FinancialRiskCalculator(None, snapshot=snapshot)
+            score = scalar.calculate_risk_score()
+            columnar_factors = {name: int(values[position]) for name, values in columnar.risk_factors.items()}
+            with self.subTest(position=position):
+                self.assertEqual(columnar_factors, scalar.risk_factors)
+                self.assertEqual(int(scores[position]), score)
+
+    def test_undefined_ratios_use_scalar_defaults(self):
+        calculator = ColumnarRiskCalculator(
+            dti_ratio=[0], months_covered=[float('nan')], high_interest_share=[float('nan')],
+            income_sources=[0], expense_coverage=[float('nan')], debt_type_count=[0],
+        )
+        calculator.calculate_risk_scores()
+        self.assertEqual(
+            {name: int(values[0]) for name, values in calculator.risk_factors.items()},
+            {
+                'debt_to_income_ratio': 0, 'emergency_fund_ratio': 0, 'high_interest_debt': 0,
+                'income_stability': 100, 'expense_coverage': 100, 'debt_diversity': 0,
+            },
+        )
+
+
+class RescoreWorkersTests(TransactionTestCase):
+    """Worker processes need committed data, hence a transaction test case"""
+
+    def latest_scores(self):
+        return dict(FinancialProfile.objects.values_list('pk', 'latest_assessment__score'))
+
+    def test_workers_match_single_process(self):
+        seed_profiles(profiles=7, items_per_type=2, assessments_per_profile=1)
+        self.assertEqual(rescore_all(chunk_size=2, workers=2), 7)
+        # The parent's connection survives the workers starting and exiting
+        in_workers = self.latest_scores()
+        self.assertEqual(RiskAssessmentHistory.objects.count(), 14)
+
+        self.assertEqual(rescore_all(chunk_size=2), 7)
+        self.assertEqual(self.latest_scores(), in_workers)
+
+    def test_nothing_to_rescore(self):
+        self.assertEqual(rescore_all(workers=2), 0)
+
+
+class AssessmentQueueTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 2, 'items_per_type': 1, 'assessments_per_profile': 0}
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.profiles[1]
+
+    def assessments(self, profile):
+        return RiskAssessmentHistory.objects.filter(profile=profile).count()
+
+    def test_immediate_backend_assesses_in_the_caller(self):
+        queue = ImmediateAssessmentQueue()
+        queue.enqueue(self.profile.pk)
+        self.assertEqual(self.assessments(self.profile), 1)
+        self.assertEqual(self.assessments(self.other), 0)
+
+        with mock.patch('FinancialProfile.assessment_queue.assess_profile', side_effect=RuntimeError('boom')):
+            with self.assertLogs('financial_risk.assessment_queue', 'ERROR'):
+                queue.enqueue(self.profile.pk)
+
+    def test_database_backend_debounces_and_drains(self):
+        queue = DatabaseAssessmentQueue(debounce_seconds=60)
+        for _ in range(5):
+            queue.enqueue(self.profile.pk)
+        queue.enqueue(self.other.pk)
+        self.assertEqual(PendingRiskAssessment.objects.count(), 2)
+        # Nothing is due inside the debounce window
+        self.assertEqual(queue.drain(), 0)
+
+        PendingRiskAssessment.objects.update(due_at=timezone.now())
+        self.assertEqual(queue.drain(limit=1), 1)
+        self.assertEqual(PendingRiskAssessment.objects.count(), 1)
+        self.assertEqual(queue.drain(), 1)
+        self.assertFalse(PendingRiskAssessment.objects.exists())
+        self.assertEqual((self.assessments(self.profile), self.assessments(self.other)), (1, 1))
+        self.assertEqual(queue.drain(), 0)
+
+    def test_database_backend_marks_restart_the_window(self):
+        queue = DatabaseAssessmentQueue(debounce_seconds=60)
+        start = timezone.now()
+        with mock.patch('django.utils.timezone.now', return_value=start):
+            queue.enqueue(self.profile.pk)
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(seconds=50)):
+            queue.enqueue(self.profile.pk)
+        self.assertEqual(PendingRiskAssessment.objects.get().due_at, start + timedelta(seconds=110))
+        # Past the first mark's window, but not the last one's
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(seconds=70)):
+            self.assertEqual(queue.drain(), 0)
+        with mock.patch('django.utils.timezone.now', return_value=start + timedelta(seconds=110)):
+            self.assertEqual(queue.drain(), 1)
+        self.assertEqual(self.assessments(self.profile), 1)
+
+    def test_database_backend_survives_failures(self):
+        queue = DatabaseAssessmentQueue(debounce_seconds=0)
+        queue.enqueue(self.profile.pk)
+        queue.enqueue(self.other.pk)
+        with mock.patch(
+            'FinancialProfile.assessment_queue.assess_profile', side_effect=[RuntimeError('boom'), None]
+        ) as assess:
+            with self.assertLogs('financial_risk.assessment_queue', 'ERROR'):
+                self.assertEqual(queue.drain(), 2)
+        # A failed mark is consumed, not retried forever
+        self.assertEqual(assess.call_count, 2)
+        self.assertFalse(PendingRiskAssessment.objects.exists())
+
+    def test_incomplete_and_missing_profiles_are_skipped(self):
+        Income.objects.filter(profile=self.profile).delete()
+        queue = ImmediateAssessmentQueue()
+        queue.enqueue(self.profile.pk)
+        queue.enqueue(self.profile.pk + self.other.pk + 1000)
+        self.assertEqual(RiskAssessmentHistory.objects.count(), 0)
+
+
+class ThreadPoolAssessmentQueueTests(TransactionTestCase):
+    """The pool's threads use their own connections, so the data must be committed"""
+
+    def run_queue(self, queue):
+        """Wait for the debounce timers to fire, then for the pool to finish"""
+        deadline = time.monotonic() + 5
+        while queue._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.executor.shutdown(wait=True)
+
+    def test_marks_are_debounced_into_one_assessment(self):
+        users = seed_profiles(profiles=2, items_per_type=1, assessments_per_profile=0)
+        profile, other = (FinancialProfile.objects.get(user=user) for user in users)
+        queue = ThreadPoolAssessmentQueue(debounce_seconds=0.2)
+        for _ in range(10):
+            queue.enqueue(profile.pk)
+        queue.enqueue(other.pk)
+        self.run_queue(queue)
+        self.assertEqual(RiskAssessmentHistory.objects.filter(profile=profile).count(), 1)
+        self.assertEqual(RiskAssessmentHistory.objects.filter(profile=other).count(), 1)
+
+    def test_marks_restart_the_timer(self):
+        queue = ThreadPoolAssessmentQueue(debounce_seconds=60)
+        queue.enqueue(1)
+        first = queue._pending[1]
+        queue.enqueue(1)
+        self.assertTrue(first.finished.is_set())
+        self.assertIsNot(queue._pending[1], first)
+        # A timer that runs out after being replaced submits nothing
+        with mock.patch.object(queue.executor, 'submit') as submit:
+            with mock.patch('threading.current_thread', return_value=first):
+                queue._submit(1)
+        submit.assert_not_called()
+        queue._pending[1].cancel()
+        queue.executor.shutdown(wait=True)
+
+    def test_failures_are_logged(self):
+        queue = ThreadPoolAssessmentQueue(debounce_seconds=0)
+        with mock.patch('FinancialProfile.assessment_queue.assess_profile', side_effect=RuntimeError('boom')):
+            with self.assertLogs('financial_risk.assessment_queue', 'ERROR'):
+                queue.enqueue(1)
+                self.run_queue(queue)
+
+
+class MonthlyNormalisationTests(TestCase):
+
+    def test_every_frequency_is_normalised(self):
+        amount = Decimal('120.00')
+        expected = {
+            'weekly': Decimal('480'), 'bi_weekly': Decimal('240'), 'monthly': Decimal('120'),
+            'quarterly': Decimal('40'), 'yearly': Decimal('10'),
+        }
+        self.assertEqual(set(MONTHLY_RATES), {value for value, _ in Income.FREQUENCY_CHOICES})
+        for frequency, monthly in expected.items():
+            self.assertEqual(monthly_amount(amount, frequency).quantize(Decimal('0.01')), monthly)
+
+    def test_all_paths_agree(self):
+        """Model, snapshot, rollup, SQL annotation and serializer totals are the same"""
+        rng = random.Random(17)
+        user = seed_profiles(profiles=1, items_per_type=0, assessments_per_profile=0)[0]
+        profile = user.financial_profile
+        frequencies = list(MONTHLY_RATES)
+        for index in range(40):
+            Income.objects.create(
+                profile=profile, source_name=f'Income {index}', amount=random_money(rng, 5000) + 1,
+                frequency=frequencies[index % len(frequencies)],
+            )
+            Expense.objects.create(
+                profile=profile, category='other', amount=random_money(rng, 2000) + 1,
+                frequency=frequencies[index % len(frequencies)],
+            )
+
+        for field, model, serializer_class, relation, get_total in (
+            ('monthly_income', Income, IncomeSerializer, 'incomes', 'get_total_income'),
+            ('monthly_expenses', Expense, ExpenseSerializer, 'expenses', 'get_total_expenses'),
+        ):
+            items = list(model.objects.filter(profile=profile))
+            # Without a rollup the profile totals its line items in Python
+            line_items = FinancialProfile.objects.get(pk=profile.pk)
+            line_items.rollup = None
+            totals = {
+                'get_monthly_amount': sum(item.get_monthly_amount() for item in items),
+                'get_total': getattr(line_items, get_total)(),
+                'snapshot': getattr(FinancialSnapshot(**{relation: items}), field),
+                'rollup': getattr(FinancialProfile.objects.get(pk=profile.pk).rollup, field),
+                'annotation': getattr(
+                    FinancialProfile.objects.with_financial_totals().get(pk=profile.pk), f'total_{field}'
+                ),
+                'serializer': sum(
+                    Decimal(str(row['monthly_amount'])) for row in serializer_class(items, many=True).data
+                ),
+            }
+            rebuild_rollups(FinancialProfile.objects.filter(pk=profile.pk))
+            totals['rebuilt_rollup'] = getattr(FinancialProfile.objects.get(pk=profile.pk).rollup, field)
+            with self.subTest(field=field):
+                # Exact, not to the cent: every path rounds each row the same way
+                self.assertEqual(totals, dict.fromkeys(totals, totals['get_monthly_amount']))
+
+    def test_boundary_amounts_stay_on_the_boundary(self):
+        """Quarterly and yearly rows that come to a round monthly amount land exactly on it"""
+        self.assertEqual(monthly_amount(Decimal('300.00'), 'quarterly'), Decimal('100'))
+        self.assertEqual(monthly_amount(Decimal('1200.00'), 'yearly'), Decimal('100'))
+        self.assertEqual(monthly_amount(Decimal('100.00'), 'quarterly'), Decimal('33.3333'))
+
+        monthly, periodic = (
+            seed_profiles(profiles=1, items_per_type=0, assessments_per_profile=0, seed=seed)[0].financial_profile
+            for seed in (1, 2)
+        )
+        # Expenses at exactly 100% of income, monthly and as yearly/quarterly rows
+        Income.objects.create(profile=monthly, source_name='Salary', amount=Decimal('100.00'), frequency='monthly')
+        Expense.objects.create(profile=monthly, category='other', amount=Decimal('100.00'), frequency='monthly')
+        Income.objects.create(profile=periodic, source_name='Salary', amount=Decimal('1200.00'), frequency='yearly')
+        Expense.objects.create(profile=periodic, category='other', amount=Decimal('300.00'), frequency='quarterly')
+
+        def risk_factors(profile):
+            calculator = FinancialRiskCalculator(FinancialProfile.objects.get(pk=profile.pk))
+            calculator.calculate_risk_score()
+            return calculator.risk_factors
+
+        self.assertEqual(risk_factors(periodic), risk_factors(monthly))
+        annotated = FinancialProfile.objects.with_financial_totals().get(pk=periodic.pk)
+        rollup = FinancialProfile.objects.get(pk=periodic.pk).rollup
+        for total in (annotated.total_monthly_income, annotated.total_monthly_expenses,
+                      rollup.monthly_income, rollup.monthly_expenses):
+            self.assertEqual(total, Decimal('100'))
+
+    def test_unknown_frequencies_count_as_zero(self):
+        profile = seed_profiles(profiles=1, items_per_type=0, assessments_per_profile=0)[0].financial_profile
+        Income.objects.create(profile=profile, source_name='Salary', amount=Decimal('100.00'), frequency='monthly')
+        daily = Income.objects.create(profile=profile, source_name='Tips', amount=Decimal('5.00'), frequency='monthly')
+        Income.objects.filter(pk=daily.pk).update(frequency='daily')
+        daily.refresh_from_db()
+
+        self.assertEqual(daily.get_monthly_amount(), Decimal('0'))
+        self.assertEqual(total_monthly(profile.incomes.all()), Decimal('100'))
+        self.assertEqual(
+            FinancialProfile.objects.with_financial_totals().get(pk=profile.pk).total_monthly_income, Decimal('100')
+        )
+
+
+def rollup_totals(profiles):
+    """Profile id -> its stored rollup totals, to the cent"""
+    def cents(value):
+        return value.quantize(Decimal('0.01')) if isinstance(value, Decimal) else value
+
+    return {
+        rollup.profile_id: {field: cents(getattr(rollup, field)) for field in ROLLUP_ANNOTATIONS.values()}
+        for rollup in FinancialRollup.objects.filter(profile__in=profiles)
+    }
+
+
+def random_line_item_fields(model, rng, name='Item'):
+    """Random values for every field of a new `model` row but its profile"""
+    choice = lambda choices: rng.choice(choices)[0]
+    if model is Income:
+        return {
+            'source_name': name, 'amount': random_money(rng, 5000) + 1,
+            'frequency': choice(Income.FREQUENCY_CHOICES),
+        }
+    if model is Expense:
+        return {
+            'amount': random_money(rng, 2000) + 1, 'frequency': choice(Expense.FREQUENCY_CHOICES),
+            'category': choice(Expense.CATEGORY_CHOICES),
+        }
+    if model is Debt:
+        total = random_money(rng, 50000) + 1
+        return {
+            'debt_name': name, 'total_amount': total,
+            'remaining_balance': (total * Decimal(rng.random())).quantize(Decimal('0.01')),
+            'minimum_amount': random_money(rng, 800), 'interest_rate': Decimal(rng.randint(0, 3000)) / 100,
+            'debt_type': choice(Debt.DEBT_TYPE_CHOICES),
+        }
+    return {'asset_name': name, 'value': random_money(rng, 40000), 'asset_type': choice(Asset.ASSET_TYPE_CHOICES)}
+
+
+class RollupTests(SeededProfilesMixin, TestCase):
+    # Fields whose change moves an item between rollup totals rather than changing its amount
+    KIND_FIELDS = {Income: 'frequency', Expense: 'frequency', Debt: 'debt_type', Asset: 'asset_type'}
+    seed = {'profiles': 2, 'items_per_type': 2, 'assessments_per_profile': 0}
+
+    def assert_matches_rebuild(self, step):
+        incremental = rollup_totals(self.profiles)
+        rebuild_rollups(FinancialProfile.objects.filter(pk__in=[profile.pk for profile in self.profiles]))
+        self.assertEqual(incremental, rollup_totals(self.profiles), f'after step {step}')
+
+    def test_random_mutations_match_a_rebuild(self):
+        rng = random.Random(3)
+        for step in range(200):
+            model = rng.choice([Income, Expense, Debt, Asset])
+            items = list(model.objects.filter(profile__in=self.profiles).order_by('pk'))
+            actions = ['create', 'update', 'change kind', 'save unchanged', 'delete'] if items else ['create']
+            action = rng.choice(actions)
+            item = rng.choice(items) if items else None
+            if action == 'create':
+                fields = random_line_item_fields(model, rng, f'Item {step}')
+                model.objects.create(profile=rng.choice(self.profiles), **fields)
+            elif action == 'delete':
+                item.delete()
+            else:
+                if action == 'update':
+                    for field, value in random_line_item_fields(model, rng).items():
+                        setattr(item, field, value)
+                elif action == 'change kind':
+                    field = self.KIND_FIELDS[model]
+                    setattr(item, field, random_line_item_fields(model, rng)[field])
+                item.save()
+            if step % 20 == 19:
+                self.assert_matches_rebuild(step)
+        self.assert_matches_rebuild(step)
+
+
+@override_settings(RISK_ASSESSMENT_QUEUE={'BACKEND': 'FinancialProfile.assessment_queue.DatabaseAssessmentQueue'})
+class BulkCreateTests(SeededProfilesMixin, TestCase):
+
+    def test_invalid_items_are_reported_and_the_rest_saved(self):
+        serializer = IncomeCreateSerializer(many=True, data=[
+            {'source_name': 'Salary', 'amount': '4000.00', 'frequency': 'monthly'},
+            {'source_name': 'Gift', 'amount': '-5', 'frequency': 'monthly'},
+            {'source_name': 'Rent', 'amount': '900.00', 'frequency': 'fortnightly'},
+            {'source_name': 'Dividends', 'amount': '300.00', 'frequency': 'quarterly'},
+        ])
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual([index for index, _ in serializer.item_errors], [1, 2])
+        self.assertIn('frequency', serializer.item_errors[1][1])
+
+        with mock.patch.object(BulkCreateListSerializer, 'batch_size', 1), self.assertNumQueries(2):
+            created = serializer.save(profile=self.profile)
+        self.assertEqual([income.source_name for income in created], ['Salary', 'Dividends'])
+
+        self.assertFalse(IncomeCreateSerializer(many=True, data={'source_name': 'Salary'}).is_valid())
+
+    def test_endpoint_keeps_rollup_and_assessment_queue_consistent(self):
+        version = self.profile.data_version
+        assessments = RiskAssessmentHistory.objects.filter(profile=self.profile).count()
+        self.client.force_login(self.user)
+        rng = random.Random(5)
+        payload = {
+            key: [random_line_item_fields(serializer_class.Meta.model, rng) for _ in range(4)]
+            for key, (serializer_class, _) in LINE_ITEM_SERIALIZERS.items()
+        }
+        payload['debts'].append({'debt_name': 'Bad', 'debt_type': 'other', 'total_amount': '10.00',
+                                 'remaining_balance': '20.00', 'minimum_amount': '1.00', 'interest_rate': '5.00'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk-create-financial-data'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([body[f'{key}_created'] for key in LINE_ITEM_SERIALIZERS], [4, 4, 4, 4])
+        self.assertEqual(body['errors'], [{'debt': {'non_field_errors': [
+            'Remaining balance cannot exceed total amount'
+        ]}, 'index': 4}])
+
+        # bulk_create sent no save signals: the rollup and version are brought up to date once
+        incremental = rollup_totals([self.profile])
+        rebuild_rollups(FinancialProfile.objects.filter(pk=self.profile.pk))
+        self.assertEqual(incremental, rollup_totals([self.profile]))
+        self.profile.refresh_from_db()
+        self.assertNotEqual(self.profile.data_version, version)
+        self.assertEqual(list(PendingRiskAssessment.objects.values_list('profile_id', flat=True)), [self.profile.pk])
+        self.assertEqual(RiskAssessmentHistory.objects.filter(profile=self.profile).count(), assessments)
+
+
+@override_settings(RISK_ASSESSMENT_QUEUE={'BACKEND': 'FinancialProfile.assessment_queue.DatabaseAssessmentQueue'})
+class ImportTests(SeededProfilesMixin, TestCase):
+    NDJSON = 'application/x-ndjson'
+    seed = {'profiles': 1, 'items_per_type': 0, 'assessments_per_profile': 0}
+    login = True
+
+    def post(self, body, content_type=NDJSON, query=''):
+        return self.client.post(reverse('import-financial-data') + query, body, content_type=content_type)
+
+    def test_rows_are_imported_and_errors_reported_by_line(self):
+        body = '\n'.join([
+            '{"type": "income", "source_name": "Salary", "amount": "4000.00", "frequency": "monthly"}',
+            '{"type": "expense", "category": "food", "amount": "400.00", "frequency": "monthly"}',
+            '{"type": "expense", "category": "food", "amount": "-1", "frequency": "monthly"}',
+            'not json',
+            '',
+            '["a", "list"]',
+            '{"type": "pension", "amount": "1.00"}',
+            '{"type": "asset", "asset_name": "Savings", "asset_type": "savings", "value": "9000.00"}',
+        ])
+        response = self.post(body)
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual(report['rows_read'], 7)
+        self.assertEqual(
+            [report[f'{key}_created'] for key in LINE_ITEM_SERIALIZERS], [1, 1, 0, 1]
+        )
+        self.assertEqual(
+            [(error['line'], error['type']) for error in report['errors']],
+            [(3, 'expense'), (4, None), (6, None), (7, 'pension')],
+        )
+        self.assertFalse(report['errors_truncated'])
+
+        csv_body = 'source_name,amount,frequency\nBonus,100.00,yearly\nGift,,monthly\n'
+        report = self.post(csv_body, 'text/csv', '?type=income').json()
+        self.assertEqual((report['incomes_created'], report['error_count']), (1, 1))
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertEqual(Income.objects.filter(profile=self.profile).count(), 2)
+
+    def test_rows_are_written_in_batches(self):
+        row = {'source_name': 'Salary', 'amount': '10.00', 'frequency': 'monthly'}
+        importer = LineItemImporter(self.profile, default_type='income', batch_size=3)
+        for line_number in range(1, 8):
+            importer.add(line_number, row)
+            self.assertEqual(Income.objects.filter(profile=self.profile).count(), line_number // 3 * 3)
+        importer.add(8, {'amount': 'x'})
+        report = importer.finish()
+        self.assertEqual((report['incomes_created'], report['error_count']), (7, 1))
+        self.assertEqual(Income.objects.filter(profile=self.profile).count(), 7)
+
+        # A final batch that is exactly full leaves nothing to flush
+        importer = LineItemImporter(self.profile, default_type='income', batch_size=3)
+        for line_number in range(1, 4):
+            importer.add(line_number, row)
+        with self.assertNumQueries(0):
+            importer.flush()
+        self.assertEqual(importer.finish()['incomes_created'], 3)
+
+    def test_empty_and_unread_bodies_are_rejected(self):
+        empty = self.client.post(
+            reverse('import-financial-data'), '', content_type=self.NDJSON, CONTENT_TYPE=self.NDJSON, CONTENT_LENGTH='0'
+        )
+        self.assertEqual(empty.status_code, 400)
+        self.assertEqual(self.post('source_name,amount,frequency\n', 'text/csv', '?type=income').status_code, 400)
+
+        # Under WSGI a chunked body without a Content-Length never reaches the view
+        request = RequestFactory().post(
+            reverse('import-financial-data'), b'{"type": "income"}', content_type=self.NDJSON, CONTENT_LENGTH='',
+        )
+        force_authenticate(request, user=self.user)
+        response = import_financial_data(request)
+        self.assertEqual(response.status_code, 411)
+        self.assertFalse(PendingRiskAssessment.objects.exists())
+
+    def test_chunked_body_is_read_under_asgi(self):
+        body = b'{"type": "income", "source_name": "Salary", "amount": "4000.00", "frequency": "monthly"}\n' * 3
+        request = ASGIRequest({
+            'type': 'http', 'method': 'POST', 'path': reverse('import-financial-data'), 'query_string': b'',
+            'headers': [(b'content-type', self.NDJSON.encode()), (b'transfer-encoding', b'chunked')],
+        }, io.BytesIO(body))
+        self.assertNotIn('CONTENT_LENGTH', request.META)
+        force_authenticate(request, user=self.user)
+        response = import_financial_data(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['incomes_created'], 3)
+        self.assertEqual(Income.objects.filter(profile=self.profile).count(), 3)
+
+
+# A token version re-read every REVOCATION_CHECK_SECONDS would add a query
+# to whichever request crosses the interval on a slow run
+@override_settings(STATELESS_JWT={'REVOCATION_CHECK_SECONDS': 3600})
+class EndpointQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        # Cached responses would hide the queries being measured
+        get_financial_cache().clear()
+
+    def test_endpoints_within_query_budgets(self):
+        """Every endpoint stays within its query budget regardless of data volume"""
+        for items_per_type in (2, 12):
+            user = seed_profiles(profiles=3, items_per_type=items_per_type, assessments_per_profile=3)[0]
+            results = run_benchmarks(user, iterations=1)
+            with self.subTest(items_per_type=items_per_type):
+                self.assertEqual(check_query_budgets(results), [])
+                self.assertTrue(all(result['status'] < 400 for result in results.values()), results)
+
+
+@override_settings(RISK_ASSESSMENT_QUEUE={'BACKEND': 'FinancialProfile.assessment_queue.DatabaseAssessmentQueue'})
+class ConditionalGetTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 1, 'items_per_type': 2, 'assessments_per_profile': 1}
+    login = True
+
+    def test_unchanged_profile_is_not_modified(self):
+        # Session, user and the profile's data version; the summary also reads its percentiles
+        for name, queries in (('financial-summary', 4), ('financial-profile-detail', 3), ('income-list', 3)):
+            with self.subTest(name=name):
+                url = reverse(name)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('"'))
+                self.assertIn('Last-Modified', response)
+
+                with self.assertNumQueries(queries):
+                    cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_summary_not_modified_without_a_cached_summary(self):
+        url = reverse('financial-summary')
+        etag = self.client.get(url)['ETag']
+        get_financial_cache().clear()
+        with mock.patch('FinancialProfile.views._build_financial_summary', side_effect=AssertionError('built')):
+            # Session, user, the profile id (cleared with the cache), profile row and percentiles
+            with self.assertNumQueries(5):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changes_produce_a_new_etag(self):
+        url = reverse('financial-summary')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(reverse('income-list'))['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('income-list'),
+                {'source_name': 'Bonus', 'amount': '100.00', 'frequency': 'monthly'},
+                content_type='application/json',
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_are_read_from_the_profile_row(self):
+        """Losing the cache keeps ETags valid, and a write changes them with no cache involved"""
+        url = reverse('income-list')
+        etag = self.client.get(url)['ETag']
+        get_financial_cache().clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Expense.objects.filter(profile__user=self.user).first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FinancialCacheTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 2, 'items_per_type': 1, 'assessments_per_profile': 1}
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.profiles[1]
+
+    def cache_summaries(self):
+        """Cache both profiles' summaries under their current data versions"""
+        for profile in (self.profile, self.other):
+            profile.refresh_from_db()
+            store_cached_entry('summary', profile.pk, profile.data_version, {'profile_id': profile.pk})
+
+    def cached_summary(self, profile):
+        profile.refresh_from_db()
+        return find_cached_entry('summary', profile.pk, profile.data_version)
+
+    def test_hit_runs_no_queries(self):
+        self.cache_summaries()
+        with self.assertNumQueries(0):
+            summary = get_cached_entry(
+                'summary', self.profile.pk, self.profile.data_version, lambda: self.fail('rebuilt on a hit')
+            )
+        self.assertEqual(summary, {'profile_id': self.profile.pk})
+
+    def test_writes_invalidate_only_their_profile(self):
+        def copy_item(item):
+            item = copy.copy(item)
+            item.pk = None
+            item._state.adding = True
+            item.save()
+
+        writes = {'profile': lambda: self.profile.save()}
+        for model in (Income, Expense, Debt, Asset):
+            name = model.__name__.lower()
+            writes[f'{name} create'] = lambda model=model: copy_item(model.objects.filter(profile=self.profile).first())
+            writes[f'{name} update'] = lambda model=model: model.objects.filter(profile=self.profile).first().save()
+            writes[f'{name} delete'] = lambda model=model: model.objects.filter(profile=self.profile).first().delete()
+
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                self.cache_summaries()
+                with self.captureOnCommitCallbacks(execute=True):
+                    write()
+                self.assertIsNone(self.cached_summary(self.profile))
+                self.assertEqual(self.cached_summary(self.other), {'profile_id': self.other.pk})
+
+
+class AsgiHandlerTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 1, 'items_per_type': 25, 'assessments_per_profile': 3}
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def get(self, use_asgi, name, query='', **headers):
+        get_financial_cache().clear()
+        url = reverse(name) + query
+        if use_asgi:
+            return async_to_sync(AsyncClient().get)(url, headers=headers)
+        return Client().get(url, headers=headers)
+
+    def test_load_test_endpoints_match_under_both_handlers(self):
+        for name in LOAD_TEST_ENDPOINTS:
+            for headers in (self.headers, {}, {**self.headers, 'Accept': 'text/csv'}):
+                with self.subTest(name=name, headers=headers):
+                    expected = self.get(False, name, '?page=2', **headers)
+                    response = self.get(True, name, '?page=2', **headers)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(response.json(), expected.json())
+                    self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+
+class SimulationTests(SeededProfilesMixin, TestCase):
+
+    MODELS = {'incomes': Income, 'expenses': Expense, 'debts': Debt, 'assets': Asset}
+    seed = {'profiles': 1, 'items_per_type': 6, 'assessments_per_profile': 1}
+    login = True
+
+    def random_change(self, rng, rows):
+        key = rng.choice(sorted(self.MODELS))
+        data = {
+            'incomes': lambda: {'source_name': 'New', 'amount': str(random_money(rng, 9000)),
+                                'frequency': rng.choice(list(MONTHLY_RATES))},
+            'expenses': lambda: {'category': 'other', 'amount': str(random_money(rng, 4000)),
+                                 'frequency': rng.choice(list(MONTHLY_RATES))},
+            'debts': lambda: {'debt_name': 'New', 'debt_type': rng.choice(Debt.DEBT_TYPE_CHOICES)[0],
+                              'total_amount': '90000.00', 'remaining_balance': str(random_money(rng, 90000)),
+                              'minimum_amount': str(random_money(rng, 900)),
+                              'interest_rate': rng.choice(['5.00', '15.00', '15.01', '29.00'])},
+            'assets': lambda: {'asset_name': 'New', 'value': str(random_money(rng)),
+                               'asset_type': rng.choice(Asset.ASSET_TYPE_CHOICES)[0]},
+        }[key]()
+        action = rng.choice(['add', 'edit', 'remove']) if rows[key] else 'add'
+        if action == 'add':
+            return {'action': 'add', 'type': key, 'data': data}
+        pk = rng.choice(sorted(pk for pk in rows[key] if isinstance(pk, int)) or [None])
+        if pk is None:
+            return {'action': 'add', 'type': key, 'data': data}
+        if action == 'remove':
+            return {'action': 'remove', 'type': key, 'id': pk}
+        fields = [rng.choice(sorted(data))]
+        if fields[0] in ('total_amount', 'remaining_balance'):
+            fields = ['total_amount', 'remaining_balance']
+        return {'action': 'edit', 'type': key, 'id': pk, 'data': {field: data[field] for field in fields}}
+
+    def changed_row(self, model, data, row=None):
+        row = copy.copy(row) if row is not None else model()
+        for field, value in data.items():
+            setattr(row, field, model._meta.get_field(field).to_python(value))
+        return row
+
+    def test_matches_scoring_the_changed_rows(self):
+        """Property: a simulated scenario scores like the scalar calculator on the changed rows"""
+        rng = random.Random(19)
+        simulator = ScenarioSimulator(self.profile)
+        scenarios, expected = [], []
+        for _ in range(200):
+            rows = {key: dict(items) for key, items in simulator.rows.items()}
+            changes = []
+            for position in range(rng.randint(0, 6)):
+                change = self.random_change(rng, rows)
+                changes.append(change)
+                key, model = change['type'], self.MODELS[change['type']]
+                if change['action'] == 'remove':
+                    del rows[key][change['id']]
+                elif change['action'] == 'edit':
+                    rows[key][change['id']] = self.changed_row(model, change['data'], rows[key][change['id']])
+                else:
+                    rows[key][('new', position)] = self.changed_row(model, change['data'])
+            scenarios.append({'changes': changes})
+            calculator = FinancialRiskCalculator(
+                None, snapshot=FinancialSnapshot(**{key: items.values() for key, items in rows.items()})
+            )
+            expected.append((calculator.calculate_risk_score(), calculator.risk_factors))
+
+        with self.assertNumQueries(0):
+            results = simulator.simulate(scenarios)
+        for position, (result, (score, risk_factors)) in enumerate(zip(results['scenarios'], expected)):
+            with self.subTest(position=position):
+                self.assertEqual(result['score'], score)
+                self.assertEqual(result['risk_factors'], risk_factors)
+
+    def test_endpoint_does_not_write(self):
+        debt = Debt.objects.filter(profile=self.profile).first()
+        scenarios = [
+            {'name': 'Pay off debt', 'changes': [{'action': 'remove', 'type': 'debt', 'id': debt.pk}]},
+            {'changes': [{'action': 'add', 'type': 'income',
+                          'data': {'source_name': 'Rent', 'amount': '800.00', 'frequency': 'monthly'}}]},
+        ]
+        counts = {model: model.objects.count() for model in self.MODELS.values()}
+        response = self.client.post(reverse('simulate'), {'scenarios': scenarios}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([scenario['name'] for scenario in body['scenarios']], ['Pay off debt', 'Scenario 2'])
+        for scenario in body['scenarios']:
+            self.assertEqual(scenario['score_change'], scenario['score'] - body['baseline']['score'])
+        self.assertEqual({model: model.objects.count() for model in self.MODELS.values()}, counts)
+        self.assertTrue(Debt.objects.filter(pk=debt.pk).exists())
+
+    def test_invalid_changes_are_reported(self):
+        scenarios = [{'changes': [
+            {'action': 'edit', 'type': 'debt', 'id': 0, 'data': {}},
+            {'action': 'add', 'type': 'expense', 'data': {'category': 'food', 'amount': '-5', 'frequency': 'monthly'}},
+            {'action': 'replace', 'type': 'asset'},
+        ]}]
+        response = self.client.post(reverse('simulate'), {'scenarios': scenarios}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error.pop('scenario'), error.pop('change'), sorted(error)) for error in response.json()['errors']],
+            [(0, 0, ['id']), (0, 1, ['amount']), (0, 2, ['action'])],
+        )
+
+
+def reference_payoff(balances, minimums, rates, strategy, extra_payment):
+    """DebtPayoffProjection written as a plain loop over debts, in cents"""
+    if strategy == 'snowball':
+        order = sorted(range(len(balances)), key=lambda index: (balances[index], -rates[index]))
+    else:
+        order = sorted(range(len(balances)), key=lambda index: (-rates[index], balances[index]))
+    balances = [balance * 100 for balance in balances]
+    minimums = [minimum * 100 for minimum in minimums]
+    budget = sum(minimums) + (extra_payment * 100 if strategy != 'minimum' else 0)
+    payoff_months = [0 if balance == 0 else None for balance in balances]
+    total_interest = 0
+    month = 0
+    while month < DebtPayoffProjection.MAX_MONTHS and any(balances):
+        month += 1
+        payments = []
+        for index, balance in enumerate(balances):
+            interest = round(balance * (rates[index] / 1200))
+            total_interest += interest
+            balances[index] = balance + interest
+            payments.append(min(minimums[index], balances[index]))
+        available = budget - sum(payments)
+        for index in order if strategy != 'minimum' else ():
+            extra = max(0, min(available, balances[index] - payments[index]))
+            payments[index] += extra
+            available -= extra
+        for index, payment in enumerate(payments):
+            balances[index] -= payment
+            if balances[index] <= 0 and payoff_months[index] is None:
+                payoff_months[index] = month
+    return payoff_months, total_interest / 100
+
+
+class DebtPayoffTests(TestCase):
+
+    def test_single_debt_matches_annuity(self):
+        # 10,000 at 12% paying 200 a month takes ln(2) / ln(1.01) = 69.7 months
+        projection = DebtPayoffProjection([10000], [200], [12], strategy='minimum').project()
+        self.assertEqual(projection.months_to_debt_free, 70)
+        self.assertAlmostEqual(projection.total_paid - projection.total_interest, 10000, places=2)
+        # Minimums below the monthly interest never clear the balance
+        self.assertIsNone(DebtPayoffProjection([10000], [50], [12], strategy='minimum').project().months_to_debt_free)
+
+    def test_matches_reference_loop(self):
+        """Property: the vectorised schedule matches paying each debt in turn"""
+        rng = random.Random(20)
+        for case in range(60):
+            count = rng.randint(1, 8)
+            balances = [rng.choice([0, rng.randint(100, 40000)]) for _ in range(count)]
+            minimums = [rng.randint(0, 800) for _ in range(count)]
+            rates = [rng.choice([0, 4.5, 15, 24.99, 29]) for _ in range(count)]
+            extra_payment = rng.choice([0, 150, 1000])
+            for strategy in PAYOFF_STRATEGIES:
+                projection = DebtPayoffProjection(
+                    balances, minimums, rates, strategy=strategy, extra_payment=extra_payment
+                ).project()
+                payoff_months, total_interest = reference_payoff(balances, minimums, rates, strategy, extra_payment)
+                with self.subTest(case=case, strategy=strategy):
+                    self.assertEqual([month if month >= 0 else None for month in projection.payoff_months.tolist()],
+                                     payoff_months)
+                    self.assertAlmostEqual(projection.total_interest, total_interest, places=2)
+
+    def test_endpoint(self):
+        user = seed_profiles(profiles=1, items_per_type=4, assessments_per_profile=0)[0]
+        self.client.force_login(user)
+        response = self.client.get(reverse('debt-payoff') + '?strategy=snowball&extra_payment=250&schedule=debts')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(set(body['comparison']), set(PAYOFF_STRATEGIES))
+        self.assertEqual(len(body['debts']), 4)
+        self.assertEqual(len(body['schedule'][0]['balances']), 4)
+        self.assertEqual(set(body['payoff_factors']), {'time_to_debt_free', 'total_interest'})
+        self.assertEqual(self.client.get(reverse('debt-payoff') + '?strategy=fastest').status_code, 400)
+
+
+class CashFlowStressTests(TestCase):
+
+    def test_without_shocks_paths_follow_the_budget(self):
+        class Steady(CashFlowStressTest):
+            JOB_LOSS_PROBABILITY = 0
+            EXPENSE_INFLATION = {}
+            DEFAULT_INFLATION = (0, 0)
+            RATE_VOLATILITY = 0
+
+        # Burns 500 a month, so 4,000 of savings run out in month 8
+        stress = Steady(
+            incomes=[2000], expenses={'housing': 1800, 'food': 400}, debt_payments=300,
+            variable_balances=[5000], variable_rates=[20], liquid_assets=4000,
+        ).run(paths=100, months=12)
+        self.assertEqual(set(stress.depletion_months.tolist()), {8})
+        self.assertEqual(stress.summarize()['probability_of_depletion'], 1.0)
+
+    def test_seeded_and_shocked(self):
+        stress = CashFlowStressTest(
+            incomes=[3000, 1500], expenses={'housing': 2000, 'food': 800, 'other': 500}, debt_payments=400,
+            variable_balances=[9000], variable_rates=[24], liquid_assets=6000,
+        )
+        summary = stress.run(paths=10000, months=36, seed=7).summarize()
+        self.assertEqual(stress.run(paths=10000, months=36, seed=7).summarize(), summary)
+        # A 700 monthly surplus survives unless income is lost or costs climb
+        self.assertTrue(0 < summary['probability_of_depletion'] < 0.5, summary)
+        probabilities = [row['probability'] for row in summary['depletion_by_month']]
+        self.assertEqual(probabilities, sorted(probabilities))
+        self.assertEqual(probabilities[-1], summary['probability_of_depletion'])
+
+    def test_endpoint(self):
+        user = seed_profiles(profiles=1, items_per_type=3, assessments_per_profile=0)[0]
+        self.client.force_login(user)
+        response = self.client.get(reverse('stress-test') + '?months=24&seed=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['paths'], CashFlowStressTest.DEFAULT_PATHS)
+        self.assertEqual(
+            [row['month'] for row in response.json()['depletion_by_month']], [12, 24]
+        )
+        self.assertEqual(self.client.get(reverse('stress-test') + '?months=6').status_code, 400)
+
+
+def backdated_assessment(profile, score, when):
+    """An assessment of `profile` made at `when`"""
+    assessment = RiskAssessmentHistory.objects.create(profile=profile, score=score)
+    RiskAssessmentHistory.objects.filter(pk=assessment.pk).update(assessment_date=when)
+    return assessment
+
+
+def reference_trend(assessments, bucket, window):
+    """risk_trend of one profile's assessments, computed row by row"""
+    def period_start(moment):
+        day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            'hour': moment.replace(minute=0, second=0, microsecond=0),
+            'day': day,
+            'week': day - timedelta(days=day.weekday()),
+            'month': day.replace(day=1),
+        }[bucket]
+
+    scores, transitions = defaultdict(list), Counter()
+    previous_level = None
+    for assessment in sorted(assessments, key=lambda row: (row.assessment_date, row.pk)):
+        period = period_start(assessment.assessment_date)
+        scores[period].append(assessment.score)
+        if previous_level is not None and previous_level != assessment.risk_level:
+            transitions[period] += 1
+        previous_level = assessment.risk_level
+
+    series, averages = [], []
+    for period in sorted(scores):
+        averages.append(sum(scores[period]) / len(scores[period]))
+        recent = averages[-window:]
+        series.append({
+            'period': period,
+            'assessments': len(scores[period]),
+            'average_score': round(averages[-1], 2),
+            'min_score': min(scores[period]),
+            'max_score': max(scores[period]),
+            'moving_average': round(sum(recent) / len(recent), 2),
+            'level_transitions': transitions[period],
+        })
+    return series
+
+
+class RiskTrendTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 1, 'items_per_type': 1, 'assessments_per_profile': 0}
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        rng = random.Random(14)
+        moments = sorted(self.now - timedelta(minutes=rng.randint(0, 80 * 24 * 60)) for _ in range(60))
+        for moment in moments:
+            backdated_assessment(self.profile, rng.choice([10, 30, 35, 55, 70, 90]), moment)
+        self.assessments = list(RiskAssessmentHistory.objects.filter(profile=self.profile))
+
+    def trend(self, bucket, window=3, start=None, end=None):
+        return risk_trend(
+            RiskAssessmentHistory.objects.filter(profile=self.profile),
+            RiskHistoryBucket.objects.filter(profile=self.profile),
+            bucket, window, start, end,
+        )
+
+    def test_every_bucket_matches_a_reference(self):
+        for bucket in TREND_BUCKETS:
+            with self.subTest(bucket=bucket):
+                self.assertEqual(self.trend(bucket), reference_trend(self.assessments, bucket, 3))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('risk-trend') + '?bucket=week&window=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['series']), len(self.trend('week')))
+        self.assertEqual(self.client.get(reverse('risk-trend') + '?bucket=year').status_code, 400)
+        self.assertEqual(self.client.get(reverse('risk-trend') + '?window=0').status_code, 400)
+
+    def test_transitions_look_back_past_the_start(self):
+        ordered = sorted(self.assessments, key=lambda row: (row.assessment_date, row.pk))
+        first_change = next(
+            after for before, after in zip(ordered, ordered[1:])
+            if before.risk_level != after.risk_level
+            and timezone.localdate(before.assessment_date) != timezone.localdate(after.assessment_date)
+        )
+        start = timezone.localtime(first_change.assessment_date).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=20)
+        expected = {
+            row['period']: (row['assessments'], row['level_transitions'])
+            for row in reference_trend(self.assessments, 'day', 3) if start <= row['period'] < end
+        }
+
+        for compact in (False, True):
+            if compact:
+                compact_assessments(end)
+            with self.subTest(compacted=compact):
+                series = self.trend('day', start=start, end=end)
+                self.assertEqual(series[0]['period'], start)
+                self.assertGreaterEqual(series[0]['level_transitions'], 1)
+                self.assertEqual(
+                    {row['period']: (row['assessments'], row['level_transitions']) for row in series}, expected
+                )
+
+    def test_compacted_history_stays_in_the_trend(self):
+        day, week = self.trend('day'), self.trend('week')
+
+        compact_assessments(self.now - timedelta(days=30))
+        self.assertLess(RiskAssessmentHistory.objects.filter(profile=self.profile).count(), 60)
+        self.assertEqual(self.trend('day'), day)
+
+        compact_daily_buckets(timezone.localdate(self.now) - timedelta(days=50))
+        self.assertTrue(RiskHistoryBucket.objects.filter(period=RiskHistoryBucket.WEEK).exists())
+        self.assertEqual(self.trend('week'), week)
+
+        # The default window still covers all 80 days of history
+        self.client.force_login(self.user)
+        series = self.client.get(reverse('risk-trend') + '?bucket=month').json()['series']
+        self.assertEqual(sum(row['assessments'] for row in series), 60)
+        self.assertEqual(sum(row['level_transitions'] for row in series), sum(row['level_transitions'] for row in week))
+
+
+class CompactionTests(SeededProfilesMixin, TestCase):
+    RETENTION = {'FULL_RESOLUTION_DAYS': 30, 'DAILY_BUCKET_DAYS': 60}
+    seed = {'profiles': 1, 'items_per_type': 1, 'assessments_per_profile': 0}
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.cutoff = self.now - timedelta(days=self.RETENTION['FULL_RESOLUTION_DAYS'])
+        self.daily_cutoff = timezone.localdate(self.now) - timedelta(days=self.RETENTION['DAILY_BUCKET_DAYS'])
+
+    def compact(self):
+        return compact_risk_history(now=self.now, batch_size=7, retention=self.RETENTION)
+
+    def assess_days_ago(self, days, scores):
+        """Assessments `days` days before now, an hour apart in the order given"""
+        moment = self.now - timedelta(days=days)
+        for offset, score in enumerate(scores):
+            backdated_assessment(self.profile, score, moment + timedelta(hours=offset))
+
+    def test_buckets_hold_the_aggregates(self):
+        rng = random.Random(13)
+        for days in range(90, 31, -1):
+            self.assess_days_ago(days, [rng.randint(0, 100) for _ in range(rng.randint(0, 3))])
+        self.assess_days_ago(1, [50])
+        old = list(RiskAssessmentHistory.objects.filter(assessment_date__lt=self.cutoff).order_by('assessment_date'))
+
+        counts = self.compact()
+        self.assertEqual(counts['assessments_compacted'], len(old))
+        self.assertFalse(RiskAssessmentHistory.objects.filter(assessment_date__lt=self.cutoff).exists())
+
+        expected = defaultdict(list)
+        for row in old:
+            day = RiskHistoryBucket.period_start_for(row.assessment_date, RiskHistoryBucket.DAY)
+            period = RiskHistoryBucket.DAY if day >= self.daily_cutoff else RiskHistoryBucket.WEEK
+            expected[period, RiskHistoryBucket.period_start_for(row.assessment_date, period)].append(row)
+        buckets = {(bucket.period, bucket.period_start): bucket for bucket in RiskHistoryBucket.objects.all()}
+        self.assertEqual(set(buckets), set(expected))
+        for key, rows in expected.items():
+            with self.subTest(bucket=key):
+                bucket, scores = buckets[key], [row.score for row in rows]
+                self.assertEqual(bucket.assessment_count, len(rows))
+                self.assertEqual((bucket.min_score, bucket.max_score), (min(scores), max(scores)))
+                self.assertEqual((bucket.last_score, bucket.score_total), (scores[-1], sum(scores)))
+                self.assertEqual(
+                    (bucket.first_risk_level, bucket.last_risk_level), (rows[0].risk_level, rows[-1].risk_level)
+                )
+                self.assertEqual(
+                    bucket.level_changes,
+                    sum(before.risk_level != after.risk_level for before, after in zip(rows, rows[1:])),
+                )
+                self.assertEqual(
+                    (bucket.first_assessed_at, bucket.last_assessed_at),
+                    (rows[0].assessment_date, rows[-1].assessment_date),
+                )
+
+    def test_rerunning_changes_nothing(self):
+        for days in (70, 61, 45, 31):
+            self.assess_days_ago(days, [20, 80])
+        self.compact()
+        buckets = list(RiskHistoryBucket.objects.order_by('pk').values())
+        assessments = list(RiskAssessmentHistory.objects.order_by('pk').values_list('pk', flat=True))
+
+        self.assertEqual(
+            self.compact(), {'summaries_interned': 0, 'assessments_compacted': 0, 'daily_buckets_compacted': 0}
+        )
+        self.assertEqual(list(RiskHistoryBucket.objects.order_by('pk').values()), buckets)
+        self.assertEqual(list(RiskAssessmentHistory.objects.order_by('pk').values_list('pk', flat=True)), assessments)
+
+    def test_retention_boundaries(self):
+        at_cutoff = backdated_assessment(self.profile, 40, self.cutoff)
+        before_cutoff = backdated_assessment(self.profile, 60, self.cutoff - timedelta(microseconds=1))
+        for day in (self.daily_cutoff, self.daily_cutoff - timedelta(days=1)):
+            moment = timezone.make_aware(datetime(day.year, day.month, day.day, 12))
+            backdated_assessment(self.profile, 70, moment)
+        self.assess_days_ago(0, [10])
+
+        self.compact()
+        remaining = set(RiskAssessmentHistory.objects.values_list('pk', flat=True))
+        self.assertIn(at_cutoff.pk, remaining)
+        self.assertNotIn(before_cutoff.pk, remaining)
+        old_days = RiskHistoryBucket.objects.filter(period=RiskHistoryBucket.DAY, period_start__lte=self.daily_cutoff)
+        self.assertEqual(list(old_days.values_list('period_start', flat=True)), [self.daily_cutoff])
+        self.assertTrue(RiskHistoryBucket.objects.filter(period=RiskHistoryBucket.WEEK).exists())
+
+    def test_bounded_runs_keep_legacy_summaries(self):
+        later = backdated_assessment(self.profile, 60, self.now - timedelta(days=35))
+        earlier = backdated_assessment(self.profile, 20, self.now - timedelta(days=40))
+        later.refresh_from_db()
+        earlier.refresh_from_db()
+        self.assess_days_ago(0, [50])
+        # Written before summaries were interned
+        for row in (later, earlier):
+            RiskAssessmentHistory.objects.filter(pk=row.pk).update(
+                summary_text=f'Legacy summary {row.pk}', summary_template=None
+            )
+
+        # The first batch interns `later` but compacts `earlier`, the oldest row
+        counts = compact_risk_history(now=self.now, batch_size=1, max_batches=1, retention=self.RETENTION)
+        self.assertEqual((counts['summaries_interned'], counts['assessments_compacted']), (1, 1))
+        bucket = RiskHistoryBucket.objects.get(first_assessed_at=earlier.assessment_date)
+        self.assertEqual(bucket.last_summary_template.text, f'Legacy summary {earlier.pk}')
+
+        self.compact()
+        bucket = RiskHistoryBucket.objects.get(first_assessed_at=later.assessment_date)
+        self.assertEqual(bucket.last_summary_template.text, f'Legacy summary {later.pk}')
+
+    def test_latest_assessment_is_kept(self):
+        self.assess_days_ago(100, [15, 85])
+        latest = RiskAssessmentHistory.objects.order_by('-assessment_date').first()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.latest_assessment_id, latest.pk)
+        version = self.profile.data_version
+        index = list(ScoreDistribution.objects.order_by('cohort', 'score').values_list('profiles', flat=True))
+
+        self.assertEqual(self.compact()['assessments_compacted'], 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.latest_assessment_id, latest.pk)
+        self.assertEqual(list(RiskAssessmentHistory.objects.values_list('pk', flat=True)), [latest.pk])
+        self.assertNotEqual(self.profile.data_version, version)
+        self.assertEqual(
+            list(ScoreDistribution.objects.order_by('cohort', 'score').values_list('profiles', flat=True)), index
+        )
+
+
+class ScoreDistributionTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 30, 'items_per_type': 1, 'assessments_per_profile': 1}
+
+    def index(self):
+        return {(row.cohort, row.score): row.profiles for row in ScoreDistribution.objects.all()}
+
+    def rebuilt_index(self):
+        return {
+            (row['cohort'], row['score']): row['profiles']
+            for row in score_distribution_rows(FinancialProfile.objects.all())
+        }
+
+    def test_incremental_updates_match_a_rebuild(self):
+        rng = random.Random(22)
+        for user in self.users:
+            user.date_of_birth = rng.choice([None, date(1950, 2, 1), date(1988, 6, 30), date(2003, 1, 1)])
+            user.save(update_fields=['date_of_birth'])
+        ScoreDistribution.objects.all().delete()
+        ScoreDistribution.objects.bulk_create(
+            ScoreDistribution(**row) for row in score_distribution_rows(FinancialProfile.objects.all())
+        )
+
+        profiles = list(FinancialProfile.objects.filter(user__in=self.users))
+        for _ in range(60):
+            RiskAssessmentHistory.objects.create(profile=rng.choice(profiles), score=rng.randint(0, 100))
+        rescore_all(FinancialProfile.objects.filter(pk__in=[profile.pk for profile in profiles[:10]]))
+        self.assertEqual(self.index(), self.rebuilt_index())
+
+    def test_deletions_move_the_index(self):
+        rng = random.Random(23)
+        profiles = list(FinancialProfile.objects.filter(user__in=self.users).order_by('pk'))
+        for _ in range(40):
+            RiskAssessmentHistory.objects.create(profile=rng.choice(profiles), score=rng.randint(0, 100))
+
+        # Latest assessments: their profiles fall back to an older score
+        for profile in profiles[:8]:
+            profile.refresh_from_db()
+            profile.latest_assessment.delete()
+        # An older assessment leaves the index alone
+        profile = profiles[8]
+        profile.refresh_from_db()
+        RiskAssessmentHistory.objects.filter(profile=profile).exclude(pk=profile.latest_assessment_id).first().delete()
+        # Every assessment, then whole profiles and users
+        RiskAssessmentHistory.objects.filter(profile=profiles[9]).delete()
+        profiles[10].delete()
+        profiles[11].user.delete()
+
+        self.assertEqual(self.index(), self.rebuilt_index())
+        self.assertEqual(
+            sum(self.index()[ALL_COHORT, score] for score in range(101)),
+            FinancialProfile.objects.filter(latest_assessment__isnull=False).count(),
+        )
+
+    def test_percentile_endpoint(self):
+        user = self.users[0]
+        self.client.force_login(user)
+        score = FinancialProfile.objects.get(user=user).latest_assessment.score
+        scores = [profile.latest_assessment.score for profile in FinancialProfile.objects.select_related('latest_assessment')]
+
+        response = self.client.get(reverse('score-percentile'))
+        self.assertEqual(response.status_code, 200)
+        overall, age_band = response.json()['percentiles']
+        self.assertEqual(overall['cohort'], ALL_COHORT)
+        self.assertEqual(overall['profiles'], len(scores))
+        self.assertEqual(
+            overall['riskier_than_percent'],
+            round(sum(other < score for other in scores) * 100 / len(scores), 1),
+        )
+        self.assertEqual(age_band['cohort'], age_cohort(None))
+
+        summary = self.client.get(reverse('financial-summary')).json()
+        self.assertEqual(summary['latest_risk_assessment']['percentiles'], [overall, age_band])
+        self.assertEqual(self.client.get(reverse('score-percentile') + '?cohort=age:old').status_code, 400)
+
+    def test_summary_percentiles_follow_other_profiles(self):
+        user = self.users[0]
+        self.client.force_login(user)
+        profile, other = FinancialProfile.objects.filter(user__in=self.users[:2]).order_by('user__id')
+        RiskAssessmentHistory.objects.create(profile=profile, score=50)
+        RiskAssessmentHistory.objects.create(profile=other, score=90)
+        profile.refresh_from_db()
+        url = reverse('financial-summary')
+        response = self.client.get(url)
+        overall = response.json()['latest_risk_assessment']['percentiles'][0]
+
+        # Another profile moves below this one: only the distribution changes
+        RiskAssessmentHistory.objects.create(profile=other, score=0)
+        self.assertEqual(FinancialProfile.objects.get(pk=profile.pk).data_version, profile.data_version)
+
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertGreater(
+            changed.json()['latest_risk_assessment']['percentiles'][0]['riskier_than_percent'],
+            overall['riskier_than_percent'],
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 304)
+
+
+class LatestAssessmentTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 6, 'items_per_type': 0, 'assessments_per_profile': 0}
+
+    def assertPointsAtNewest(self):
+        """Every profile points at its newest assessment, and the distribution index agrees"""
+        newest = {}
+        for pk, profile_id in RiskAssessmentHistory.objects.order_by('assessment_date', 'pk').values_list(
+            'pk', 'profile_id'
+        ):
+            newest[profile_id] = pk
+        listing = FinancialProfile.objects.with_listing_totals()
+        for profile in listing.filter(pk__in=[profile.pk for profile in self.profiles]):
+            self.assertEqual(profile.latest_assessment_id, newest.get(profile.pk), profile.pk)
+            latest = RiskAssessmentHistory.objects.filter(pk=newest.get(profile.pk)).first()
+            self.assertEqual(profile.latest_risk_score, latest.score if latest else None)
+        self.assertEqual(
+            {(row.cohort, row.score): row.profiles for row in ScoreDistribution.objects.filter(profiles__gt=0)},
+            {
+                (row['cohort'], row['score']): row['profiles']
+                for row in score_distribution_rows(FinancialProfile.objects.all())
+                if row['profiles']
+            },
+        )
+
+    def test_new_assessments_take_over(self):
+        profile = self.profiles[0]
+        for score in (30, 70, 10):
+            assessment = RiskAssessmentHistory.objects.create(profile=profile, score=score)
+            profile.refresh_from_db()
+            self.assertEqual(profile.latest_assessment_id, assessment.pk)
+            self.assertEqual(profile.get_latest_risk_score(), score)
+        self.assertPointsAtNewest()
+
+    def test_ties_on_the_date_go_to_the_later_row(self):
+        profile = self.profiles[0]
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            first = RiskAssessmentHistory.objects.create(profile=profile, score=20)
+            second = RiskAssessmentHistory.objects.create(profile=profile, score=80)
+        self.assertPointsAtNewest()
+        second.delete()
+        profile.refresh_from_db()
+        self.assertEqual(profile.latest_assessment_id, first.pk)
+        self.assertPointsAtNewest()
+
+    def test_deleting_the_latest_repoints_to_the_previous(self):
+        profile = self.profiles[0]
+        older = backdated_assessment(profile, 25, timezone.now() - timedelta(days=2))
+        previous = backdated_assessment(profile, 55, timezone.now() - timedelta(days=1))
+        latest = RiskAssessmentHistory.objects.create(profile=profile, score=90)
+
+        older.delete()
+        profile.refresh_from_db()
+        self.assertEqual(profile.latest_assessment_id, latest.pk)
+        latest.delete()
+        profile.refresh_from_db()
+        self.assertEqual(profile.latest_assessment_id, previous.pk)
+        self.assertEqual(profile.get_latest_risk_score(), 55)
+        self.assertPointsAtNewest()
+
+    def test_deleting_every_assessment_leaves_no_latest(self):
+        profile = self.profiles[0]
+        for score in (15, 45, 75):
+            RiskAssessmentHistory.objects.create(profile=profile, score=score)
+        RiskAssessmentHistory.objects.filter(profile=profile).delete()
+        profile.refresh_from_db()
+        self.assertIsNone(profile.latest_assessment_id)
+        self.assertIsNone(profile.get_latest_risk_score())
+        self.assertIsNone(profile.get_latest_risk_level())
+        self.assertPointsAtNewest()
+
+    def test_random_creates_and_deletes(self):
+        rng = random.Random(12)
+        for step in range(80):
+            profile = rng.choice(self.profiles)
+            assessments = list(RiskAssessmentHistory.objects.filter(profile=profile).order_by('pk'))
+            action = rng.random()
+            if not assessments or action < 0.5:
+                RiskAssessmentHistory.objects.create(profile=profile, score=rng.randint(0, 100))
+            elif action < 0.8:
+                rng.choice(assessments).delete()
+            elif action < 0.95:
+                RiskAssessmentHistory.objects.filter(pk__in=[a.pk for a in rng.sample(assessments, min(2, len(assessments)))]).delete()
+            else:
+                RiskAssessmentHistory.objects.filter(profile=profile).delete()
+            if step % 10 == 9:
+                self.assertPointsAtNewest()
+        self.assertPointsAtNewest()
+
+
+# 'default' stands in for the replica: replica reads route to 'default', primary reads to None
+@override_settings(DATABASE_ROUTING={'REPLICAS': ['default'], 'HEALTH_CHECK_INTERVAL': 0})
+class DatabaseRoutingTests(SeededProfilesMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+
+    def read_database(self, method='GET', path=None, user=None):
+        path = path or reverse('financial-summary')
+        request = RequestFactory().generic(method, path)
+        DatabaseRoutingMiddleware(lambda request: HttpResponse()).process_view(request, resolve(path).func, (), {})
+        if user is not None:
+            request.user = user
+        with routing_request(request):
+            return ReplicaRouter().db_for_read(FinancialProfile)
+
+    def test_safe_api_reads_use_a_replica(self):
+        self.assertEqual(self.read_database(user=self.user), 'default')
+        self.assertEqual(self.read_database(path=reverse('users:profile'), user=self.user), 'default')
+        self.assertIsNone(self.read_database('POST', user=self.user))
+        self.assertIsNone(self.read_database(path='/admin/', user=self.user))
+        # Authentication itself reads from the primary
+        self.assertIsNone(self.read_database())
+        self.assertIsNone(ReplicaRouter().db_for_read(FinancialProfile))
+
+    def test_reads_stay_on_primary_after_a_write(self):
+        other = seed_profiles(profiles=1, items_per_type=1, assessments_per_profile=1)[0]
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('income-list'),
+            {'source_name': 'Bonus', 'amount': '100.00', 'frequency': 'monthly'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(self.read_database(user=self.user))
+        self.assertEqual(self.read_database(user=other), 'default')
+        self.assertEqual(self.client.get(reverse('financial-summary')).status_code, 200)
+
+    @override_settings(DATABASE_ROUTING={'REPLICAS': ['replica_missing'], 'HEALTH_CHECK_INTERVAL': 0})
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        with self.assertLogs('financial_risk.db_routing', 'WARNING'):
+            self.assertIsNone(self.read_database(user=self.user))
+
+
+class StatelessJWTAuthenticationTests(SeededProfilesMixin, TestCase):
+
+    def authenticate(self, access):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return StatelessJWTAuthentication().authenticate(request)[0]
+
+    def refresh(self, refresh):
+        return self.client.post(reverse('users:token_refresh'), {'refresh': str(refresh)}, content_type='application/json')
+
+    def test_token_user_needs_no_queries(self):
+        access = ProfileRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+            self.assertEqual((user.pk, user.is_staff, user.is_authenticated), (self.user.pk, False, True))
+            self.assertEqual(user.financial_profile_id, self.profile.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, self.user.username)
+
+        response = self.client.get(reverse('users:profile'), headers={'Authorization': f'Bearer {access}'})
+        self.assertEqual(response.json()['username'], self.user.username)
+        # Tokens issued without the claims still authenticate from the user row
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(RefreshToken.for_user(self.user).access_token).pk, self.user.pk)
+
+    def test_claim_changes_revoke_access_tokens(self):
+        refresh = ProfileRefreshToken.for_user(self.user)
+        access = refresh.access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        response = self.client.get(reverse('users:profile'), headers={'Authorization': f'Bearer {access}'})
+        self.assertEqual(response.status_code, 401)
+
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.authenticate(response.json()['access']).is_staff)
+
+    def test_password_change_rejects_refresh(self):
+        refresh = ProfileRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('a-new-password')
+            self.user.save()
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_revocation_survives_cache_loss(self):
+        """Revoked tokens stay rejected once the cached versions are evicted or lost on restart"""
+        access = ProfileRefreshToken.for_user(self.user).access_token
+        stale_instance = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        caches['default'].clear()
+        with self.assertRaises(InvalidToken), self.assertNumQueries(1):
+            self.authenticate(access)
+
+        # Saving an instance loaded before the revocation (which reactivates
+        # the user) moves the version on rather than writing the old one back
+        with self.captureOnCommitCallbacks(execute=True):
+            stale_instance.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.is_active, self.user.token_version), (True, 2))
+        caches['default'].clear()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(access)
+        self.assertEqual(self.authenticate(ProfileRefreshToken.for_user(self.user).access_token).pk, self.user.pk)
+
+    def test_inactive_users_are_rejected(self):
+        access = ProfileRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+            self.assertEqual((user.is_active, user.is_staff, user.is_superuser), (True, False, False))
+        access['is_active'] = False
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(ProfileRefreshToken.for_user(self.user).access_token)
+
+    def test_tokens_from_before_the_password_claim(self):
+        refresh = RefreshToken.for_user(self.user)
+        del refresh[api_settings.REVOKE_TOKEN_CLAIM]
+        self.assertEqual(self.authenticate(refresh.access_token).pk, self.user.pk)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(api_settings.REVOKE_TOKEN_CLAIM, RefreshToken(response.json()['refresh']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('a-new-password')
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(refresh.access_token)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_profile_deletion_revokes_profile_claim(self):
+        access = ProfileRefreshToken.for_user(self.user).access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            FinancialProfile.objects.filter(pk=self.profile.pk).delete()
+        caches['default'].clear()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(access)
+
+
+class RequestProfileTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 1, 'items_per_type': 3, 'assessments_per_profile': 1}
+
+    def test_views_resolve_the_profile_from_the_token(self):
+        client = Client(headers={'Authorization': f'Bearer {ProfileRefreshToken.for_user(self.user).access_token}'})
+        income = Income.objects.filter(profile__user=self.user).first()
+        with self.assertNumQueries(3):  # data version, count and page
+            self.assertEqual(client.get(reverse('income-list')).status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(client.get(reverse('income-detail', args=[income.pk])).status_code, 200)
+
+    def test_projections_load_the_profile_once(self):
+        client = Client(headers={'Authorization': f'Bearer {ProfileRefreshToken.for_user(self.user).access_token}'})
+        profile_table = FinancialProfile._meta.db_table
+        for name in ('debt-payoff', 'stress-test'):
+            with self.subTest(view=name), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse(name)).status_code, 200)
+            profile_reads = [
+                query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith('SELECT') and f'FROM "{profile_table}"' in query['sql']
+            ]
+            self.assertEqual(len(profile_reads), 1, profile_reads)
+
+    def test_profile_is_loaded_once_and_shared_with_signals(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        get_profile_id_for_user(self.user)  # Token users carry the id; warm the cache for a session user
+
+        def assess(profile, score):
+            with CaptureQueriesContext(connection) as queries:
+                assessment = RiskAssessmentHistory.objects.create(profile=profile, score=score)
+            return assessment, len(queries)
+
+        _, unscoped = assess(FinancialProfile.objects.select_related('user', 'latest_assessment').get(user=self.user), 55)
+        with profile_scope():
+            with self.assertNumQueries(1):
+                profile = get_request_profile(request)
+                self.assertIs(get_request_profile(request), profile)
+                self.assertEqual(profile.user.username, self.user.username)
+            assessment, scoped = assess(profile, 70)
+            self.assertIs(profile.latest_assessment, assessment)
+        # The distribution index reads the replaced score from the shared profile
+        self.assertEqual(scoped, unscoped - 1)
+        self.assertEqual(
+            {(row.cohort, row.score): row.profiles for row in ScoreDistribution.objects.filter(profiles__gt=0)},
+            {(row['cohort'], row['score']): row['profiles']
+             for row in score_distribution_rows(FinancialProfile.objects.all()) if row['profiles']},
+        )
+
+
+class NestedProfileTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 2, 'items_per_type': 3, 'assessments_per_profile': 0}
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.profiles[1]
+        now = timezone.now()
+        for profile in (self.profile, self.other):
+            for hours in range(12, 0, -1):
+                backdated_assessment(profile, hours * 5, now - timedelta(hours=hours))
+
+    def nested_profile(self, pk):
+        queryset = FinancialProfile.objects.select_related('user', 'rollup', 'latest_assessment')
+        return queryset.with_nested_data().get(pk=pk)
+
+    def test_prefetched_document_matches_lazy_loading(self):
+        profile = self.nested_profile(self.profile.pk)
+        with self.assertNumQueries(0):
+            prefetched = FinancialProfileSerializer(profile).data
+        self.assertEqual(prefetched, FinancialProfileSerializer(FinancialProfile.objects.get(pk=self.profile.pk)).data)
+
+        recent = prefetched['risk_assessments']
+        self.assertEqual(len(recent), FinancialProfile.RECENT_RISK_ASSESSMENTS)
+        # Newest first, and only this profile's: the prefetch is sliced per profile
+        self.assertEqual([row['score'] for row in recent], [hours * 5 for hours in range(1, 11)])
+        self.assertEqual(
+            {row['id'] for row in recent} - set(self.profile.risk_assessments.values_list('pk', flat=True)), set()
+        )
+        self.assertEqual(prefetched['risk_assessment_count'], 12)
+
+    def test_detail_queries_do_not_grow_with_line_items(self):
+        self.client.force_login(self.users[0])
+
+        def detail_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse('financial-profile-detail')).status_code, 200)
+            return len(queries)
+
+        detail_queries()  # Caches the user's profile id
+        before = detail_queries()
+        rng = random.Random(10)
+        for model in (Income, Expense, Debt, Asset):
+            model.objects.bulk_create(
+                model(profile=self.profile, **random_line_item_fields(model, rng)) for _ in range(20)
+            )
+        self.profile.save()
+        self.assertEqual(detail_queries(), before)
+
+
+class ProfileListingTests(SeededProfilesMixin, TestCase):
+    seed = {'profiles': 13, 'items_per_type': 0, 'assessments_per_profile': 0}
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        # Every sort key repeats, so only the id tie-breaker tells rows apart
+        for index, profile in enumerate(self.profiles):
+            Asset.objects.create(
+                profile=profile, asset_name='Savings', asset_type='savings', value=Decimal(100 * (index % 3))
+            )
+            if index % 4 != 3:
+                RiskAssessmentHistory.objects.create(profile=profile, score=40 + index % 2 * 10)
+        FinancialProfile.objects.filter(pk__in=[profile.pk for profile in self.profiles]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+
+    def walk(self, ordering, page_size=4, between_pages=None):
+        """Every row of a listing, following the cursor links page by page"""
+        rows, url = [], f"{reverse('financial-profile-list')}?ordering={ordering}&page_size={page_size}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), page_size)
+            rows.extend(page['results'])
+            url = page['next']
+            if between_pages:
+                between_pages()
+        return rows
+
+    def test_pages_follow_the_sort_key_then_the_id(self):
+        for ordering, key in (
+            ('-created_at', lambda row: (row['created_at'],)),
+            ('net_worth', lambda row: (Decimal(str(row['net_worth'])),)),
+            ('-latest_risk_score', lambda row: (row['latest_risk_score'],)),
+        ):
+            with self.subTest(ordering=ordering):
+                rows = self.walk(ordering)
+                ids = [row['id'] for row in rows]
+                self.assertEqual(len(ids), len(set(ids)))
+                expected = len(self.profiles) if ordering != '-latest_risk_score' else 10
+                self.assertEqual(len(ids), expected)
+                descending = ordering.startswith('-')
+                self.assertEqual(rows, sorted(rows, key=lambda row: (*key(row), row['id']), reverse=descending))
+
+    def test_previous_links_retrace_the_pages(self):
+        url, pages = f"{reverse('financial-profile-list')}?ordering=net_worth&page_size=4", []
+        while url:
+            page = self.client.get(url).json()
+            pages.append([row['id'] for row in page['results']])
+            url = page['next']
+        retraced, url = [], page['previous']
+        while url:
+            page = self.client.get(url).json()
+            retraced.insert(0, [row['id'] for row in page['results']])
+            url = page['previous']
+        self.assertEqual(retraced, pages[:-1])
+
+    def test_malformed_cursor_is_not_found(self):
+        response = self.client.get(f"{reverse('financial-profile-list')}?cursor=cD0yMDI2LTEwLTE2")
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_between_pages_do_not_repeat_or_skip_rows(self):
+        rng = random.Random(11)
+
+        def write():
+            # A newer profile joins the listing, and an existing one is reassessed
+            seed_profiles(profiles=1, items_per_type=1, assessments_per_profile=1, seed=rng.random())
+            RiskAssessmentHistory.objects.create(profile=rng.choice(self.profiles), score=rng.randint(0, 100))
+
+        ids = [row['id'] for row in self.walk('-created_at', between_pages=write)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertLessEqual({profile.pk for profile in self.profiles}, set(ids))
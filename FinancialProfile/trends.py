@@ -0,0 +1,171 @@
+# FinancialProfile/trends.py
+
+from django.db import connections
+from django.db.models import Count, F, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Lag, TruncDay, TruncHour, TruncMonth, TruncWeek
+
+from .models import RiskAssessmentHistory, RiskHistoryBucket
+
+TREND_BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def level_transitions(assessments, history_buckets=None):
+    """
+    Assessments whose risk level differs from the previous assessment of the
+    same profile, found with LAG() in the database
+    With `history_buckets`, an assessment with no earlier one in
+    `assessments` is compared with the last of those buckets before it.
+    """
+    compacted_level = None
+    if history_buckets is not None:
+        compacted_level = Subquery(
+            history_buckets
+            .filter(profile_id=OuterRef('profile_id'), last_assessed_at__lte=OuterRef('assessment_date'))
+            .order_by('-last_assessed_at')
+            .values('last_risk_level')[:1]
+        )
+    previous_level = Window(
+        Lag('risk_level', default=compacted_level),
+        partition_by=[F('profile_id')],
+        order_by=[F('assessment_date').asc(), F('pk').asc()],
+    )
+    changed = (
+        assessments
+        .annotate(previous_level=previous_level)
+        .filter(previous_level__isnull=False)
+        .exclude(previous_level=F('risk_level'))
+    )
+    return RiskAssessmentHistory.objects.filter(pk__in=changed.values('pk'))
+
+
+def bucket_level_transitions(history_buckets):
+    """
+    Buckets whose first risk level differs from the last level of the same
+    profile's previous bucket, found with LAG() in the database
+    """
+    previous_level = Window(
+        Lag('last_risk_level'),
+        partition_by=[F('profile_id')],
+        order_by=[F('first_assessed_at').asc(), F('pk').asc()],
+    )
+    changed = (
+        history_buckets
+        .annotate(previous_level=previous_level)
+        .filter(previous_level__isnull=False)
+        .exclude(previous_level=F('first_risk_level'))
+    )
+    return RiskHistoryBucket.objects.filter(pk__in=changed.values('pk'))
+
+
+def _between(queryset, field, start=None, end=None):
+    """`queryset` narrowed to rows whose `field` falls in [start, end)"""
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
+
+
+def _per_period(queryset, trunc, field, **totals):
+    """`totals` of `queryset` per period, truncating `field` to periods"""
+    return queryset.order_by().annotate(trend_period=trunc(field)).values('trend_period').annotate(**totals)
+
+
+def _converter(expression, connection):
+    """Apply the ORM's converters for `expression` to a value read with a raw cursor"""
+    converters = connection.ops.get_db_converters(expression) + expression.get_db_converters(connection)
+
+    def convert(value):
+        for converter in converters:
+            value = converter(value, expression, connection)
+        return value
+    return convert
+
+
+# Sums the per-period rows of every source, then averages the period
+# averages over a frame of the last `window` non-empty periods
+_TREND_SQL = """
+SELECT trend_period, assessments, min_score, max_score, level_changes, average_score,
+    AVG(average_score) OVER (ORDER BY trend_period ROWS BETWEEN {preceding} PRECEDING AND CURRENT ROW)
+FROM (
+    SELECT trend_period, SUM(assessments) AS assessments, MIN(min_score) AS min_score,
+        MAX(max_score) AS max_score, SUM(level_changes) AS level_changes,
+        1.0 * SUM(score_total) / SUM(assessments) AS average_score
+    FROM ({periods}) period_rows
+    GROUP BY trend_period
+    HAVING SUM(assessments) > 0
+) period_totals
+ORDER BY trend_period
+"""
+
+
+def risk_trend(assessments, history_buckets, bucket='day', window=7, start=None, end=None):
+    """
+    Score series for the assessments and compacted `history_buckets` of the
+    same profiles in [start, end), grouped into hour/day/week/month periods
+    Each period has the assessment count, average/min/max score, the moving
+    average of period averages over the last `window` non-empty periods and
+    the number of risk level transitions. Everything is computed in one
+    query: per-period totals of assessments, buckets and transitions are
+    combined with UNION ALL, then summed and windowed with AVG() OVER. A
+    bucket stays whole, in the period of its first assessment, even when the
+    periods are finer than the bucket. `assessments` and `history_buckets`
+    must not be narrowed to the range themselves, so LAG() can compare the
+    first assessment in range with the one before it.
+    """
+    trunc = TREND_BUCKETS[bucket]
+    no_score = Value(None, output_field=IntegerField())
+    zero = Value(0, output_field=IntegerField())
+    full_resolution = _per_period(
+        _between(assessments, 'assessment_date', start, end), trunc, 'assessment_date',
+        assessments=Count('pk'), score_total=Sum('score'), min_score=Min('score'), max_score=Max('score'),
+        level_changes=zero,
+    )
+    compacted = _per_period(
+        _between(history_buckets, 'first_assessed_at', start, end), trunc, 'first_assessed_at',
+        assessments=Sum('assessment_count'), score_total=Sum('score_total'), min_score=Min('min_score'),
+        max_score=Max('max_score'), level_changes=Sum('level_changes'),
+    )
+    # Rows after `end` can't precede anything in range, so only they are cut
+    # before LAG() runs
+    transitions = _per_period(
+        _between(
+            level_transitions(_between(assessments, 'assessment_date', end=end), history_buckets),
+            'assessment_date', start,
+        ),
+        trunc, 'assessment_date',
+        assessments=zero, score_total=zero, min_score=no_score, max_score=no_score, level_changes=Count('pk'),
+    )
+    bucket_transitions = _per_period(
+        _between(
+            bucket_level_transitions(_between(history_buckets, 'first_assessed_at', end=end)),
+            'first_assessed_at', start,
+        ),
+        trunc, 'first_assessed_at',
+        assessments=zero, score_total=zero, min_score=no_score, max_score=no_score, level_changes=Count('pk'),
+    )
+
+    periods = full_resolution.union(compacted, transitions, bucket_transitions, all=True)
+    connection = connections[periods.db]
+    periods_sql, params = periods.query.get_compiler(connection=connection).as_sql()
+    convert_period = _converter(full_resolution.query.annotations['trend_period'], connection)
+    with connection.cursor() as cursor:
+        cursor.execute(_TREND_SQL.format(periods=periods_sql, preceding=int(window) - 1), params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'period': convert_period(period),
+            'assessments': int(count),
+            'average_score': round(float(average), 2),
+            'min_score': min_score,
+            'max_score': max_score,
+            'moving_average': round(float(moving_average), 2),
+            'level_transitions': int(changes),
+        }
+        for period, count, min_score, max_score, changes, average, moving_average in rows
+    ]
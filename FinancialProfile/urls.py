@@ -33,7 +33,13 @@ urlpatterns = [
     # Custom endpoints
     path('summary/', views.financial_summary, name='financial-summary'),
     path('bulk-create/', views.bulk_create_financial_data, name='bulk-create-financial-data'),
+    path('import/', views.import_financial_data, name='import-financial-data'),
 
     # Risk calculator endpoints
     path('calculate-risk-assessment/', views.calculate_risk_assessment, name='calculate-risk-assessment'),
+    path('risk-trend/', views.risk_trend, name='risk-trend'),
+    path('simulate/', views.simulate, name='simulate'),
+    path('debt-payoff/', views.debt_payoff, name='debt-payoff'),
+    path('stress-test/', views.stress_test, name='stress-test'),
+    path('score-percentile/', views.score_percentile, name='score-percentile'),
 ]
@@ -1,12 +1,34 @@
 # FinancialProfile/views.py
 
+from datetime import timedelta
+from decimal import Decimal
+
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-
-from .models import FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from .caching import get_cached_entry, get_profile_id_for_user, get_profile_validators
+from .distribution import COHORTS, MAX_SCORE, cohorts_for, score_percentiles
+from .ingest import (
+    LINE_ITEM_SERIALIZERS, LineItemImporter, finish_bulk_ingest,
+    iter_csv_rows, iter_decoded_lines, iter_ndjson_rows,
+)
+from .models import FinancialProfile, Income, Expense, Debt, Asset, RiskAssessmentHistory, RiskHistoryBucket
+from .pagination import ProfileCursorPagination
+from .payoff import PAYOFF_STRATEGIES, DebtPayoffProjection
+from .request_profile import (
+    get_profile_version, get_profile_version_with, get_request_profile, get_request_profile_id, scoped_profile,
+)
+from .risk_calculator import FinancialRiskCalculator
 from .serializers import (
     FinancialProfileSerializer, FinancialProfileSummarySerializer,
     IncomeSerializer, IncomeCreateSerializer,
@@ -15,18 +37,161 @@ from .serializers import (
     AssetSerializer, AssetCreateSerializer,
     RiskAssessmentHistorySerializer, RiskAssessmentCreateSerializer
 )
+from .simulation import ScenarioSimulator
+from .stress import CashFlowStressTest, stress_test_profile
+from .trends import TREND_BUCKETS, risk_trend as compute_risk_trend
+
+
+def _query_param(params, name, parse):
+    """Parse an optional query parameter, turning bad input into a 400"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return parse(value)
+    except (ValueError, ArithmeticError):
+        raise ValidationError({name: f"Invalid value '{value}'."})
+
+
+def _parse_aware_datetime(value):
+    """Parse an ISO 8601 date-time, assuming the current time zone when none is given"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def filter_profile_listing(queryset, params):
+    """
+    Apply the listing filters: risk_level (comma separated), min_score,
+    max_score, min_net_worth and max_net_worth
+    Expects a queryset annotated by with_listing_totals.
+    """
+    risk_levels = _query_param(params, 'risk_level', lambda value: value.split(','))
+    if risk_levels:
+        valid_levels = dict(RiskAssessmentHistory.RISK_LEVEL_CHOICES)
+        unknown = [level for level in risk_levels if level not in valid_levels]
+        if unknown:
+            raise ValidationError({'risk_level': f"Unknown risk level(s): {', '.join(unknown)}."})
+        queryset = queryset.filter(latest_risk_level__in=risk_levels)
+
+    lookups = {
+        'min_score': ('latest_risk_score__gte', int),
+        'max_score': ('latest_risk_score__lte', int),
+        'min_net_worth': ('net_worth__gte', Decimal),
+        'max_net_worth': ('net_worth__lte', Decimal),
+    }
+    for name, (lookup, parse) in lookups.items():
+        value = _query_param(params, name, parse)
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def check_profile_conditions(request, profile_id, media_type, *representation):
+    """
+    Validators (ETag, Last-Modified timestamp) for a GET built from one
+    profile's data, and the 304/412 response to send instead, if any
+    Both are None for a profile that doesn't exist. `representation` adds
+    whatever else the response shows that the profile's version doesn't cover.
+    """
+    version = get_profile_version(profile_id)
+    if version is None:
+        return None, None
+    etag, last_modified = get_profile_validators(
+        profile_id, version, request.get_full_path(), media_type, *representation
+    )
+    return (etag, last_modified), get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def cached_profile_entry(name, profile_id, build):
+    """`build()` for a profile, cached until its data version changes; Http404 if there is no such profile"""
+    version = get_profile_version(profile_id)
+    if version is None:
+        raise Http404('No FinancialProfile matches the given query.')
+    return get_cached_entry(name, profile_id, version[0], build)
+
+
+def set_profile_validators(response, validators):
+    if validators is not None and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Per-user data: browsers may keep it but must revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+def conditional_profile_get(request, profile_id, get_response, *representation):
+    """
+    Answer a GET built from one profile's data with a strong ETag and
+    Last-Modified, returning 304 Not Modified before get_response() runs
+    when the client's copy is current
+    """
+    if profile_id is None:
+        return get_response()
+    validators, response = check_profile_conditions(
+        request, profile_id, request.accepted_media_type, *representation
+    )
+    response = response or get_response()
+    set_profile_validators(response, validators)
+    return response
+
+
+class ProfileConditionalGetMixin:
+    """Conditional GET for views that only show the requesting user's profile data"""
+
+    def get_conditional_profile_id(self):
+        return get_profile_id_for_user(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        get_response = super().get
+        return conditional_profile_get(
+            request, self.get_conditional_profile_id(), lambda: get_response(request, *args, **kwargs)
+        )
+
+
+class RequestProfileMixin:
+    """Views of the requesting user's own profile data, resolved once per request"""
+
+    def get_profile_id(self):
+        return get_request_profile_id(self.request)
+
+    def get_profile(self):
+        return get_request_profile(self.request)
 
 
 # FinancialProfile Views
-class FinancialProfileListCreateView(generics.ListCreateAPIView):
+class FinancialProfileListCreateView(ProfileConditionalGetMixin, generics.ListCreateAPIView):
+    """
+    Staff see every profile, everyone else only their own. Listing is cursor
+    paginated; sort with ?ordering= on created_at, net_worth or
+    latest_risk_score (unassessed profiles are left out when sorting by score)
+    """
     serializer_class = FinancialProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProfileCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['created_at', 'net_worth', 'latest_risk_score']
+    ordering = ['-created_at', '-id']
+
+    def get_conditional_profile_id(self):
+        # Staff listings span every profile, so there is no single version to compare
+        if self.request.user.is_staff:
+            return None
+        return super().get_conditional_profile_id()
     
     def get_queryset(self):
         user = self.request.user
-        if user.is_staff:
-            return FinancialProfile.objects.all()
-        return FinancialProfile.objects.filter(user=user)
+        queryset = FinancialProfile.objects.select_related('user')
+        if not user.is_staff:
+            queryset = queryset.filter(user=user)
+        if self.request.method != 'GET':
+            return queryset
+
+        queryset = filter_profile_listing(queryset.with_listing_totals(), self.request.query_params)
+        if 'latest_risk_score' in self.request.query_params.get('ordering', ''):
+            queryset = queryset.filter(latest_risk_score__isnull=False)
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -37,22 +202,22 @@ class FinancialProfileListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class FinancialProfileDetailView(generics.RetrieveUpdateDestroyAPIView):
+class FinancialProfileDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FinancialProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return get_object_or_404(FinancialProfile, user=self.request.user)
+        queryset = FinancialProfile.objects.select_related('user', 'rollup', 'latest_assessment').with_nested_data()
+        return get_object_or_404(queryset, pk=self.get_profile_id())
 
 
 # Income Views
-class IncomeListCreateView(generics.ListCreateAPIView):
+class IncomeListCreateView(RequestProfileMixin, ProfileConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = IncomeSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Income.objects.filter(profile=profile)
+        return Income.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -60,17 +225,15 @@ class IncomeListCreateView(generics.ListCreateAPIView):
         return IncomeSerializer
     
     def perform_create(self, serializer):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        serializer.save(profile=profile)
+        serializer.save(profile=self.get_profile())
 
 
-class IncomeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class IncomeDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = IncomeSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Income.objects.filter(profile=profile)
+        return Income.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -79,13 +242,12 @@ class IncomeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Expense Views
-class ExpenseListCreateView(generics.ListCreateAPIView):
+class ExpenseListCreateView(RequestProfileMixin, ProfileConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Expense.objects.filter(profile=profile)
+        return Expense.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -93,17 +255,15 @@ class ExpenseListCreateView(generics.ListCreateAPIView):
         return ExpenseSerializer
     
     def perform_create(self, serializer):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        serializer.save(profile=profile)
+        serializer.save(profile=self.get_profile())
 
 
-class ExpenseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ExpenseDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Expense.objects.filter(profile=profile)
+        return Expense.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -112,13 +272,12 @@ class ExpenseDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Debt Views
-class DebtListCreateView(generics.ListCreateAPIView):
+class DebtListCreateView(RequestProfileMixin, ProfileConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = DebtSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Debt.objects.filter(profile=profile)
+        return Debt.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -126,17 +285,15 @@ class DebtListCreateView(generics.ListCreateAPIView):
         return DebtSerializer
     
     def perform_create(self, serializer):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        serializer.save(profile=profile)
+        serializer.save(profile=self.get_profile())
 
 
-class DebtDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DebtDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DebtSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Debt.objects.filter(profile=profile)
+        return Debt.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -145,13 +302,12 @@ class DebtDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Asset Views
-class AssetListCreateView(generics.ListCreateAPIView):
+class AssetListCreateView(RequestProfileMixin, ProfileConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = AssetSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Asset.objects.filter(profile=profile)
+        return Asset.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -159,17 +315,15 @@ class AssetListCreateView(generics.ListCreateAPIView):
         return AssetSerializer
     
     def perform_create(self, serializer):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        serializer.save(profile=profile)
+        serializer.save(profile=self.get_profile())
 
 
-class AssetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AssetDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AssetSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return Asset.objects.filter(profile=profile)
+        return Asset.objects.filter(profile_id=self.get_profile_id())
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -178,13 +332,12 @@ class AssetDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Risk Assessment Views
-class RiskAssessmentListCreateView(generics.ListCreateAPIView):
+class RiskAssessmentListCreateView(RequestProfileMixin, ProfileConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = RiskAssessmentHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return RiskAssessmentHistory.objects.filter(profile=profile)
+        return RiskAssessmentHistory.objects.filter(profile_id=self.get_profile_id()).select_related('summary_template')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -192,80 +345,119 @@ class RiskAssessmentListCreateView(generics.ListCreateAPIView):
         return RiskAssessmentHistorySerializer
     
     def perform_create(self, serializer):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        serializer.save(profile=profile)
+        serializer.save(profile=self.get_profile())
 
 
-class RiskAssessmentDetailView(generics.RetrieveDestroyAPIView):
+class RiskAssessmentDetailView(RequestProfileMixin, ProfileConditionalGetMixin, generics.RetrieveDestroyAPIView):
     serializer_class = RiskAssessmentHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        profile = get_object_or_404(FinancialProfile, user=self.request.user)
-        return RiskAssessmentHistory.objects.filter(profile=profile)
+        return RiskAssessmentHistory.objects.filter(profile_id=self.get_profile_id()).select_related('summary_template')
 
 
 # Custom API Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def financial_summary(request):
-    """Get a complete financial summary for the authenticated user"""
-    try:
-        profile = FinancialProfile.objects.get(user=request.user)
-        
-        from .risk_calculator import FinancialRiskCalculator
-        calculator = FinancialRiskCalculator(profile)
-        calculator.calculate_risk_score()  # Populates risk_factors
-
-        summary_data = {
-            'profile_id': profile.id,
-            'user': profile.user.username,
-            'last_assessed': profile.last_assessed,
-            'financial_metrics': {
-                'total_monthly_income': profile.get_total_income(),
-                'total_monthly_expenses': profile.get_total_expenses(),
-                'total_debt_balance': profile.get_total_debt_balance(),
-                'total_assets_value': profile.get_total_assets_value(),
-                'net_worth': profile.get_net_worth(),
-                'debt_to_income_ratio': profile.get_debt_to_income_ratio(),
-            },
-            'risk_factors': calculator.risk_factors,
-            'counts': {
-                'income_sources': profile.incomes.count(),
-                'expense_categories': profile.expenses.count(),
-                'debts': profile.debts.count(),
-                'assets': profile.assets.count(),
-                'risk_assessments': profile.risk_assessments.count(),
-            },
-            'latest_risk_assessment': {
-                'score': profile.get_latest_risk_score(),
-                'level': profile.risk_assessments.first().get_risk_level_display() if profile.risk_assessments.first() else None,
-                'color': profile.risk_assessments.first().get_risk_level_display_color() if profile.risk_assessments.first() else None,
-            },
-            'profile_completeness': {
-                'is_complete': profile.has_complete_profile(),
-                'has_income': profile.incomes.exists(),
-                'has_expenses': profile.expenses.exists(),
-                'has_debts': profile.debts.exists(),
-                'has_assets': profile.assets.exists(),
-            }
-        }
-        
-        return Response(summary_data, status=status.HTTP_200_OK)
-    
-    except FinancialProfile.DoesNotExist:
+    """
+    Get a complete financial summary for the authenticated user
+    Served from the financial cache until the profile's data changes, and
+    as 304 Not Modified when If-None-Match still matches. The percentiles
+    move with every other profile's score, so they are read on each request
+    and folded into the ETag rather than cached. The ETag needs only the
+    profile row and the percentiles, so a 304 never builds the summary.
+    """
+    profile_id = get_profile_id_for_user(request.user)
+    row = profile_id and get_profile_version_with(profile_id, 'latest_assessment__score', 'user__date_of_birth')
+    if row is None:
         return Response(
             {'error': 'Financial profile not found. Please create one first.'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    score, date_of_birth = row[2:]
+    percentiles = score_percentiles(score, cohorts_for(date_of_birth)) if score is not None else []
+    return conditional_profile_get(request, profile_id, lambda: Response(
+        with_score_percentiles(
+            cached_profile_entry('summary', profile_id, lambda: _build_financial_summary(profile_id)), percentiles
+        ),
+        status=status.HTTP_200_OK
+    ), percentiles)
+
+
+def summary_queryset():
+    """Everything the financial summary shows, loaded by a single query"""
+    return FinancialProfile.objects.select_related('user', 'rollup', 'latest_assessment').with_line_item_counts()
+
+
+def with_score_percentiles(summary, percentiles):
+    """A copy of financial_summary_data() with the latest score's percentile rankings filled in"""
+    return {**summary, 'latest_risk_assessment': {**summary['latest_risk_assessment'], 'percentiles': percentiles}}
+
+
+def financial_summary_data(profile, snapshot):
+    """
+    The financial summary of a profile from summary_queryset() and its
+    FinancialSnapshot, without percentiles (see with_score_percentiles());
+    runs no queries
+    """
+    from .risk_calculator import FinancialRiskCalculator
+    calculator = FinancialRiskCalculator(profile, snapshot=snapshot)
+    calculator.calculate_risk_score()  # Populates risk_factors
+    latest_assessment = profile.latest_assessment
+
+    return {
+        'profile_id': profile.id,
+        'user': profile.user.username,
+        'last_assessed': profile.last_assessed,
+        'financial_metrics': {
+            'total_monthly_income': snapshot.monthly_income,
+            'total_monthly_expenses': snapshot.monthly_expenses,
+            'total_debt_balance': snapshot.debt_balance,
+            'total_assets_value': snapshot.total_assets,
+            'net_worth': snapshot.total_assets - snapshot.debt_balance,
+            'debt_to_income_ratio': snapshot.get_debt_to_income_ratio(),
+        },
+        'risk_factors': calculator.risk_factors,
+        'counts': {
+            'income_sources': profile.income_count,
+            'expense_categories': profile.expense_count,
+            'debts': profile.debt_count,
+            'assets': profile.asset_count,
+            'risk_assessments': profile.risk_assessment_count,
+        },
+        'latest_risk_assessment': {
+            'score': latest_assessment.score if latest_assessment else None,
+            'level': latest_assessment.get_risk_level_display() if latest_assessment else None,
+            'color': latest_assessment.get_risk_level_display_color() if latest_assessment else None,
+            'percentiles': [],
+        },
+        'profile_completeness': {
+            'is_complete': all((profile.income_count, profile.expense_count, profile.debt_count, profile.asset_count)),
+            'has_income': profile.income_count > 0,
+            'has_expenses': profile.expense_count > 0,
+            'has_debts': profile.debt_count > 0,
+            'has_assets': profile.asset_count > 0,
+        }
+    }
+
+
+def _build_financial_summary(profile_id):
+    """The cached part of the summary"""
+    from .risk_calculator import FinancialSnapshot
+    profile = summary_queryset().get(pk=profile_id)
+    return financial_summary_data(profile, FinancialSnapshot.for_profile(profile))
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def bulk_create_financial_data(request):
-    """Bulk create financial data in a single transaction"""
+    """
+    Bulk create financial data in a single transaction
+    Items are inserted with bulk_create and the profile is assessed once at the end.
+    """
     try:
-        profile = get_object_or_404(FinancialProfile, user=request.user)
+        profile = get_request_profile(request)
         data = request.data
         
         with transaction.atomic():
@@ -277,45 +469,21 @@ def bulk_create_financial_data(request):
                 'errors': []
             }
             
-            # Create incomes
-            if 'incomes' in data:
-                for income_data in data['incomes']:
-                    serializer = IncomeCreateSerializer(data=income_data)
-                    if serializer.is_valid():
-                        serializer.save(profile=profile)
-                        results['incomes_created'] += 1
-                    else:
-                        results['errors'].append({'income': serializer.errors})
-            
-            # Create expenses
-            if 'expenses' in data:
-                for expense_data in data['expenses']:
-                    serializer = ExpenseCreateSerializer(data=expense_data)
-                    if serializer.is_valid():
-                        serializer.save(profile=profile)
-                        results['expenses_created'] += 1
-                    else:
-                        results['errors'].append({'expense': serializer.errors})
+            # Validate each list in one pass and insert the valid items in batches
+            for key, (serializer_class, label) in LINE_ITEM_SERIALIZERS.items():
+                if key not in data:
+                    continue
+                serializer = serializer_class(data=data[key], many=True)
+                if not serializer.is_valid():
+                    results['errors'].append({label: serializer.errors})
+                    continue
+                created = serializer.save(profile=profile)
+                results[f'{key}_created'] = len(created)
+                for index, errors in serializer.item_errors:
+                    results['errors'].append({label: errors, 'index': index})
             
-            # Create debts
-            if 'debts' in data:
-                for debt_data in data['debts']:
-                    serializer = DebtCreateSerializer(data=debt_data)
-                    if serializer.is_valid():
-                        serializer.save(profile=profile)
-                        results['debts_created'] += 1
-                    else:
-                        results['errors'].append({'debt': serializer.errors})
-            
-            # Create assets
-            if 'assets' in data:
-                for asset_data in data['assets']:
-                    serializer = AssetCreateSerializer(data=asset_data)
-                    if serializer.is_valid():
-                        serializer.save(profile=profile)
-                        results['assets_created'] += 1
-                    else:
-                        results['errors'].append({'asset': serializer.errors})
+            if any(results[f'{key}_created'] for key in LINE_ITEM_SERIALIZERS):
+                finish_bulk_ingest(profile.pk)
             
             return Response(results, status=status.HTTP_201_CREATED)
     
@@ -325,12 +493,58 @@ def bulk_create_financial_data(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_financial_data(request):
+    """
+    Stream-import incomes, expenses, debts and assets from NDJSON or CSV
+    Each row carries a `type` (income, expense, debt or asset), or the whole
+    upload uses ?type=. Rows are parsed from the request stream, validated with
+    the create serializers and written in batches; errors are reported per line.
+    """
+    profile = get_request_profile(request)
+
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        row_parser = iter_ndjson_rows
+    elif content_type == 'text/csv':
+        row_parser = iter_csv_rows
+    else:
+        return Response(
+            {'error': 'Upload must be application/x-ndjson or text/csv.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    importer = LineItemImporter(profile, default_type=request.query_params.get('type'))
+    # DRF's request.stream is None without a Content-Length (a chunked
+    # upload), so read Django's request, which holds such bodies under ASGI
+    try:
+        for line_number, row in row_parser(iter_decoded_lines(request._request)):
+            importer.add(line_number, row)
+    except UnicodeDecodeError:
+        # Rows before the undecodable line have already been written
+        return Response(
+            {'error': 'Upload must be UTF-8 encoded.', **importer.finish()},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not importer.rows_read:
+        if request.META.get('CONTENT_LENGTH'):
+            return Response({'error': 'Upload contains no rows.'}, status=status.HTTP_400_BAD_REQUEST)
+        # A chunked body the server didn't pass on (WSGI) reads as empty
+        return Response(
+            {'error': 'Upload body is empty; send it with a Content-Length header.'},
+            status=status.HTTP_411_LENGTH_REQUIRED
+        )
+    return Response(importer.finish(), status=status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def calculate_risk_assessment(request):
     """Calculate and create a new risk assessment"""
     try:
-        profile = FinancialProfile.objects.get(user=request.user)
+        profile = get_request_profile(request)
         
         if not profile.has_complete_profile():
             return Response(
@@ -343,8 +557,297 @@ def calculate_risk_assessment(request):
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
-    except FinancialProfile.DoesNotExist:
+    except Http404:
         return Response(
             {'error': 'Financial profile not found'}, 
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def risk_trend(request):
+    """
+    Bucketed risk score series for the authenticated user's profile
+    Query parameters: bucket (hour, day, week or month; default day), window
+    (moving average size in buckets; default 7), start and end (ISO 8601;
+    default the last 90 days). Staff may instead pass profile=<id>, or
+    cohort=all / cohort=<risk levels> for every profile whose latest
+    assessment is at one of those levels. History compacted into
+    RiskHistoryBucket rows is included alongside full-resolution assessments.
+    """
+    params = request.query_params
+    bucket = params.get('bucket', 'day')
+    if bucket not in TREND_BUCKETS:
+        return Response(
+            {'error': f"bucket must be one of: {', '.join(TREND_BUCKETS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    window = _query_param(params, 'window', int)
+    if window is None:
+        window = 7
+    if not 1 <= window <= 365:
+        return Response({'error': 'window must be between 1 and 365'}, status=status.HTTP_400_BAD_REQUEST)
+    end = _query_param(params, 'end', _parse_aware_datetime) or timezone.now()
+    start = _query_param(params, 'start', _parse_aware_datetime) or end - timedelta(days=90)
+    if start >= end:
+        return Response({'error': 'start must be before end'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Left unbounded by start: the trend looks back past it for level transitions
+    assessments = RiskAssessmentHistory.objects.all()
+    history_buckets = RiskHistoryBucket.objects.all()
+    cohort = params.get('cohort')
+    profile_id = _query_param(params, 'profile', int)
+    if (cohort or profile_id) and not request.user.is_staff:
+        return Response(
+            {'error': 'Only staff can view trends for other profiles'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    if cohort:
+        scope = {'cohort': cohort}
+        if cohort != 'all':
+            risk_levels = cohort.split(',')
+            if not set(risk_levels) <= set(dict(RiskAssessmentHistory.RISK_LEVEL_CHOICES)):
+                return Response({'error': f"Unknown cohort '{cohort}'"}, status=status.HTTP_400_BAD_REQUEST)
+            assessments = assessments.filter(profile__latest_assessment__risk_level__in=risk_levels)
+            history_buckets = history_buckets.filter(profile__latest_assessment__risk_level__in=risk_levels)
+    else:
+        if profile_id:
+            profile_id = get_object_or_404(FinancialProfile.objects.only('pk'), pk=profile_id).pk
+        else:
+            profile_id = get_request_profile_id(request)
+        scope = {'profile_id': profile_id}
+        assessments = assessments.filter(profile_id=profile_id)
+        history_buckets = history_buckets.filter(profile_id=profile_id)
+
+    return Response({
+        **scope,
+        'bucket': bucket,
+        'window': window,
+        'start': start,
+        'end': end,
+        'series': compute_risk_trend(assessments, history_buckets, bucket, window, start, end),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def simulate(request):
+    """
+    Score hypothetical changes to the authenticated user's profile without saving them
+    Body: {"scenarios": [{"name": ..., "changes": [{"action": "add" | "edit" |
+    "remove", "type": "income" | "expense" | "debt" | "asset", "id": ...,
+    "data": {...}}]}]}. Staff may pass profile=<id> to simulate another profile.
+    """
+    profile_id = _query_param(request.query_params, 'profile', int)
+    if profile_id and not request.user.is_staff:
+        return Response(
+            {'error': 'Only staff can simulate other profiles'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if profile_id:
+        profile = get_object_or_404(FinancialProfile.objects.only('pk'), pk=profile_id)
+    else:
+        profile = get_request_profile(request)
+    simulator = ScenarioSimulator(profile)
+    scenarios = request.data.get('scenarios') if isinstance(request.data, dict) else None
+    results = simulator.simulate(scenarios)
+    if results is None:
+        return Response(
+            {'error': 'Invalid scenarios', 'errors': simulator.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({'profile_id': profile.pk, **results}, status=status.HTTP_200_OK)
+
+
+def _requested_profile_id(request, forbidden_message):
+    """
+    The profile a projection runs on: the user's own, or profile=<id> for staff
+    Returns (profile_id, None), or (None, error response).
+    """
+    profile_id = _query_param(request.query_params, 'profile', int)
+    if profile_id and not request.user.is_staff:
+        return None, Response({'error': forbidden_message}, status=status.HTTP_403_FORBIDDEN)
+    if not profile_id:
+        # The request's own profile, which also answers the version check
+        try:
+            profile_id = get_request_profile(request).pk
+        except Http404:
+            return None, Response({'error': 'Financial profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return profile_id, None
+
+
+PAYOFF_SCHEDULES = ('summary', 'debts', 'none')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def debt_payoff(request):
+    """
+    Project paying off the authenticated user's debts month by month
+    Query parameters: strategy (avalanche, snowball or minimum; default
+    avalanche), extra_payment (paid on top of the minimums each month;
+    default 0) and schedule (summary for monthly totals, debts to add each
+    debt's balance, none to leave the schedule out; default summary). Staff
+    may pass profile=<id>.
+    """
+    params = request.query_params
+    strategy = params.get('strategy', 'avalanche')
+    if strategy not in PAYOFF_STRATEGIES:
+        return Response(
+            {'error': f"strategy must be one of: {', '.join(PAYOFF_STRATEGIES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    schedule = params.get('schedule', 'summary')
+    if schedule not in PAYOFF_SCHEDULES:
+        return Response(
+            {'error': f"schedule must be one of: {', '.join(PAYOFF_SCHEDULES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    extra_payment = _query_param(params, 'extra_payment', Decimal) or Decimal('0')
+    if not extra_payment.is_finite() or extra_payment < 0:
+        return Response({'error': 'extra_payment must be zero or more'}, status=status.HTTP_400_BAD_REQUEST)
+
+    profile_id, response = _requested_profile_id(request, 'Only staff can project payoffs for other profiles')
+    if response is not None:
+        return response
+    return conditional_profile_get(request, profile_id, lambda: Response(
+        _build_debt_payoff(profile_id, strategy, extra_payment, schedule),
+        status=status.HTTP_200_OK
+    ))
+
+
+def _build_debt_payoff(profile_id, strategy, extra_payment, schedule):
+    debts = list(Debt.objects.filter(profile_id=profile_id).order_by('pk'))
+    if not debts and not FinancialProfile.objects.filter(pk=profile_id).exists():
+        raise Http404('No FinancialProfile matches the given query.')
+
+    projections = {
+        name: DebtPayoffProjection.from_debts(debts, strategy=name, extra_payment=extra_payment).project()
+        for name in PAYOFF_STRATEGIES
+    }
+    projection = projections[strategy]
+    data = {
+        'profile_id': profile_id,
+        'strategy': strategy,
+        'extra_payment': extra_payment,
+        'months_to_debt_free': projection.months_to_debt_free,
+        'total_interest': round(projection.total_interest, 2),
+        'total_paid': round(projection.total_paid, 2),
+        'payoff_factors': FinancialRiskCalculator(None).calculate_payoff_factors(projection),
+        'comparison': {
+            name: {
+                'months_to_debt_free': other.months_to_debt_free,
+                'total_interest': round(other.total_interest, 2),
+            }
+            for name, other in projections.items()
+        },
+        'debts': [
+            {
+                'id': debt.pk,
+                'debt_name': debt.debt_name,
+                'debt_type': debt.debt_type,
+                'remaining_balance': debt.remaining_balance,
+                'interest_rate': debt.interest_rate,
+                'minimum_amount': debt.minimum_amount,
+                'payoff_month': int(month) if month >= 0 else None,
+                'interest_paid': round(float(interest), 2),
+            }
+            for debt, month, interest in zip(
+                debts, projection.payoff_months, projection.interest_schedule.sum(axis=0)
+            )
+        ],
+    }
+    if schedule != 'none':
+        rows = zip(
+            projection.payment_schedule.sum(axis=1).round(2).tolist(),
+            projection.interest_schedule.sum(axis=1).round(2).tolist(),
+            projection.balance_schedule.sum(axis=1).round(2).tolist(),
+        )
+        data['schedule'] = [
+            {'month': month, 'payment': payment, 'interest': interest, 'balance': balance}
+            for month, (payment, interest, balance) in enumerate(rows, start=1)
+        ]
+        if schedule == 'debts':
+            for row, balances in zip(data['schedule'], projection.balance_schedule.round(2).tolist()):
+                row['balances'] = balances
+    return data
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def stress_test(request):
+    """
+    Monte Carlo stress test of the authenticated user's monthly cash flow
+    Query parameters: paths (default 10000), months (12-60; default 36) and
+    seed (default 0; the same seed and data give the same result). Results
+    are cached until the profile's data changes. Staff may pass profile=<id>.
+    """
+    params = request.query_params
+    paths = _query_param(params, 'paths', int) or CashFlowStressTest.DEFAULT_PATHS
+    if not 1 <= paths <= CashFlowStressTest.MAX_PATHS:
+        return Response(
+            {'error': f'paths must be between 1 and {CashFlowStressTest.MAX_PATHS}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    months = _query_param(params, 'months', int) or CashFlowStressTest.DEFAULT_MONTHS
+    if not CashFlowStressTest.MIN_MONTHS <= months <= CashFlowStressTest.MAX_MONTHS:
+        return Response(
+            {'error': f'months must be between {CashFlowStressTest.MIN_MONTHS} and {CashFlowStressTest.MAX_MONTHS}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    seed = _query_param(params, 'seed', int)
+    if seed is None:
+        seed = CashFlowStressTest.DEFAULT_SEED
+    elif seed < 0:
+        return Response({'error': 'seed must be zero or more'}, status=status.HTTP_400_BAD_REQUEST)
+
+    profile_id, response = _requested_profile_id(request, 'Only staff can stress test other profiles')
+    if response is not None:
+        return response
+
+    def build():
+        profile = scoped_profile(profile_id) or get_object_or_404(FinancialProfile.objects.only('pk'), pk=profile_id)
+        return {'profile_id': profile_id, **stress_test_profile(profile, paths=paths, months=months, seed=seed)}
+
+    return conditional_profile_get(request, profile_id, lambda: Response(
+        cached_profile_entry(f'stress-test:{paths}:{months}:{seed}', profile_id, build),
+        status=status.HTTP_200_OK
+    ))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def score_percentile(request):
+    """
+    Where the authenticated user's latest risk score ranks among other profiles
+    Reports the share of profiles with a lower score overall and in the user's
+    age band, from the score distribution index. Query parameters: score
+    (rank this score instead of the latest) and cohort (rank within these
+    comma-separated cohorts instead).
+    """
+    params = request.query_params
+    score = _query_param(params, 'score', int)
+    if score is not None and not 0 <= score <= MAX_SCORE:
+        return Response({'error': f'score must be between 0 and {MAX_SCORE}'}, status=status.HTTP_400_BAD_REQUEST)
+    cohorts = params.get('cohort')
+    if cohorts:
+        cohorts = cohorts.split(',')
+        unknown = [cohort for cohort in cohorts if cohort not in COHORTS]
+        if unknown:
+            return Response({'error': f"Unknown cohort '{unknown[0]}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    profile = None
+    if score is None:
+        profile = get_request_profile(request)
+        if profile.latest_assessment is None:
+            return Response(
+                {'error': 'No risk assessment yet. Calculate one first.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        score = profile.latest_assessment.score
+    if not cohorts:
+        # The request profile already holds the user's row
+        cohorts = cohorts_for((profile.user if profile is not None else request.user).date_of_birth)
+
+    return Response({'score': score, 'percentiles': score_percentiles(score, cohorts)}, status=status.HTTP_200_OK)
@@ -29,6 +29,28 @@ DATABASES = {
     "default": env.db(),  # pulls from DATABASE_URL
 }
 
+# Read replicas: each URL in DATABASE_REPLICA_URLS becomes replica_1,
+# replica_2, ... and serves the GET endpoints (see FinancialProfile.db_routing).
+# Two aliases on the same SQLite file work for trying this locally.
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), start=1):
+    DATABASES[f"replica_{index}"] = {**env.db_url_config(url), "TEST": {"MIRROR": "default"}}
+
+# Persistent connections, checked before each request reuses them. Django 5.0
+# has no connection pool of its own; put PgBouncer in front of PostgreSQL to
+# share connections between processes.
+for database in DATABASES.values():
+    database["CONN_MAX_AGE"] = env.int("DATABASE_CONN_MAX_AGE", default=60)
+    database["CONN_HEALTH_CHECKS"] = True
+
+DATABASE_ROUTERS = ['FinancialProfile.db_routing.ReplicaRouter']
+
+# Cache; per-process local memory by default. Set CACHE_URL to a shared
+# backend (e.g. redis://host:6379/1) when running more than one process,
+# so processes share cached responses and read-your-writes windows.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
@@ -56,6 +78,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'FinancialProfile.db_routing.DatabaseRoutingMiddleware',
+    'FinancialProfile.request_profile.RequestProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -126,3 +150,49 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Background risk assessment queue. Line-item signals only mark a profile
+# dirty; each mark restarts the profile's debounce window, and the backend
+# scores it once no further changes arrive within that window. Use DatabaseAssessmentQueue with the
+# process_risk_assessments worker for a durable queue.
+RISK_ASSESSMENT_QUEUE = {
+    'BACKEND': env(
+        "RISK_ASSESSMENT_QUEUE_BACKEND",
+        default='FinancialProfile.assessment_queue.ThreadPoolAssessmentQueue',
+    ),
+    'OPTIONS': {
+        'debounce_seconds': env.int("RISK_ASSESSMENT_DEBOUNCE_SECONDS", default=5),
+    },
+}
+
+# Retention for risk assessment history, applied by the compact_risk_history command
+RISK_HISTORY_RETENTION = {
+    'FULL_RESOLUTION_DAYS': env.int("RISK_HISTORY_FULL_RESOLUTION_DAYS", default=30),
+    'DAILY_BUCKET_DAYS': env.int("RISK_HISTORY_DAILY_BUCKET_DAYS", default=365),
+}
+
+# Per-profile response cache (financial_summary, stress test). Entries are
+# keyed by the data_version stored on the profile row, which every write to
+# the profile's data replaces.
+FINANCIAL_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': env.int("FINANCIAL_CACHE_TIMEOUT", default=300),
+}
+
+# Replica routing. Reads stay on the primary for READ_YOUR_WRITES_SECONDS
+# after a user's write; the window is recorded in CACHE, so it only spans
+# processes with a shared CACHE_URL.
+DATABASE_ROUTING = {
+    'READ_YOUR_WRITES_SECONDS': env.int("DATABASE_READ_YOUR_WRITES_SECONDS", default=5),
+    'HEALTH_CHECK_INTERVAL': env.int("DATABASE_REPLICA_HEALTH_CHECK_INTERVAL", default=10),
+    'CACHE': 'default',
+}
+
+# Token authentication without a user query: access tokens carry the
+# profile id and staff flags, and a change to them (or to the password or
+# active flag) bumps the token version on the user's row. CACHE keeps each
+# version for REVOCATION_CHECK_SECONDS; a miss reads the row again.
+STATELESS_JWT = {
+    'CACHE': 'default',
+    'REVOCATION_CHECK_SECONDS': env.int("JWT_REVOCATION_CHECK_SECONDS", default=10),
+}
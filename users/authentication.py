@@ -0,0 +1,201 @@
+# users/authentication.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from FinancialProfile.caching import get_profile_id_for_user
+
+User = get_user_model()
+
+DEFAULT_STATELESS_JWT = {
+    # Cache holding each user's token version, shared by every process
+    'CACHE': 'default',
+    # Seconds a cached token version is trusted before the user row is read again
+    'REVOCATION_CHECK_SECONDS': 10,
+}
+
+PROFILE_ID_CLAIM = 'profile_id'
+CLAIMS_VERSION_CLAIM = 'claims_version'
+
+# Cached in place of the version for users that are missing or inactive
+NO_ACTIVE_USER = -1
+
+
+def _config():
+    return {**DEFAULT_STATELESS_JWT, **getattr(settings, 'STATELESS_JWT', {})}
+
+
+def _claims_version_key(user_id):
+    return f'auth:user:{user_id}:claims-version'
+
+
+def remember_claims_version(user_id, version, replace=True):
+    """Cache a token version read from the user's row for REVOCATION_CHECK_SECONDS"""
+    config = _config()
+    cache = caches[config['CACHE']]
+    store = cache.set if replace else cache.add
+    store(_claims_version_key(user_id), version, config['REVOCATION_CHECK_SECONDS'])
+
+
+def stored_claims_version(user_id):
+    """The token version on the user's row, or NO_ACTIVE_USER if the user is missing or inactive"""
+    row = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+    version = row[0] if row is not None and row[1] else NO_ACTIVE_USER
+    remember_claims_version(user_id, version)
+    return version
+
+
+def revoke_token_claims(user_id):
+    """
+    Reject the access tokens issued to a user so far by bumping the token
+    version on its row; a token refresh then issues up to date claims
+    """
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    transaction.on_commit(lambda: caches[_config()['CACHE']].delete(_claims_version_key(user_id)))
+
+
+def claims_are_current(user_id, token_version):
+    """
+    Whether a token carries the user's current token version
+    The cached version is trusted for REVOCATION_CHECK_SECONDS; without one,
+    or for a token newer than it (refreshed since), the user row is read.
+    """
+    version = caches[_config()['CACHE']].get(_claims_version_key(user_id))
+    if version is None or token_version > version:
+        version = stored_claims_version(user_id)
+    return token_version == version
+
+
+def password_claim_is_current(token, user):
+    """
+    Whether `token` was issued since the user's password last changed
+    Tokens issued before CHECK_REVOKE_TOKEN was turned on carry no password
+    hash. They are accepted while the user's token_version is still 0: it
+    was added at the same time, and any password change since has bumped it.
+    """
+    if not api_settings.CHECK_REVOKE_TOKEN:
+        return True
+    password_hash = token.get(api_settings.REVOKE_TOKEN_CLAIM)
+    if password_hash is None:
+        return user.token_version == 0
+    return password_hash == get_md5_hash_password(user.password)
+
+
+def _profile_id(user):
+    """The user's profile id, taken from a profile already loaded on it if there is one"""
+    if User.financial_profile.is_cached(user):
+        try:
+            return user.financial_profile.pk
+        except User.financial_profile.RelatedObjectDoesNotExist:
+            return None
+    return get_profile_id_for_user(user)
+
+
+def profile_token_claims(user, claims_version):
+    """Claims that let StatelessJWTAuthentication build the user without a query"""
+    return {
+        PROFILE_ID_CLAIM: _profile_id(user),
+        'is_active': user.is_active,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        CLAIMS_VERSION_CLAIM: claims_version,
+    }
+
+
+class ProfileRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the profile and staff claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in profile_token_claims(user, user.token_version).items():
+            token[claim] = value
+        if user.is_active:
+            # Never replaces a cached version, which may be newer than this instance
+            remember_claims_version(user.pk, user.token_version, replace=False)
+        return token
+
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh against the user's current row, so tokens revoked by
+    revoke_token_claims come back with up to date claims
+    """
+    token_class = ProfileRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(_("User not found or inactive"), code='user_inactive')
+        if not password_claim_is_current(refresh, user):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        for claim, value in profile_token_claims(user, user.token_version).items():
+            refresh[claim] = value
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Rotated tokens keep their claims, so an old token gains the hash here
+            refresh[api_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
+        remember_claims_version(user.pk, user.token_version)
+        return super().validate({**attrs, 'refresh': str(refresh)})
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the token's claims
+    The user is a User instance holding only its id and its active and staff
+    flags; any other field loads on first access. The token's version is checked against the
+    user's row (through a short-lived cache), so tokens of deactivated or
+    demoted users stop working. Tokens without a claims version (issued by
+    plain RefreshToken) fall back to loading the user row.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if CLAIMS_VERSION_CLAIM not in validated_token:
+            return self._stored_user(user_id, validated_token)
+        if not claims_are_current(user_id, validated_token[CLAIMS_VERSION_CLAIM]):
+            raise InvalidToken(_("Token claims are out of date"))
+        # The version check only passes for active users, so a token issued
+        # before the is_active claim existed counts as active
+        is_active = validated_token.get('is_active', True)
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+
+        values = {
+            api_settings.USER_ID_FIELD: user_id,
+            'is_active': is_active,
+            'is_staff': validated_token.get('is_staff', False),
+            'is_superuser': validated_token.get('is_superuser', False),
+        }
+        # from_db takes the values in the model's field order
+        fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        user = User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+        user.financial_profile_id = validated_token.get(PROFILE_ID_CLAIM)
+        return user
+
+    def _stored_user(self, user_id, validated_token):
+        """JWTAuthentication.get_user, accepting tokens issued before CHECK_REVOKE_TOKEN"""
+        user = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+        if not password_claim_is_current(validated_token, user):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -6,6 +6,8 @@ class User(AbstractUser):
 
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
+    # Bumped whenever the access token claims go out of date; see users.authentication
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.username
@@ -0,0 +1,45 @@
+# users/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import revoke_token_claims
+
+User = get_user_model()
+
+# Fields whose change makes a token's claims or the user's access out of date
+TOKEN_CLAIM_FIELDS = ('is_active', 'is_staff', 'is_superuser', 'password')
+
+
+@receiver(pre_save, sender=User)
+def remember_token_claim_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the stored claim fields of an updated user so a change can revoke its tokens
+    A full save also takes the stored token version, so an instance loaded
+    before a revocation never writes the older version back.
+    """
+    instance._token_claim_fields = None
+    if update_fields is not None and not set(update_fields) & set(TOKEN_CLAIM_FIELDS):
+        return
+    if raw or instance.pk is None:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(*TOKEN_CLAIM_FIELDS, 'token_version').first()
+    if stored is not None:
+        instance._token_claim_fields = stored[:-1]
+        instance.token_version = stored[-1]
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claim_change(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_token_claim_fields', None)
+    if raw or created or previous is None:
+        return
+    if previous != tuple(getattr(instance, field) for field in TOKEN_CLAIM_FIELDS):
+        revoke_token_claims(instance.pk)
+        instance.token_version += 1
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    revoke_token_claims(instance.pk)
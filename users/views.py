@@ -1,9 +1,9 @@
 from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
+from .authentication import ProfileRefreshToken
 from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer
 
 User = get_user_model()
@@ -18,7 +18,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = ProfileRefreshToken.for_user(user)
         access_token = refresh.access_token
 
         return Response({
@@ -47,7 +47,7 @@ class LoginView(generics.GenericAPIView):
         
         if user:
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = ProfileRefreshToken.for_user(user)
             access_token = refresh.access_token
             
             return Response({
@@ -73,4 +73,9 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         """
         Return the current authenticated user
         """
-        return self.request.user
\ No newline at end of file
+        user = self.request.user
+        # Token-authenticated users hold only their claims; load the rest in one query
+        deferred = user.get_deferred_fields()
+        if deferred:
+            user.refresh_from_db(fields=deferred)
+        return user
\ No newline at end of file